@@ -0,0 +1,56 @@
+import datapack
+
+# ── Advisory-note rules ───────────────────────────────────────────────────────
+# Rules are declared in the data pack as
+#   {"id", "title", "text", "when": {profile_field: value | [values]}}
+# A rule fires when every `when` condition matches (an empty `when` always
+# fires). Rules are compiled once per pack into a dispatch index: each rule is
+# filed under one of its conditions, picking the field with the most possible
+# answers, so evaluating a profile only checks the handful of rules filed under
+# its own answers instead of scanning the whole table.
+
+# Most selective field first.
+INDEX_ORDER = ("jurisdiction", "cruising_area", "ubo_residency", "vessel_use",
+               "vessel_stage", "ownership")
+
+def _conditions(rule):
+    return {
+        field: frozenset(value if isinstance(value, list) else [value])
+        for field, value in rule.get("when", {}).items()
+    }
+
+@datapack.pack_cached(maxsize=1)
+def compiled_rules(pack):
+    """(always, index) where index[field][value] lists (position, conditions, note)."""
+    always = []
+    index = {}
+    for pos, rule in enumerate(pack.advisory_notes):
+        conds = _conditions(rule)
+        note = {"id": rule["id"], "title": rule["title"], "text": rule["text"]}
+        key_field = next((f for f in INDEX_ORDER if f in conds), None)
+        if key_field is None:
+            always.append((pos, conds, note))
+            continue
+        rest = {f: v for f, v in conds.items() if f != key_field}
+        for value in conds[key_field]:
+            index.setdefault(key_field, {}).setdefault(value, []).append((pos, rest, note))
+    return always, index
+
+@datapack.pack_cached(maxsize=1024)
+def _notes_for(pack, profile_items):
+    profile = dict(profile_items)
+    always, index = compiled_rules.for_pack(pack)
+    hits = list(always)
+    for field, by_value in index.items():
+        hits.extend(by_value.get(profile.get(field), ()))
+    hits.sort(key=lambda h: h[0])
+    return tuple(
+        note for _, conds, note in hits
+        if all(profile.get(f) in values for f, values in conds.items())
+    )
+
+def advisory_notes(profile):
+    """Notes that apply to a profile, in rule-table order."""
+    return list(_notes_for(tuple(sorted(
+        (f, profile.get(f)) for f in datapack.PROFILE_FIELDS
+    ))))
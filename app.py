@@ -2,8 +2,35 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+import hashlib
+import html
+import os
+import re
+from functools import partial
 from datetime import datetime
-from pdf_report import generate_pdf
+from pdf_report import generate_pdf, generate_fleet_pdf
+from scoring import (
+    FACTORS, GROUPS, ELIGIBLE_JURISDICTIONS, VESSEL_USES, CRUISING_AREAS,
+    UBO_RESIDENCIES, OWNERSHIP_TYPES, VESSEL_STAGES, OTHER_JURISDICTION, VERDICT_BANDS,
+    SCORE_SCALE,
+)
+from assessment import assess, assessment_hash, report_pdf_args, pdf_cache_key
+from html_report import html_report
+from share import QUERY_PARAM, InvalidToken, encode_token, decode_token, share_url
+from models import Profile, ImportanceVector
+import profiling
+import prewarm
+import result_cache
+from render_pool import RenderPool, PoolBusy
+from audit import AuditLog
+from fleet import VESSEL_FIELDS, score_fleet, fleet_hash
+from search import search, search_index, highlight, snippet
+from presets import presets, preset_scores, preset_vectors, matching_preset
+from compare import diff_assessments, diff_history, is_unchanged
+from methodology import AssessmentHistory
+import datapack
+from sensitivity import WHATIF_QUESTIONS, what_if, marginal_contributions, minimal_changes
+from robustness import DISTRIBUTIONS, score_robustness
 
 # ── Page config ──────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -13,547 +40,24 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-# ── Custom CSS ────────────────────────────────────────────────────────────────
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@400;600;700&family=Source+Sans+3:wght@300;400;600&display=swap');
-
-:root {
-    --navy: #0d2137;
-    --navy-mid: #163354;
-    --gold: #c9a84c;
-    --gold-light: #e8c97a;
-    --red: #c0392b;
-    --white: #f8f6f1;
-    --grey: #8a9bb0;
-    --light-bg: #f0ede6;
-}
-
-html, body, [class*="css"] {
-    font-family: 'Source Sans 3', sans-serif;
-    background-color: var(--white);
-    color: var(--navy);
-}
-
-.main { background-color: var(--white); }
-.block-container { padding: 2rem 3rem; max-width: 1100px; }
-
-h1, h2, h3 { font-family: 'Playfair Display', serif; }
-
-.hero {
-    background: linear-gradient(135deg, var(--navy) 0%, var(--navy-mid) 60%, #1e4a7a 100%);
-    border-radius: 16px;
-    padding: 3rem 3.5rem;
-    margin-bottom: 2.5rem;
-    position: relative;
-    overflow: hidden;
-}
-.hero::before {
-    content: '';
-    position: absolute;
-    top: -40px; right: -40px;
-    width: 300px; height: 300px;
-    background: radial-gradient(circle, rgba(201,168,76,0.15) 0%, transparent 70%);
-    border-radius: 50%;
-}
-.hero h1 {
-    color: var(--white);
-    font-size: 2.4rem;
-    margin: 0 0 0.5rem 0;
-    line-height: 1.2;
-}
-.hero .subtitle {
-    color: var(--gold-light);
-    font-size: 1.05rem;
-    font-weight: 300;
-    margin: 0;
-}
-.hero .ensign {
-    font-size: 2.5rem;
-    margin-bottom: 1rem;
-    display: block;
-}
-
-.section-header {
-    font-family: 'Playfair Display', serif;
-    font-size: 1.4rem;
-    color: var(--navy);
-    border-left: 4px solid var(--gold);
-    padding-left: 1rem;
-    margin: 2rem 0 1.2rem 0;
-}
-
-.group-card {
-    background: white;
-    border: 1px solid #ddd8ce;
-    border-radius: 12px;
-    padding: 1.5rem 2rem;
-    margin-bottom: 1.5rem;
-    box-shadow: 0 2px 8px rgba(13,33,55,0.06);
-}
-.group-title {
-    font-family: 'Playfair Display', serif;
-    font-size: 1.1rem;
-    color: var(--navy-mid);
-    margin-bottom: 1rem;
-    display: flex;
-    align-items: center;
-    gap: 0.5rem;
-}
-
-.profile-card {
-    background: white;
-    border: 1px solid #ddd8ce;
-    border-radius: 12px;
-    padding: 2rem;
-    margin-bottom: 1.5rem;
-    box-shadow: 0 2px 8px rgba(13,33,55,0.06);
-}
-
-.score-hero {
-    background: linear-gradient(135deg, var(--navy) 0%, var(--navy-mid) 100%);
-    border-radius: 16px;
-    padding: 2.5rem;
-    text-align: center;
-    margin-bottom: 2rem;
-    color: white;
-}
-.score-number {
-    font-family: 'Playfair Display', serif;
-    font-size: 5rem;
-    color: var(--gold-light);
-    line-height: 1;
-    margin: 0.5rem 0;
-}
-.score-label {
-    font-size: 1rem;
-    color: rgba(255,255,255,0.7);
-    letter-spacing: 0.1em;
-    text-transform: uppercase;
-}
-.score-verdict {
-    font-size: 1.4rem;
-    font-family: 'Playfair Display', serif;
-    color: white;
-    margin-top: 0.5rem;
-}
-
-.factor-row {
-    display: flex;
-    align-items: flex-start;
-    gap: 1rem;
-    padding: 1rem 0;
-    border-bottom: 1px solid #eee;
-}
-.factor-row:last-child { border-bottom: none; }
-.factor-name {
-    font-weight: 600;
-    color: var(--navy);
-    min-width: 220px;
-    font-size: 0.95rem;
-}
-.factor-score-bar {
-    flex: 1;
-}
-.factor-remark {
-    font-size: 0.88rem;
-    color: #555;
-    line-height: 1.5;
-    margin-top: 0.4rem;
-}
-
-.pill {
-    display: inline-block;
-    background: var(--light-bg);
-    border: 1px solid #ddd8ce;
-    border-radius: 20px;
-    padding: 0.25rem 0.8rem;
-    font-size: 0.8rem;
-    color: var(--navy-mid);
-    margin: 0.2rem;
-}
-.pill-gold {
-    background: rgba(201,168,76,0.15);
-    border-color: var(--gold);
-    color: #7a5c10;
-}
-
-.cta-box {
-    background: linear-gradient(135deg, var(--navy) 0%, var(--navy-mid) 100%);
-    border-radius: 16px;
-    padding: 2.5rem;
-    text-align: center;
-    color: white;
-    margin-top: 2rem;
-}
-.cta-box h3 {
-    color: var(--gold-light);
-    margin-bottom: 0.5rem;
-}
-
-.stSlider > div > div { accent-color: var(--gold) !important; }
-.stSelectbox > div > div { border-color: #ddd8ce !important; }
-
-div[data-testid="stForm"] { border: none; }
-
-.step-indicator {
-    display: flex;
-    gap: 0.5rem;
-    margin-bottom: 2rem;
-    align-items: center;
-}
-.step {
-    width: 32px; height: 32px;
-    border-radius: 50%;
-    display: flex; align-items: center; justify-content: center;
-    font-size: 0.85rem; font-weight: 600;
-    border: 2px solid #ddd;
-    color: #aaa;
-}
-.step.active {
-    background: var(--navy);
-    border-color: var(--navy);
-    color: white;
-}
-.step.done {
-    background: var(--gold);
-    border-color: var(--gold);
-    color: white;
-}
-.step-line {
-    flex: 1; height: 2px;
-    background: #ddd;
-}
-.step-line.done { background: var(--gold); }
-
-.warning-box {
-    background: #fff8e6;
-    border: 1px solid var(--gold);
-    border-radius: 8px;
-    padding: 1rem 1.2rem;
-    font-size: 0.9rem;
-    color: #7a5c10;
-    margin: 0.5rem 0;
-}
-.info-box {
-    background: #e8f0f8;
-    border: 1px solid #b0c8e0;
-    border-radius: 8px;
-    padding: 1rem 1.2rem;
-    font-size: 0.9rem;
-    color: var(--navy-mid);
-    margin: 0.5rem 0;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# ── Data ──────────────────────────────────────────────────────────────────────
-
-ELIGIBLE_JURISDICTIONS = [
-    "Andorra", "Argentina", "Aruba", "Bahrain", "Brazil",
-    "Canary Islands (Spain)", "Chile", "China", "Switzerland",
-    "United Arab Emirates", "United States of America", "Mexico", "Monaco",
-    "Panama", "Republic of Korea (South Korea)", "Slovenia", "Suriname",
-    "Uruguay", "Israel", "Japan", "Liberia", "Madeira (Portugal)",
-    "Marshall Islands", "European Union",
-    # Commonwealth
-    "Antigua and Barbuda", "Australia", "Bahamas", "Bangladesh", "Barbados",
-    "Belize", "Botswana", "Brunei Darussalam", "Canada", "Cameroon",
-    "Cyprus", "Dominica", "Fiji", "Gambia", "Gabon", "Ghana", "Guyana",
-    "Grenada", "India", "Jamaica", "Kenya", "Kingdom of Eswatini",
-    "Kiribati", "Lesotho", "Malawi", "Malaysia", "Maldives", "Malta",
-    "Mauritius", "Mozambique", "Namibia", "Nauru", "New Zealand",
-    "Nigeria", "Pakistan", "Papua New Guinea", "Rwanda", "Samoa",
-    "Seychelles", "Sierra Leone", "Singapore", "Solomon Islands",
-    "South Africa", "Sri Lanka", "St. Kitts & Nevis", "St. Lucia",
-    "St. Vincent & the Grenadines", "Togo", "Tonga", "Trinidad & Tobago",
-    "Tuvalu", "Uganda", "United Republic of Tanzania", "United Kingdom",
-    "Vanuatu", "Zambia",
-    # UK
-    "England", "Scotland", "Wales", "Northern Ireland",
-    # Crown Dependencies
-    "Bailiwick of Jersey", "Bailiwick of Guernsey", "Isle of Man",
-    # British Overseas Territories
-    "Anguilla", "Bermuda", "British Virgin Islands", "Cayman Islands",
-    "Falkland Islands", "Gibraltar", "Montserrat", "Turks and Caicos",
-    # EU Members
-    "Austria", "Belgium", "Bulgaria", "Croatia", "Czech Republic",
-    "Denmark", "Estonia", "Finland", "France", "Germany", "Greece",
-    "Hungary", "Ireland", "Italy", "Latvia", "Lithuania", "Luxembourg",
-    "Netherlands", "Poland", "Portugal", "Romania", "Slovakia", "Spain",
-    "Sweden",
-    # EEA
-    "Iceland", "Liechtenstein", "Norway",
-    # UAE
-    "Abu Dhabi", "Dubai", "Sharjah", "Ajman", "Ras Al Khaimah",
-    "Umm Al Quwain", "Fujairah",
-    # US Territories
-    "Guam", "Puerto Rico", "U.S. Virgin Islands", "American Samoa",
-    "Northern Mariana Islands",
-    # France Territories
-    "French Polynesia", "Guadeloupe", "Martinique", "Mayotte",
-    "New Caledonia", "Réunion", "Saint Barthélemy (St. Barts)",
-    "Saint Martin",
-    # Netherlands Territories
-    "Aruba", "Bonaire", "Curacao", "Saba", "Sint Maarten", "Sint Eustatius",
-    # Denmark Territories
-    "Faroe Islands", "Greenland",
-    # Spain Territories
-    "Balearic Islands", "Ceuta and Melilla",
-    # OECS
-    "Commonwealth of Dominica",
-]
-ELIGIBLE_JURISDICTIONS = sorted(list(set(ELIGIBLE_JURISDICTIONS)))
-
-# VAT matrix: (ubo_residency, vessel_use, cruising_area) -> score
-VAT_MATRIX = {
-    ("EU", "Pleasure", "EU"): 2,
-    ("EU", "Pleasure", "USA"): 4,
-    ("EU", "Pleasure", "Caribbean"): 5,
-    ("EU", "Pleasure", "Middle East"): 4,
-    ("EU", "Pleasure", "Asia"): 5,
-    ("EU", "Pleasure", "Global"): 4,
-    ("EU", "Occasional Charter", "EU"): 1,
-    ("EU", "Occasional Charter", "USA"): 4,
-    ("EU", "Occasional Charter", "Caribbean"): 5,
-    ("EU", "Occasional Charter", "Middle East"): 3,
-    ("EU", "Occasional Charter", "Asia"): 4,
-    ("EU", "Occasional Charter", "Global"): 4,
-    ("EU", "Commercial", "EU"): 1,
-    ("EU", "Commercial", "USA"): 4,
-    ("EU", "Commercial", "Caribbean"): 5,
-    ("EU", "Commercial", "Middle East"): 3,
-    ("EU", "Commercial", "Asia"): 4,
-    ("EU", "Commercial", "Global"): 4,
-    ("UK", "Pleasure", "EU"): 4,
-    ("UK", "Pleasure", "USA"): 4,
-    ("UK", "Pleasure", "Caribbean"): 4,
-    ("UK", "Pleasure", "Middle East"): 4,
-    ("UK", "Pleasure", "Asia"): 4,
-    ("UK", "Pleasure", "Global"): 4,
-    ("UK", "Occasional Charter", "EU"): 4,
-    ("UK", "Occasional Charter", "USA"): 4,
-    ("UK", "Occasional Charter", "Caribbean"): 4,
-    ("UK", "Occasional Charter", "Middle East"): 4,
-    ("UK", "Occasional Charter", "Asia"): 4,
-    ("UK", "Occasional Charter", "Global"): 4,
-    ("UK", "Commercial", "EU"): 4,
-    ("UK", "Commercial", "USA"): 4,
-    ("UK", "Commercial", "Caribbean"): 4,
-    ("UK", "Commercial", "Middle East"): 4,
-    ("UK", "Commercial", "Asia"): 4,
-    ("UK", "Commercial", "Global"): 4,
-    ("US", "Pleasure", "USA"): 4,
-    ("US", "Pleasure", "EU"): 4,
-    ("US", "Pleasure", "Caribbean"): 4,
-    ("US", "Pleasure", "Middle East"): 4,
-    ("US", "Pleasure", "Asia"): 4,
-    ("US", "Pleasure", "Global"): 4,
-    ("US", "Occasional Charter", "USA"): 3,
-    ("US", "Occasional Charter", "EU"): 5,
-    ("US", "Occasional Charter", "Caribbean"): 5,
-    ("US", "Occasional Charter", "Middle East"): 5,
-    ("US", "Occasional Charter", "Asia"): 5,
-    ("US", "Occasional Charter", "Global"): 5,
-    ("US", "Commercial", "USA"): 2,
-    ("US", "Commercial", "EU"): 5,
-    ("US", "Commercial", "Caribbean"): 5,
-    ("US", "Commercial", "Middle East"): 5,
-    ("US", "Commercial", "Asia"): 5,
-    ("US", "Commercial", "Global"): 5,
-    ("Middle East", "Pleasure", "Middle East"): 3,
-    ("Middle East", "Pleasure", "EU"): 4,
-    ("Middle East", "Pleasure", "Caribbean"): 5,
-    ("Middle East", "Pleasure", "USA"): 4,
-    ("Middle East", "Pleasure", "Asia"): 5,
-    ("Middle East", "Pleasure", "Global"): 4,
-    ("Middle East", "Occasional Charter", "Middle East"): 3,
-    ("Middle East", "Occasional Charter", "EU"): 4,
-    ("Middle East", "Occasional Charter", "Caribbean"): 5,
-    ("Middle East", "Occasional Charter", "USA"): 4,
-    ("Middle East", "Occasional Charter", "Asia"): 5,
-    ("Middle East", "Occasional Charter", "Global"): 5,
-    ("Middle East", "Commercial", "Middle East"): 3,
-    ("Middle East", "Commercial", "EU"): 4,
-    ("Middle East", "Commercial", "Caribbean"): 5,
-    ("Middle East", "Commercial", "USA"): 4,
-    ("Middle East", "Commercial", "Asia"): 5,
-    ("Middle East", "Commercial", "Global"): 5,
-    ("Asia", "Pleasure", "Asia"): 4,
-    ("Asia", "Pleasure", "EU"): 4,
-    ("Asia", "Pleasure", "Caribbean"): 5,
-    ("Asia", "Pleasure", "USA"): 4,
-    ("Asia", "Pleasure", "Middle East"): 4,
-    ("Asia", "Pleasure", "Global"): 4,
-    ("Asia", "Occasional Charter", "Asia"): 4,
-    ("Asia", "Occasional Charter", "EU"): 4,
-    ("Asia", "Occasional Charter", "Caribbean"): 5,
-    ("Asia", "Occasional Charter", "USA"): 4,
-    ("Asia", "Occasional Charter", "Middle East"): 4,
-    ("Asia", "Occasional Charter", "Global"): 4,
-    ("Asia", "Commercial", "Asia"): 4,
-    ("Asia", "Commercial", "EU"): 4,
-    ("Asia", "Commercial", "Caribbean"): 5,
-    ("Asia", "Commercial", "USA"): 4,
-    ("Asia", "Commercial", "Middle East"): 4,
-    ("Asia", "Commercial", "Global"): 4,
-    ("Other", "Pleasure", "EU"): 5,
-    ("Other", "Pleasure", "USA"): 5,
-    ("Other", "Pleasure", "Caribbean"): 5,
-    ("Other", "Pleasure", "Middle East"): 5,
-    ("Other", "Pleasure", "Asia"): 5,
-    ("Other", "Pleasure", "Global"): 5,
-    ("Other", "Occasional Charter", "EU"): 5,
-    ("Other", "Occasional Charter", "USA"): 5,
-    ("Other", "Occasional Charter", "Caribbean"): 5,
-    ("Other", "Occasional Charter", "Middle East"): 5,
-    ("Other", "Occasional Charter", "Asia"): 5,
-    ("Other", "Occasional Charter", "Global"): 5,
-    ("Other", "Commercial", "EU"): 5,
-    ("Other", "Commercial", "USA"): 5,
-    ("Other", "Commercial", "Caribbean"): 5,
-    ("Other", "Commercial", "Middle East"): 5,
-    ("Other", "Commercial", "Asia"): 5,
-    ("Other", "Commercial", "Global"): 5,
-}
-
-FACTORS = [
-    # (id, name, base_score, group, remark)
-    ("seafarers_coc", "Acceptance of Seafarers' COC", 4, "Service & Support",
-     "Flag states differ significantly in which countries' officer certificates they recognise. BVI accepts certificates from the jurisdictions listed in its Marine Circular — a carefully considered list that balances breadth with the quality assurance of vetting the issuing administrations, rather than accepting all certificates indiscriminately."),
-
-    ("cost", "Cost", 5, "Financial",
-     "Cost appears straightforward but is often more nuanced than the advertised fee suggests. Some registries offer a low headline figure but layer on annual fees, inspection fees, compliance levies, and survey charges separately. The meaningful comparison is the total five-year cost of ownership. BVI's fee structure is transparent and all-inclusive — consistently among the lowest in the industry when viewed on this basis."),
-
-    ("psc_whitelist", "PSC Whitelist / Grey / Black", 4, "Reputation & Legal Standing",
-     "The Paris MOU and Tokyo MOU publish white, grey, and black lists of flag states based on Port State Control inspection outcomes. A vessel's flag directly influences the frequency and intensity of inspections it faces in port. "),
-
-    ("reputation", "Flag Reputation", 5, "Reputation & Legal Standing",
-     "Beyond the quantifiable PSC regime, a flag's perceived reputation influences how port authorities, customs officials, lenders, insurers, and counterparties treat a vessel. BVI, as a British Overseas Territory flying the Red Ensign, sits within the gold-standard Red Ensign Group alongside the UK and its Overseas Territories — a status that commands genuine respect across the global maritime community."),
-
-    ("pleasure_commercial", "Pleasure / Commercial Suitability", 5, "Commercial & Operational Framework",
-     "Not all flags provide an adequate framework for commercial operations, particularly for international voyages. The USA is a clear example — well-suited for domestic pleasure registration but lacking the internationally recognised commercial regulatory framework required for charter and commercial voyages outside its waters. BVI, as part of the Red Ensign Group, operates within a fully recognised international commercial framework."),
-
-    ("codes", "Availability of Codes", 5, "Commercial & Operational Framework",
-     "The Red Ensign Group leads the industry in yacht codes — the Large Yacht Code and the Small Commercial Vessel Code set the global benchmark. BVI additionally offers the Caribbean Small Commercial Vessel Code and the Caribbean Cargo Ship Safety Code, which are particularly valuable for Caribbean operations. The REG yacht codes are widely regarded as the industry gold standard."),
-
-    ("area_operation", "Area of Operation Alignment", 5, "Commercial & Operational Framework",
-     "The codes and frameworks available under a flag should align with where the vessel actually operates. For Caribbean operations, BVI's Caribbean-specific codes provide a direct operational advantage. Flag selection and area of operation are closely interconnected decisions that should always be considered together."),
-
-    ("yet_charter", "Specific Schemes — YET & Limited Charter", 4, "Commercial & Operational Framework",
-     "BVI operates its own Yacht Exemption Tonnage (YET) scheme alongside Cayman Islands, Isle of Man, and Marshall Islands. On private yacht limited charter, BVI takes a principled position: any vessel undertaking commercial operations, even for a limited number of days per year, must meet full safety compliance standards. This reflects a commitment to the safety of crew, passengers, and the marine environment."),
-
-    ("vat_tariff", "VAT & Tariff Considerations", 0, "Financial",
-     "VAT and tariff implications are among the most significant and nuanced factors in flag selection today. The optimal flag depends on the specific combination of UBO residency, vessel use, and area of operation. BVI holds a structural advantage for non-EU owners and for EU owners operating outside EU waters, given its status as a British Overseas Territory outside the EU VAT regime."),
-
-    ("eligibility", "Owner Eligibility", 0, "Administration & Compliance",
-     "BVI's eligible jurisdiction list, updated under the Merchant Shipping (Amendment) Act 2025, is extensive — covering the EU, Commonwealth, UAE, UK, US, and many more. For owners not personally eligible, incorporating a BVI company or a company in an eligible jurisdiction provides a straightforward and well-trodden pathway, supported by BVI's world-class corporate registry infrastructure."),
-
-    ("rep_persons", "Representative Persons", 4, "Administration & Compliance",
-     "Flag registration confers nationality on a vessel, which requires a demonstrable connection to the jurisdiction for non-resident owners. BVI offers a wide choice of qualified representative persons — trust companies, legal firms, and licensed individuals — making this requirement easy to satisfy within the existing BVI ecosystem."),
-
-    ("approachable", "Approachability of Registry", 5, "Service & Support",
-     "This is a soft but meaningful factor. BVI, as a boutique registry compared to the largest flag states, offers direct access to senior management. Clients receive genuine engagement rather than navigating layers of bureaucracy. When time-sensitive situations arise, this responsiveness has real practical value."),
-
-    ("ro_delegation", "Recognised Organisation (RO) Delegation", 4, "Service & Support",
-     "BVI authorises six Recognised Organisations for statutory functions — fewer than some larger registries, but deliberately so. The Red Ensign Group maintains rigorous standards for RO approval, including periodic audits. Fewer, better-quality ROs means greater consistency in survey standards and stronger quality assurance for owners and insurers."),
-
-    ("insurance_lender", "Insurance & Lender Premium", 5, "Financial",
-     "Flag selection has a direct bearing on insurance premiums and the terms offered by marine lenders. Registries with stricter quality controls — including more rigorous RO standards — are rewarded with more favourable premium treatment. The cost savings achievable through BVI's reputation with underwriters and lenders often offset or exceed the differential in registration fees."),
-
-    ("vessel_acceptance", "Vessel Acceptability", 4, "Administration & Compliance",
-     "BVI conducts a risk assessment prior to flagging commercial and larger vessels, taking into account age, company track record, and PSC inspection history. This is not a barrier but a quality assurance measure — consistent with BVI's position as a quality flag. Owners with strong records find the process straightforward."),
-
-    ("ease_business", "Ease of Doing Business", 5, "Service & Support",
-     "Speed of service, flexibility, and helpfulness in administration are factors that only become apparent once you are working with a registry. BVI's commitment to ease of doing business is embedded in its operational culture — from initial enquiry through to ongoing vessel management."),
-
-    ("inspections", "Inspections — Pre-Flagging & Ongoing", 4, "Administration & Compliance",
-     "BVI's Flag State Inspection regime currently operates on a five-year cycle — less frequent than most comparable registries. Pre-flagging inspections are only required when the risk score assessment warrants it. For well-maintained vessels with clean records, the inspection burden is minimal."),
-
-    ("exemptions", "Exemptions", 4, "Administration & Compliance",
-     "For new builds and vessels requiring regulatory flexibility, BVI takes a pragmatic approach to exemptions — considered and reasoned rather than automatic. This reflects the BVI's philosophy of maintaining quality standards while recognising the genuine operational realities of modern yacht construction and operation."),
-
-    ("corporate_registry", "Corporate Registry Integration", 5, "Corporate & Information",
-     "BVI is one of the world's oldest and largest corporate registries, with a deeply developed ecosystem of trust companies, legal advisors, and service providers. Owners wishing to register both their owning company and their vessel in the same jurisdiction find BVI uniquely well-equipped. The motto says it best: Flag, Company, Cruise."),
-
-    ("flag_protection", "Flag Protection & Perception", 5, "Reputation & Legal Standing",
-     "As a British Overseas Territory, BVI-flagged vessels benefit from UK Royal Navy protection when required and access to British consular assistance globally. Flying the Red Ensign carries genuine weight — a signal of quality, stability, and the backing of one of the world's most respected maritime nations."),
-
-    ("manning", "Manning Requirements", 4, "Administration & Compliance",
-     "BVI's approach to manning requirements reflects the UK's pioneering work in developing yacht-specific standards and equivalencies. Practical solutions such as the largest-engine-based certification concept and dual certification pathways allow operators to meet requirements efficiently without compromising safety standards."),
-
-    ("support_ecosystem", "Support Ecosystem", 4, "Service & Support",
-     "The practical logistics of vessel management — authorised surveyors, approved service suppliers for safety equipment, life-saving appliance servicing — are materially easier within BVI's Red Ensign Group network. The broad base of UK-approved service providers means owners have access to quality support regardless of where they operate."),
-
-    ("incentive", "Incentives for Green Shipping", 4, "Financial",
-     "Incentives for green technology adoption, reduced emissions, and safe operational track records are an emerging area of flag competition. BVI does not yet offer a formal incentive programme comparable to Singapore's, but this is actively under consideration. Owner input and industry participation in shaping this programme are welcomed."),
-
-    ("robust_law", "Robust Legal Framework", 5, "Reputation & Legal Standing",
-     "BVI's maritime law is rooted in English law — one of the most thoroughly developed, internationally recognised, and commercially respected legal systems in the world. This provides owners, lenders, and insurers with certainty, predictability, and confidence in the legal standing of their vessel and its documentation."),
-
-    ("information", "Information Availability", 4, "Corporate & Information",
-     "UK-based maritime law and BVI regulations are among the most accessible, well-documented, and searchable bodies of maritime regulation in the world. This reduces administrative friction, supports legal certainty, and makes compliance management straightforward for owners and their advisors."),
-]
-
-GROUPS = [
-    ("Financial", "💰"),
-    ("Reputation & Legal Standing", "⚖️"),
-    ("Commercial & Operational Framework", "🚢"),
-    ("Administration & Compliance", "📋"),
-    ("Service & Support", "🤝"),
-    ("Corporate & Information", "🏛️"),
-]
-
-def get_vat_score(ubo, use, area):
-    key = (ubo, use, area)
-    return VAT_MATRIX.get(key, 4)
-
-def get_eligibility_score(jurisdiction):
-    if jurisdiction in ELIGIBLE_JURISDICTIONS:
-        return 5
-    return 3
-
-def compute_score(profile, importances):
-    total_weighted = 0
-    max_weighted = 0
-    factor_details = []
-
-    vat_score = get_vat_score(profile["ubo_residency"], profile["vessel_use"], profile["cruising_area"])
-    eligibility_score = get_eligibility_score(profile["jurisdiction"])
-
-    for fid, fname, base_score, group, remark in FACTORS:
-        if fid == "vat_tariff":
-            bvi_score = vat_score
-        elif fid == "eligibility":
-            bvi_score = eligibility_score
-        else:
-            bvi_score = base_score
-
-        importance = importances.get(fid, 3)
-        weighted = bvi_score * importance
-        max_w = 5 * importance
-
-        total_weighted += weighted
-        max_weighted += max_w
-        factor_details.append({
-            "id": fid, "name": fname, "group": group,
-            "bvi_score": bvi_score, "importance": importance,
-            "weighted": weighted, "max_weighted": max_w,
-            "remark": remark,
-        })
-
-    final_score = round((total_weighted / max_weighted) * 100) if max_weighted > 0 else 0
-    return final_score, factor_details
-
-def get_verdict(score):
-    if score >= 85:
-        return "Excellent Fit", "#2e7d32"
-    elif score >= 70:
-        return "Strong Fit", "#1565c0"
-    elif score >= 55:
-        return "Good Fit", "#e65100"
-    else:
-        return "Partial Fit", "#c62828"
+# ── Theme ─────────────────────────────────────────────────────────────────────
+# The stylesheet and its self-hosted fonts live in static/, which Streamlit
+# serves at app/static/ (server.enableStaticServing in .streamlit/config.toml),
+# so a rerun sends only this link and first paint needs nothing external.
+# Streamlit serves app/static/*.css as text/css only from 1.57 (earlier
+# releases force text/plain with nosniff, and browsers drop the stylesheet),
+# hence the floor in requirements.txt.
+# The query string is a hash of the stylesheet, and font files carry their
+# version in the name, so every asset URL can be cached indefinitely.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+@st.cache_resource
+def theme_version():
+    with open(os.path.join(STATIC_DIR, "theme.css"), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+st.markdown(f'<link rel="stylesheet" href="app/static/theme.css?v={theme_version()}">',
+            unsafe_allow_html=True)
 
 # ── Session state ─────────────────────────────────────────────────────────────
 if "page" not in st.session_state:
@@ -562,6 +66,198 @@ if "profile" not in st.session_state:
     st.session_state.profile = {}
 if "importances" not in st.session_state:
     st.session_state.importances = {}
+if "history" not in st.session_state:
+    st.session_state.history = []   # this session's assessments, oldest first
+HISTORY_LIMIT = 20
+
+# ── Shared report links ───────────────────────────────────────────────────────
+# ?r=<token> opens the report for the encoded assessment directly. The token
+# seen last is remembered so navigating away drops it from the URL instead of
+# reopening the report.
+share_token = st.query_params.get(QUERY_PARAM)
+if share_token and share_token != st.session_state.get("share_token"):
+    st.session_state.share_token = share_token
+    try:
+        shared_profile, shared_importances = decode_token(share_token)
+    except InvalidToken as e:
+        st.session_state.share_error = str(e)
+        del st.query_params[QUERY_PARAM]
+    else:
+        st.session_state.profile = shared_profile
+        st.session_state.importances = shared_importances
+        for fid, imp in shared_importances.items():
+            st.session_state[f"imp_{fid}"] = imp
+        st.session_state.page = "report"
+elif share_token and st.session_state.page != "report":
+    del st.query_params[QUERY_PARAM]
+
+# Profiling mode (BVI_PROFILE=1): one measurement per completed rerun.
+profile_run = profiling.start(f"page:{st.session_state.page}")
+
+# ── Background PDF rendering ──────────────────────────────────────────────────
+PDF_WORKERS = 2
+PDF_QUEUE_LIMIT = 6
+PDF_TIMEOUT = 60.0
+PDF_INLINE_WAIT = 1.5   # seconds to wait before showing the progress state
+PDF_POLL_INTERVAL = 0.5
+PDF_CACHE_SIZE = 512    # finished PDFs kept; pre-warming fills up to half
+
+@st.cache_resource
+def get_render_pool():
+    return RenderPool(max_workers=PDF_WORKERS, max_queue=PDF_QUEUE_LIMIT, timeout=PDF_TIMEOUT,
+                      keep=PDF_CACHE_SIZE)
+
+@st.cache_resource
+def get_audit_log():
+    return AuditLog()
+
+@st.cache_resource
+def get_result_cache():
+    return result_cache.from_env()
+
+@st.cache_resource
+def start_prewarm():
+    """Warm the caches in the background once per server when BVI_PREWARM is set."""
+    return prewarm.start(get_render_pool(), get_result_cache())
+
+start_prewarm()
+
+@st.fragment(run_every=PDF_POLL_INTERVAL)
+def pdf_poller(key):
+    """Ticks in the browser while a PDF is pending and reruns the app once,
+    when the job settles or a busy pool has room for it again."""
+    pool = get_render_pool()
+    state, _ = pool.poll(key)
+    if state == "pending" or (state == "missing" and not pool.has_room()):
+        return
+    st.rerun()
+
+@st.fragment
+def pdf_download(key, args, kwargs, label="⬇  Download Full Report (PDF)",
+                 file_stem="BVI_Flag_Suitability_Report", render=generate_pdf):
+    pool = get_render_pool()
+    try:
+        # Replicas share finished PDFs through the result cache; the pool
+        # keeps this replica's copy, so the cache's local layer is skipped.
+        pool.submit(key, get_result_cache().get_or_compute, "pdf", key,
+                    partial(render, *args, **kwargs), keep_local=False)
+    except PoolBusy:
+        st.info("⏳ The report service is busy — retrying shortly…")
+        pdf_poller(key)
+        return
+
+    with st.spinner("Preparing your PDF report…"):
+        state, value = pool.wait(key, PDF_INLINE_WAIT)
+
+    if state == "ready":
+        st.download_button(
+            label=label,
+            data=value,
+            file_name=f"{file_stem}_{datetime.now().strftime('%Y%m%d')}.pdf",
+            mime="application/pdf",
+            use_container_width=False,
+        )
+    elif state in ("pending", "missing"):
+        st.caption("Preparing your PDF report…")
+        pdf_poller(key)
+    elif state == "timeout":
+        st.warning("PDF generation is taking longer than expected.")
+        if st.button("Try again", key=f"pdf_retry_{key}"):
+            st.rerun(scope="fragment")
+    else:
+        st.warning(f"PDF generation unavailable: {value}")
+
+# ── Search ────────────────────────────────────────────────────────────────────
+# The index is built once per data pack; building it here keeps the first
+# keystroke from paying for it.
+search_index()
+
+def search_panel(key):
+    """Search box over the factors and advisory notes with its results listed
+    below; returns {factor id: matched terms} for highlighting."""
+    query = st.text_input("🔍 Search factors and notes", key=key,
+                          placeholder="e.g. VAT, crew certificates, port state control")
+    if not query.strip():
+        return {}
+    hits = search(query)
+    if not hits:
+        st.caption("No factor or advisory note matches that search.")
+        return {}
+    for hit in hits:
+        st.markdown(
+            f'<div class="search-result"><strong>{hit["icon"]} {html.escape(hit["title"])}</strong>'
+            f' <span class="search-group">{html.escape(hit["group"])}</span>'
+            f'<div class="factor-remark">{snippet(hit["text"], hit["terms"])}</div></div>',
+            unsafe_allow_html=True)
+    return {hit["id"]: hit["terms"] for hit in hits if hit["kind"] == "factor"}
+
+# ── Persona presets ───────────────────────────────────────────────────────────
+def apply_preset(preset_id):
+    """Set every priority slider to the preset's value (runs before the rerun)."""
+    for fid, value in preset_vectors()[preset_id].items():
+        st.session_state[f"imp_{fid}"] = value
+
+def preset_picker(profile):
+    """One card per preset with its score for `profile` and an Apply button."""
+    preset_list = presets()
+    if not preset_list:
+        return
+    st.markdown("**Start from a preset** — apply the one closest to you, then adjust any slider.")
+    scores = preset_scores(profile)
+    for col, preset in zip(st.columns(len(preset_list)), preset_list):
+        score, verdict = scores[preset["id"]]
+        with col:
+            st.markdown(
+                f'<div class="preset-card"><strong>{html.escape(preset["name"])}</strong>'
+                f'<div class="preset-desc">{html.escape(preset["description"])}</div>'
+                f'<div class="preset-score">{score} · {verdict}</div></div>',
+                unsafe_allow_html=True)
+            st.button("Apply", key=f"preset_{preset['id']}", on_click=apply_preset,
+                      args=(preset["id"],), use_container_width=True)
+    current = {fid: st.session_state.get(f"imp_{fid}", 3) for fid, *_ in FACTORS}
+    active = matching_preset(current)
+    if active:
+        name = next(p["name"] for p in preset_list if p["id"] == active)
+        st.caption(f"Your priorities match the “{name}” preset.")
+
+# ── Comparing assessments ─────────────────────────────────────────────────────
+PROFILE_LABELS = {key: label for key, label, _ in WHATIF_QUESTIONS}
+
+def link_token(text):
+    """The token in a pasted report link, or the text itself if it has none."""
+    m = re.search(rf"[?&]{QUERY_PARAM}=([^&#\s]+)", text)
+    return m.group(1) if m else text.strip()
+
+def comparison(old_profile, old_importances, profile, result):
+    """Show what moved from an earlier assessment to the current one."""
+    old = assess(old_profile, old_importances)
+    d = diff_assessments(old_profile, old["factor_details"], profile, result["factor_details"])
+    if is_unchanged(d):
+        st.caption("Nothing changed: same answers, priorities and scores.")
+        return
+    before, after = d["final"]
+    verdict = d["verdict"][1] if d["verdict"][0] == d["verdict"][1] else "{} → {}".format(*d["verdict"])
+    st.metric("Score", after, delta=after - before if after != before else None)
+    st.markdown(f"Was **{before}**, now **{after}** · {verdict}")
+    if d["answers"]:
+        st.markdown("**Answers changed**")
+        st.dataframe(pd.DataFrame([{"Question": PROFILE_LABELS[f], "Before": b, "Now": a}
+                                   for f, (b, a) in d["answers"].items()]),
+                     use_container_width=True, hide_index=True)
+    if d["groups"]:
+        st.markdown("**Category scores**")
+        st.dataframe(pd.DataFrame([{"Category": g, "Before": b, "Now": a,
+                                    "Change": a - b if a is not None and b is not None else None}
+                                   for g, (b, a) in d["groups"].items()]),
+                     use_container_width=True, hide_index=True)
+    changed = d["importances"].keys() | d["scores"].keys()
+    if changed:
+        st.markdown("**Factors changed**")
+        st.dataframe(pd.DataFrame([{
+            "Factor": name,
+            "Priority": "{} → {}".format(*d["importances"][fid]) if fid in d["importances"] else "",
+            "BVI rating": "{} → {}".format(*d["scores"][fid]) if fid in d["scores"] else "",
+        } for fid, name, *_ in FACTORS if fid in changed]), use_container_width=True, hide_index=True)
 
 # ── Hero ──────────────────────────────────────────────────────────────────────
 st.markdown("""
@@ -595,6 +291,9 @@ st.markdown(f"""
 # ═══════════════════════════════════════════════════════════════════════════════
 if st.session_state.page == "profile":
 
+    if "share_error" in st.session_state:
+        st.warning(f"That report link could not be opened ({st.session_state.pop('share_error')}). "
+                   "Please answer the questions below.")
     st.markdown('<div class="section-header">Step 1 — Your Vessel Profile</div>', unsafe_allow_html=True)
     st.markdown("Answer six questions about your vessel and ownership. This shapes your personalised suitability report.")
 
@@ -606,24 +305,24 @@ if st.session_state.page == "profile":
         with col1:
             vessel_use = st.selectbox(
                 "1. How will the vessel primarily be used?",
-                ["Pleasure", "Occasional Charter", "Commercial"],
+                VESSEL_USES,
                 help="Commercial includes full-time charter and cargo operations."
             )
 
             cruising_area = st.selectbox(
                 "2. Where will the vessel mainly operate?",
-                ["Caribbean", "Mediterranean", "Middle East", "USA", "Asia", "Global"],
+                CRUISING_AREAS,
             )
 
             ubo_residency = st.selectbox(
                 "3. Where is the beneficial owner (UBO) based?",
-                ["EU", "UK", "US", "Middle East", "Asia", "Other"],
+                UBO_RESIDENCIES,
             )
 
         with col2:
             ownership = st.selectbox(
                 "4a. How will the yacht be owned?",
-                ["Personal name", "Through a company"],
+                OWNERSHIP_TYPES,
             )
 
             if ownership == "Personal name":
@@ -633,12 +332,12 @@ if st.session_state.page == "profile":
 
             jurisdiction = st.selectbox(
                 jlabel,
-                ["— Select —"] + ELIGIBLE_JURISDICTIONS + ["Other (not listed)"],
+                ["— Select —"] + ELIGIBLE_JURISDICTIONS + [OTHER_JURISDICTION],
             )
 
             vessel_stage = st.selectbox(
                 "5. What stage is the vessel at?",
-                ["New build", "Existing vessel, looking to re-flag", "Just researching"],
+                VESSEL_STAGES,
             )
 
         st.markdown('</div>', unsafe_allow_html=True)
@@ -666,14 +365,14 @@ if st.session_state.page == "profile":
                 st.error("Please select a nationality or incorporation jurisdiction.")
             else:
                 jur = jurisdiction if jurisdiction != "Other (not listed)" else "Other (not listed)"
-                st.session_state.profile = {
-                    "vessel_use": vessel_use,
-                    "cruising_area": cruising_area,
-                    "ubo_residency": ubo_residency,
-                    "ownership": ownership,
-                    "jurisdiction": jur,
-                    "vessel_stage": vessel_stage,
-                }
+                st.session_state.profile = Profile(
+                    vessel_use=vessel_use,
+                    cruising_area=cruising_area,
+                    ubo_residency=ubo_residency,
+                    ownership=ownership,
+                    jurisdiction=jur,
+                    vessel_stage=vessel_stage,
+                )
                 st.session_state.page = "assessment"
                 st.rerun()
 
@@ -684,6 +383,12 @@ elif st.session_state.page == "assessment":
 
     st.markdown('<div class="section-header">Step 2 — Rate Your Priorities</div>', unsafe_allow_html=True)
     st.markdown("For each factor, indicate how important it is to your flag decision. 1 = Not important, 5 = Critical.")
+    # Sliders start from the last report's priorities, so going back to
+    # tweak them (or a preset) keeps the rest.
+    for fid, *_ in FACTORS:
+        st.session_state.setdefault(f"imp_{fid}", st.session_state.importances.get(fid, 3))
+    preset_picker(st.session_state.profile)
+    search_panel("search_assessment")
 
     importances = {}
 
@@ -696,7 +401,7 @@ elif st.session_state.page == "assessment":
         for fid, fname, remark in group_factors:
             imp = st.slider(
                 fname,
-                min_value=1, max_value=5, value=3,
+                min_value=1, max_value=5,
                 key=f"imp_{fid}",
                 help=remark[:120] + "..."
             )
@@ -712,7 +417,7 @@ elif st.session_state.page == "assessment":
             st.rerun()
     with col2:
         if st.button("Generate Report →", type="primary", use_container_width=True):
-            st.session_state.importances = importances
+            st.session_state.importances = ImportanceVector.from_dict(importances)
             st.session_state.page = "report"
             st.rerun()
 
@@ -724,8 +429,25 @@ elif st.session_state.page == "report":
     profile = st.session_state.profile
     importances = st.session_state.importances
 
-    final_score, factor_details = compute_score(profile, importances)
-    verdict, verdict_color = get_verdict(final_score)
+    input_hash = assessment_hash(profile, importances)
+    results = get_result_cache()
+    result = results.get_or_compute("assessment", input_hash, lambda: assess(profile, importances))
+    final_score, factor_details = result["final_score"], result["factor_details"]
+    verdict, verdict_color = result["verdict"], result["verdict_color"]
+
+    # Audit each assessment once per session, not on every rerun of this page.
+    if st.session_state.get("audited") != input_hash:
+        get_audit_log().record(input_hash, profile, importances, final_score,
+                               datapack.current().token)
+        st.session_state.audited = input_hash
+        history = [h for h in st.session_state.history if h["hash"] != input_hash]
+        history.append({"hash": input_hash, "time": datetime.now().strftime("%H:%M:%S"),
+                        "profile": profile, "importances": importances, "score": final_score})
+        st.session_state.history = history[-HISTORY_LIMIT:]
+
+    share_token = encode_token(profile, importances)
+    st.session_state.share_token = share_token
+    st.query_params[QUERY_PARAM] = share_token
 
     # ── Score hero ────────────────────────────────────────────────────────────
     st.markdown(f"""
@@ -737,27 +459,84 @@ elif st.session_state.page == "report":
     </div>
     """, unsafe_allow_html=True)
 
-    # ── Group scores (computed early for PDF) ────────────────────────────────
-    group_scores = {}
-    for g, _ in GROUPS:
-        gf = [f for f in factor_details if f["group"] == g]
-        if gf:
-            tw = sum(f["weighted"] for f in gf)
-            mw = sum(f["max_weighted"] for f in gf)
-            group_scores[g] = round((tw / mw) * 100) if mw > 0 else 0
+    group_scores = result["group_scores"]
+
+    # ── Robustness band (optional, included in the PDF when enabled) ─────────
+    robustness = None
+    if st.toggle("Show robustness band (Monte Carlo over your priorities)", key="mc_enabled"):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            mc_spread = st.selectbox("Priority uncertainty (±)", [1, 2], key="mc_spread")
+        with c2:
+            mc_dist = st.selectbox("Distribution", DISTRIBUTIONS, key="mc_dist")
+        with c3:
+            mc_samples = st.selectbox("Samples", [100_000, 1_000_000], index=1,
+                                      format_func=lambda n: f"{n:,}", key="mc_samples")
+        robustness = results.get_or_compute(
+            "robustness", f"{input_hash}:{mc_spread}:{mc_dist}:{mc_samples}",
+            lambda: score_robustness(profile, importances, n_samples=mc_samples,
+                                     spread=mc_spread, distribution=mc_dist))
+
+        pct = robustness["percentiles"]
+        st.markdown(f"""
+        <div class="info-box">
+        With each priority varied by up to ±{mc_spread} ({mc_dist}), your score stays between
+        <strong>{pct[5]}</strong> and <strong>{pct[95]}</strong> in 90% of {robustness['n_samples']:,} samples
+        (median <strong>{pct[50]}</strong>, mean {robustness['mean']:.1f} ± {robustness['std']:.1f}).
+        </div>
+        """, unsafe_allow_html=True)
+
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            hist = robustness["histogram"]
+            lo = max(min(i for i, c in enumerate(hist) if c) - 2, 0)
+            hi = min(max(i for i, c in enumerate(hist) if c) + 2, 100)
+            mc_fig = go.Figure(go.Bar(
+                x=list(range(lo, hi + 1)),
+                y=[c / robustness["n_samples"] for c in hist[lo:hi + 1]],
+                marker=dict(color='#c9a84c'),
+            ))
+            mc_fig.add_vline(x=final_score, line=dict(color='#0d2137', width=2, dash='dot'))
+            mc_fig.update_layout(
+                height=220,
+                margin=dict(l=0, r=20, t=10, b=10),
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(title="Score", tickfont=dict(size=11)),
+                yaxis=dict(tickformat='.0%', showgrid=True, gridcolor='#eee', tickfont=dict(size=11)),
+                font=dict(family='Source Sans 3'),
+            )
+            st.plotly_chart(mc_fig, use_container_width=True)
+        with col2:
+            st.markdown("**Verdict probability**")
+            for band, prob in robustness["verdicts"].items():
+                st.markdown(f"{band} — **{prob:.1%}**")
 
     # ── Download button ───────────────────────────────────────────────────────
-    try:
-        pdf_bytes = generate_pdf(profile, factor_details, final_score, group_scores)
-        st.download_button(
-            label="⬇  Download Full Report (PDF)",
-            data=pdf_bytes,
-            file_name=f"BVI_Flag_Suitability_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
-            mime="application/pdf",
-            use_container_width=False,
-        )
-    except Exception as e:
-        st.warning(f"PDF generation unavailable: {e}")
+    today = datetime.now()
+    pdf_key = pdf_cache_key(input_hash, today)
+    if robustness:
+        pdf_key += f":mc{mc_spread}{mc_dist}{mc_samples}"
+    pdf_args, pdf_kwargs = report_pdf_args(profile, result, robustness, today)
+    # The one-page summary renders in a fraction of the full report's time,
+    # so it is the instant download; the full report is built on request.
+    pdf_download(pdf_key + ":summary", pdf_args, {**pdf_kwargs, "template": "summary"},
+                 label="⬇  Download Summary (PDF, 1 page)",
+                 file_stem="BVI_Flag_Suitability_Summary")
+    st.download_button(
+        label="⬇  Download Report (HTML)",
+        data=html_report(profile, importances),
+        file_name=f"BVI_Flag_Suitability_Report_{datetime.now().strftime('%Y%m%d')}.html",
+        mime="text/html",
+    )
+    if st.session_state.get("full_pdf_key") == pdf_key:
+        pdf_download(pdf_key, pdf_args, pdf_kwargs)
+    elif st.button("Prepare full report (PDF)", key="full_pdf"):
+        st.session_state.full_pdf_key = pdf_key
+        st.rerun()
+
+    st.caption("Share this report — the link reopens it without the questions:")
+    st.code(share_url(share_token, st.context.url, st.query_params.to_dict()), language=None)
 
     st.markdown("<br>", unsafe_allow_html=True)
 
@@ -782,7 +561,7 @@ elif st.session_state.page == "report":
         orientation='h',
         marker=dict(
             color=list(group_scores.values()),
-            colorscale=[[0, '#c0392b'], [0.4, '#e67e22'], [0.7, '#2980b9'], [1.0, '#c9a84c']],
+            colorscale=[list(stop) for stop in SCORE_SCALE],
             cmin=0, cmax=100,
         ),
         text=[f"{v}" for v in group_scores.values()],
@@ -802,18 +581,24 @@ elif st.session_state.page == "report":
 
     # ── Factor detail by group ────────────────────────────────────────────────
     st.markdown('<div class="section-header">Detailed Factor Analysis</div>', unsafe_allow_html=True)
+    # With a search active, only the groups holding a matching factor stay
+    # open and the matches are marked in the factor remarks.
+    matches = search_panel("search_report")
 
     for group_name, group_icon in GROUPS:
         gf = [f for f in factor_details if f["group"] == group_name]
         if not gf:
             continue
 
-        with st.expander(f"{group_icon} {group_name}", expanded=True):
+        expanded = not matches or any(f["id"] in matches for f in gf)
+        with st.expander(f"{group_icon} {group_name}", expanded=expanded):
             for f in gf:
                 col1, col2, col3 = st.columns([3, 1, 1])
                 with col1:
-                    st.markdown(f"**{f['name']}**")
-                    st.markdown(f"<span style='font-size:0.88rem;color:#555;'>{f['remark']}</span>", unsafe_allow_html=True)
+                    hit = matches.get(f["id"])
+                    st.markdown(f"**{f['name']}**" + (" 🔍" if hit else ""))
+                    remark = highlight(f["remark"], hit) if hit else f["remark"]
+                    st.markdown(f"<span style='font-size:0.88rem;color:#555;'>{remark}</span>", unsafe_allow_html=True)
                 with col2:
                     stars = "⭐" * f["bvi_score"] + "☆" * (5 - f["bvi_score"])
                     st.markdown(f"**BVI Rating**<br><span style='font-size:0.9rem;'>{stars}</span>", unsafe_allow_html=True)
@@ -822,20 +607,166 @@ elif st.session_state.page == "report":
                     st.markdown(f"**Your Priority**<br><span style='color:#c9a84c;font-size:0.9rem;'>{imp_bar}</span>", unsafe_allow_html=True)
                 st.markdown("---")
 
-    # ── Special note for EU commercial in EU ─────────────────────────────────
-    if profile["ubo_residency"] == "EU" and profile["vessel_use"] == "Commercial" and profile["cruising_area"] == "EU":
-        st.markdown("""
+    # ── Advisory notes ────────────────────────────────────────────────────────
+    for note in result["notes"]:
+        st.markdown(f"""
         <div class="warning-box">
-        <strong>Note on VAT & flag selection:</strong> For an EU-resident UBO operating commercially within EU waters, an EU flag such as Malta may offer structural VAT advantages that BVI cannot replicate. We recommend discussing your specific tax position with a maritime tax advisor before making a final decision.
+        <strong>{note["title"]}:</strong> {note["text"]}
         </div>
         """, unsafe_allow_html=True)
 
-    if profile["jurisdiction"] == "Other (not listed)":
-        st.markdown("""
-        <div class="warning-box">
-        <strong>Note on eligibility:</strong> Your nationality or incorporation jurisdiction is not directly on the BVI eligible list. Incorporating a BVI company or a company in an eligible jurisdiction resolves this — BVI's corporate registry makes this a straightforward and cost-effective step.
-        </div>
-        """, unsafe_allow_html=True)
+    # ── What-if analysis ──────────────────────────────────────────────────────
+    st.markdown('<div class="section-header">What-If Analysis</div>', unsafe_allow_html=True)
+    st.markdown("How your score would change with a different answer to each profile question, "
+                "and which priorities move it the most.")
+
+    base_score, whatif_rows = results.get_or_compute(
+        "chart", f"{input_hash}:whatif", lambda: what_if(profile, importances))
+    questions = [(key, label) for key, label, _ in WHATIF_QUESTIONS]
+    width = max(len(options) for _, _, options in WHATIF_QUESTIONS)
+    z = [[None] * width for _ in questions]
+    text = [[""] * width for _ in questions]
+    qi = {key: i for i, (key, _) in enumerate(questions)}
+    col = {key: 0 for key, _ in questions}
+    for r in whatif_rows:
+        i, j = qi[r["question"]], col[r["question"]]
+        z[i][j] = r["delta"]
+        text[i][j] = f"{'● ' if r['current'] else ''}{r['option']}<br>{r['delta']:+d}"
+        col[r["question"]] += 1
+
+    whatif_fig = go.Figure(go.Heatmap(
+        z=z,
+        y=[label for _, label in questions],
+        text=text,
+        texttemplate="%{text}",
+        textfont=dict(size=10),
+        hovertemplate="%{y}: %{text}<extra></extra>",
+        colorscale=[[0, '#c0392b'], [0.5, '#f8f6f1'], [1.0, '#c9a84c']],
+        zmid=0,
+        showscale=False,
+        xgap=3, ygap=3,
+    ))
+    whatif_fig.update_layout(
+        height=360,
+        margin=dict(l=0, r=20, t=10, b=10),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(visible=False),
+        yaxis=dict(autorange='reversed', tickfont=dict(size=12, family='Source Sans 3')),
+        font=dict(family='Source Sans 3'),
+    )
+    st.plotly_chart(whatif_fig, use_container_width=True)
+
+    # Verdicts above the current one, nearest first.
+    better = [name for threshold, name, _ in reversed(VERDICT_BANDS) if threshold > final_score]
+    if better:
+        st.markdown("**Smallest change to a better verdict**")
+        target = st.selectbox("Target verdict", better, key="advisor_target",
+                              label_visibility="collapsed")
+        solutions = minimal_changes(profile, importances, target)
+        if not solutions:
+            st.caption(f"No change of profile answers reaches {target} with these priorities.")
+        for sol in solutions:
+            steps = " and ".join(f"{label}: {old} → **{new}**" for _, label, old, new in sol["changes"])
+            st.markdown(f"{steps} — score **{sol['score']}** ({sol['verdict']})")
+
+    with st.expander("Factor sensitivity — score change per +1 importance", expanded=False):
+        for m in marginal_contributions(profile, importances):
+            color = "#2e7d32" if m["marginal"] >= 0 else "#c62828"
+            st.markdown(
+                f"**{m['name']}** <span style='color:#8a9bb0;font-size:0.85rem;'>{m['group']}</span>"
+                f"<span style='float:right;color:{color};font-weight:600;'>{m['marginal']:+.2f}</span>",
+                unsafe_allow_html=True,
+            )
+
+    # ── Compare with an earlier assessment ────────────────────────────────────
+    with st.expander("Compare with an earlier assessment", expanded=False):
+        earlier = [h for h in st.session_state.history if h["hash"] != input_hash][::-1]
+        if earlier:
+            # "Score then" is the score shown at the time, kept in the session
+            # history; the rows are built once per assessment and history.
+            compare_key = (input_hash, datapack.current().token, tuple(h["hash"] for h in earlier))
+            if st.session_state.get("compare_rows", (None,))[0] != compare_key:
+                past = AssessmentHistory.from_assessments([h["profile"] for h in earlier],
+                                                          [h["importances"] for h in earlier])
+                deltas = diff_history(profile, factor_details, past)
+                st.session_state.compare_rows = (compare_key, [{
+                    "Assessed": h["time"],
+                    "Score then": h["score"],
+                    "Change": final_score - h["score"],
+                    "Answers changed": int(answers),
+                    "Priorities changed": int(priorities),
+                } for h, answers, priorities in zip(
+                    earlier, deltas["answers_changed"], deltas["importances_changed"])])
+            rows = st.session_state.compare_rows[1]
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            choice = st.selectbox(
+                "Compare with", range(len(earlier)),
+                format_func=lambda i: f"{earlier[i]['time']} — score {earlier[i]['score']}",
+                key="compare_choice")
+            old_profile, old_importances = earlier[choice]["profile"], earlier[choice]["importances"]
+        else:
+            st.caption("Assessments you run in this session appear here. "
+                       "To compare with an older one, paste its report link.")
+            old_profile = None
+        pasted = st.text_input("…or paste a report link", key="compare_link",
+                               placeholder="https://…?r=…")
+        if pasted.strip():
+            try:
+                old_profile, old_importances = decode_token(link_token(pasted))
+            except InvalidToken as e:
+                st.warning(f"That report link could not be read ({e}).")
+                old_profile = None
+        if old_profile is not None:
+            comparison(old_profile, old_importances, profile, result)
+
+    # ── Fleet assessment ──────────────────────────────────────────────────────
+    with st.expander("Fleet assessment — several vessels, one owner", expanded=False):
+        st.caption(f"Every vessel is scored with your priorities and UBO residency "
+                   f"({profile['ubo_residency']}). Add a row per vessel.")
+        jurisdictions = ELIGIBLE_JURISDICTIONS + [OTHER_JURISDICTION]
+        fleet_rows = st.data_editor(
+            pd.DataFrame([{"name": "This vessel", **{k: profile[k] for k in VESSEL_FIELDS}}]),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "name": st.column_config.TextColumn("Vessel", required=True),
+                "vessel_use": st.column_config.SelectboxColumn("Use", options=VESSEL_USES, required=True),
+                "cruising_area": st.column_config.SelectboxColumn("Cruising area", options=CRUISING_AREAS, required=True),
+                "ownership": st.column_config.SelectboxColumn("Ownership", options=OWNERSHIP_TYPES, required=True),
+                "jurisdiction": st.column_config.SelectboxColumn("Jurisdiction", options=jurisdictions, required=True),
+                "vessel_stage": st.column_config.SelectboxColumn("Stage", options=VESSEL_STAGES, required=True),
+            },
+            key="fleet_editor",
+        )
+        vessels = [
+            (row["name"], {**{k: row[k] for k in VESSEL_FIELDS}, "ubo_residency": profile["ubo_residency"]})
+            for row in fleet_rows.to_dict("records")
+            if all(isinstance(row[k], str) and row[k] for k in ("name", *VESSEL_FIELDS))
+        ]
+        if len(vessels) > 1:
+            fleet = score_fleet(vessels, importances)
+            st.dataframe(
+                pd.DataFrame([{
+                    "Vessel": row["name"],
+                    "Score": row["final_score"],
+                    "Verdict": row["verdict"],
+                    "Outlier": f"{row['outlier']} median" if row["outlier"] else "",
+                } for row in fleet["vessels"]]),
+                use_container_width=True,
+                hide_index=True,
+            )
+            st.markdown(f"Fleet average **{fleet['average_score']:.1f}**, "
+                        f"median **{fleet['median_score']:g}**")
+            st.markdown("  \n".join(f"{group}: **{avg:.0f}**"
+                                     for group, avg in fleet["group_averages"].items()))
+            pdf_download(pdf_cache_key("fleet:" + fleet_hash(vessels, importances), today),
+                         (fleet,), {"compact": True, "date": today},
+                         label="⬇  Download Fleet Report (PDF)",
+                         file_stem="BVI_Flag_Fleet_Report", render=generate_fleet_pdf)
+        else:
+            st.caption("Add at least one more vessel to compare the fleet.")
 
     # ── CTA ───────────────────────────────────────────────────────────────────
     st.markdown("""
@@ -928,3 +859,18 @@ elif st.session_state.page == "report":
         </a>
     </div>
     """, unsafe_allow_html=True)
+
+# ── Profiling panel ───────────────────────────────────────────────────────────
+profiling.finish(profile_run)
+if profiling.ENABLED:
+    with st.sidebar.expander("Profiling", expanded=True):
+        st.caption("Means per completed rerun / call — ms and KiB.")
+        st.dataframe(pd.DataFrame(profiling.stats()).T.round(1), use_container_width=True)
+        st.caption("PDF render pool — latencies in ms.")
+        st.dataframe(pd.Series({
+            k: round(v * 1000, 1) if k.endswith(("_p50", "_p95")) and v is not None else v
+            for k, v in get_render_pool().stats().items()
+        }, name="value"), use_container_width=True)
+        if st.button("Dump top allocations", key="profiling_dump"):
+            st.caption(f"Written to {profiling.dump()}")
+            st.dataframe(pd.DataFrame(profiling.top_allocations()), use_container_width=True)
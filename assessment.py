@@ -0,0 +1,59 @@
+import hashlib
+import json
+from datetime import datetime
+
+import datapack
+from scoring import get_verdict
+from advisory import advisory_notes
+from models import Profile, ScoreResult
+
+# ── Assessment ────────────────────────────────────────────────────────────────
+# One cached bundle per (data pack, profile, importances): the score, factor
+# details (a ScoreResult), group scores, verdict and advisory notes that the
+# report page and every renderer consume. Entries are shared between
+# sessions, so callers must treat them as read-only.
+
+def assessment_key(profile, importances):
+    """Hashable, order-independent key for a profile and importance dict."""
+    return (
+        tuple(sorted((f, profile.get(f)) for f in datapack.PROFILE_FIELDS)),
+        tuple(sorted(importances.items())),
+    )
+
+def assessment_hash(profile, importances):
+    """Stable short hash of the inputs and the data pack that scored them."""
+    profile_items, importance_items = assessment_key(profile, importances)
+    payload = json.dumps([datapack.current().token, profile_items, importance_items])
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+@datapack.pack_cached(maxsize=4096)
+def _assess(pack, profile_items, importance_items):
+    profile = Profile.from_dict(dict(profile_items))
+    result = ScoreResult.compute(profile, dict(importance_items), pack)
+    verdict, verdict_color = get_verdict(result.final_score)
+    return {
+        "final_score": result.final_score,
+        "factor_details": result,
+        "group_scores": result.group_scores,
+        "verdict": verdict,
+        "verdict_color": verdict_color,
+        "notes": advisory_notes(profile),
+        "data_version": pack.version,
+    }
+
+def assess(profile, importances):
+    return _assess(*assessment_key(profile, importances))
+
+def report_pdf_args(profile, result, robustness=None, date=None):
+    """(args, kwargs) for generate_pdf as the report page renders an
+    assessment, dated `date` (default today)."""
+    return (
+        (profile, result["factor_details"], result["final_score"], result["group_scores"]),
+        {"robustness": robustness, "notes": result["notes"], "compact": True, "budget": None,
+         "date": date or datetime.now()},
+    )
+
+def pdf_cache_key(input_hash, date):
+    """Render pool / result cache key for an assessment's PDFs. A PDF carries
+    its date, so a cached one is only reused on the day it is dated."""
+    return f"{input_hash}:{date:%Y%m%d}"
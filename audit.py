@@ -0,0 +1,165 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from scoring import ENGINE_VERSION
+
+# ── Assessment audit log ──────────────────────────────────────────────────────
+# Every assessment shown on the report page is appended to a JSONL file as
+# one event: input hash, profile, importances, final score, engine version,
+# data pack token and UTC time. record() only appends a tuple to a deque, so
+# the rerun pays a few microseconds; a background thread serializes and
+# writes whatever is queued every FLUSH_INTERVAL seconds, or sooner once
+# BATCH_SIZE events are waiting. Files are never truncated or deleted:
+# when the active file would pass MAX_BYTES it is renamed with a UTC
+# timestamp and a new one is started, mid-batch if need be. A failed write
+# keeps its batch queued for the next attempt, and close() — also run at
+# interpreter exit — drains the queue, so no event is lost on a clean
+# shutdown.
+#
+# Fsync policies: "batch" fsyncs after every write (the default), "rotate"
+# only when a file is closed, and "none" leaves it to the OS.
+
+AUDIT_DIR = os.environ.get("BVI_AUDIT_DIR", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "audit"))
+AUDIT_FILE = "assessments.jsonl"
+MAX_BYTES = int(os.environ.get("BVI_AUDIT_MAX_BYTES", 64 * 1024 * 1024))
+FSYNC = os.environ.get("BVI_AUDIT_FSYNC", "batch")
+FSYNC_POLICIES = ("batch", "rotate", "none")
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+
+def _event(entry):
+    ts, input_hash, profile, importances, final_score, data = entry
+    return {
+        "time": datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds"),
+        "hash": input_hash,
+        "profile": dict(profile),
+        "importances": dict(importances),
+        "final_score": final_score,
+        "engine": ENGINE_VERSION,
+        "data": data,
+    }
+
+class AuditLog:
+    def __init__(self, directory=None, max_bytes=MAX_BYTES, fsync=FSYNC,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync!r}")
+        self.directory = directory or AUDIT_DIR
+        self.path = os.path.join(self.directory, AUDIT_FILE)
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.rotations = 0
+        self.errors = 0
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, input_hash, profile, importances, final_score, data):
+        """Queue one assessment; profile and importances must not be mutated later."""
+        self._pending.append((time.time(), input_hash, profile, importances, final_score, data))
+        if self._closed:
+            self.flush()
+        elif len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+
+    def _close_file(self):
+        if self.fsync != "none":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def _rotate(self):
+        self._close_file()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        base, ext = os.path.splitext(self.path)
+        target, n = f"{base}-{stamp}{ext}", 1
+        while os.path.exists(target):
+            n += 1
+            target = f"{base}-{stamp}-{n}{ext}"
+        os.rename(self.path, target)
+        self.rotations += 1
+        self._open()
+
+    def _write(self, lines):
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        if self.fsync == "batch":
+            os.fsync(self._file.fileno())
+
+    def flush(self):
+        """Write everything queued so far; returns the number of events written."""
+        with self._write_lock:
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return 0
+            lines = [json.dumps(_event(e), separators=(",", ":")).encode("utf-8") + b"\n"
+                     for e in batch]
+            try:
+                if self._file is None:
+                    self._open()
+                chunk, size = [], self._file.tell()
+                for line in lines:
+                    if size and size + len(line) > self.max_bytes:
+                        self._write(chunk)
+                        self._rotate()
+                        chunk, size = [], 0
+                    chunk.append(line)
+                    size += len(line)
+                self._write(chunk)
+                if self._closed:
+                    self._close_file()
+            except OSError as e:
+                # Retry from the same events; a partly written batch is
+                # re-sent whole, so readers may see a duplicate line.
+                self._pending.extendleft(reversed(batch))
+                self.errors += 1
+                print(f"audit: write to {self.path} failed, {len(self._pending)} events queued: {e}",
+                      file=sys.stderr)
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return 0
+            self.written += len(batch)
+            return len(batch)
+
+    def close(self):
+        """Stop the writer and drain the queue. Later records are written synchronously."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._close_file()
+        atexit.unregister(self.close)
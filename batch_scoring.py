@@ -0,0 +1,76 @@
+import numpy as np
+from collections import namedtuple
+
+import datapack
+from scoring import VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, get_vat_score
+from models import ImportanceVector
+
+# ── Array form of the FACTORS / VAT_MATRIX model ──────────────────────────────
+# Every factor score is a small integer and every weighted total fits easily
+# in a float64 mantissa, so the float arithmetic below is exact and rounds the
+# same way as compute_score's round((total / max) * 100).
+
+CompiledModel = namedtuple("CompiledModel", [
+    "pack", "factor_ids", "vat_col", "eligibility_col", "factor_group",
+    "base", "vat", "onehot",
+])
+
+@datapack.pack_cached(maxsize=1)
+def compiled_model(pack):
+    """Base scores, dense VAT cube and factor→group one-hot matrix."""
+    factor_ids = [f[0] for f in pack.factors]
+    group_names = [g for g, _ in pack.groups]
+    factor_group = np.array([group_names.index(f[3]) for f in pack.factors])
+    base = np.array([f[2] for f in pack.factors], dtype=np.float64)
+    vat = np.array([
+        [[get_vat_score(u, v, a, pack) for a in CRUISING_AREAS] for v in VESSEL_USES]
+        for u in UBO_RESIDENCIES
+    ], dtype=np.float64)
+    onehot = np.eye(len(group_names), dtype=np.float64)[factor_group]
+    return CompiledModel(
+        pack, factor_ids, factor_ids.index("vat_tariff"), factor_ids.index("eligibility"),
+        factor_group, base, vat, onehot,
+    )
+
+def encode_profile(profile):
+    """(ubo, use, area, eligible) indices for one profile dict."""
+    return (
+        UBO_RESIDENCIES.index(profile["ubo_residency"]),
+        VESSEL_USES.index(profile["vessel_use"]),
+        CRUISING_AREAS.index(profile["cruising_area"]),
+        profile["jurisdiction"] in compiled_model().pack.eligible_set,
+    )
+
+def importance_vector(importances):
+    m = compiled_model()
+    if isinstance(importances, ImportanceVector) and importances.factor_ids == tuple(m.factor_ids):
+        return importances.as_array().astype(np.float64)
+    return np.array([importances.get(fid, 3) for fid in m.factor_ids], dtype=np.float64)
+
+def factor_score_matrix(ubo, use, area, eligible):
+    """BVI factor scores for N encoded profiles, shape (N, n_factors)."""
+    m = compiled_model()
+    ubo, use, area, eligible = np.broadcast_arrays(
+        np.asarray(ubo), np.asarray(use), np.asarray(area), np.asarray(eligible))
+    bvi = np.tile(m.base, (ubo.size, 1))
+    bvi[:, m.vat_col] = m.vat[ubo.ravel(), use.ravel(), area.ravel()]
+    bvi[:, m.eligibility_col] = np.where(eligible.ravel(), float(m.pack.eligible_score),
+                                         float(m.pack.ineligible_score))
+    return bvi
+
+def batch_final_scores(bvi, imp):
+    """Final scores for broadcastable (..., n_factors) score and importance arrays."""
+    tw = np.einsum("...j,...j->...", bvi, imp)
+    mw = 5.0 * np.sum(imp, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.round((tw / mw) * 100)
+    return np.where(mw > 0, scores, 0).astype(np.int64)
+
+def batch_group_scores(bvi, imp):
+    """Group scores in GROUPS order, shape (..., n_groups)."""
+    onehot = compiled_model().onehot
+    tw = (bvi * imp) @ onehot
+    mw = (5.0 * imp) @ onehot
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.round((tw / mw) * 100)
+    return np.where(mw > 0, scores, 0).astype(np.int64)
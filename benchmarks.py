@@ -0,0 +1,107 @@
+import itertools
+import statistics
+import sys
+import time
+import tracemalloc
+
+from scoring import (
+    VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OTHER_JURISDICTION,
+    compute_score, compute_group_scores,
+)
+from pdf_report import generate_pdf, COMPACT_BYTE_BUDGET
+from html_report import generate_html
+from robustness import score_robustness
+from models import Profile, ImportanceVector, ScoreResult
+
+# ── PDF benchmark ─────────────────────────────────────────────────────────────
+# Renders one report per vessel use × cruising area × UBO residency (half of
+# them with a robustness band and the unlisted-jurisdiction note) as a full
+# report in both output modes and as a compact one-page summary, prints render
+# time and size (with the HTML export alongside for comparison), and fails if
+# any compact report is over COMPACT_BYTE_BUDGET.
+#
+#   python benchmarks.py
+
+def bench_profiles():
+    for i, (use, area, ubo) in enumerate(itertools.product(VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES)):
+        profile = {
+            "vessel_use": use, "cruising_area": area, "ubo_residency": ubo,
+            "ownership": "Through a company", "vessel_stage": "New build",
+            "jurisdiction": OTHER_JURISDICTION if i % 2 else "British Virgin Islands",
+        }
+        importances = {"cost": 1 + i % 5, "vat_tariff": 5 - i % 5}
+        yield profile, importances, i % 2 == 1
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(int(p / 100 * len(values)), len(values) - 1)]
+
+MODES = {
+    "default": {"compact": False},
+    "compact": {"compact": True},
+    "summary": {"compact": True, "template": "summary"},
+}
+
+def bench_pdf():
+    results = {mode: ([], []) for mode in [*MODES, "html"]}
+    for profile, importances, with_band in bench_profiles():
+        final_score, factor_details = compute_score(profile, importances)
+        group_scores = compute_group_scores(factor_details)
+        robustness = score_robustness(profile, importances, n_samples=100_000) if with_band else None
+        for mode, options in MODES.items():
+            start = time.perf_counter()
+            pdf = generate_pdf(profile, factor_details, final_score, group_scores,
+                               robustness=robustness, budget=None, **options)
+            times, sizes = results[mode]
+            times.append(time.perf_counter() - start)
+            sizes.append(len(pdf))
+        start = time.perf_counter()
+        html = generate_html(profile, factor_details, final_score, group_scores).encode()
+        results["html"][0].append(time.perf_counter() - start)
+        results["html"][1].append(len(html))
+
+    for mode, (times, sizes) in results.items():
+        print(f"{mode:>8}: {len(sizes)} reports  "
+              f"render p50 {pct(times, 50) * 1000:.1f} ms  p95 {pct(times, 95) * 1000:.1f} ms  "
+              f"size mean {statistics.mean(sizes):,.0f} B  max {max(sizes):,} B")
+    largest = max(max(results["compact"][1]), max(results["summary"][1]))
+    ok = largest <= COMPACT_BYTE_BUDGET
+    print(f"compact budget {COMPACT_BYTE_BUDGET:,} B: {'ok' if ok else 'EXCEEDED'} (largest {largest:,} B)")
+    return ok
+
+# ── Session memory ────────────────────────────────────────────────────────────
+# Bytes per live session for the profile, importances and scored factors, as
+# plain dicts (compute_score output) versus Profile / ImportanceVector /
+# ScoreResult. Factor metadata is shared by both and not counted.
+
+def _allocated(build, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / n
+
+def bench_memory(n=2000):
+    cases = list(bench_profiles())
+
+    def as_dicts(i):
+        profile, importances, _ = cases[i % len(cases)]
+        profile = dict(profile)
+        importances = {f: importances.get(f, 3) for f in ImportanceVector.from_dict({})}
+        return profile, importances, compute_score(profile, importances)[1]
+
+    def as_records(i):
+        profile, importances, _ = cases[i % len(cases)]
+        profile = Profile.from_dict(profile)
+        importances = ImportanceVector.from_dict(importances)
+        return profile, importances, ScoreResult.compute(profile, importances)
+
+    old, new = _allocated(as_dicts, n), _allocated(as_records, n)
+    print(f"  memory: {n} sessions  dicts {old:,.0f} B/session  records {new:,.0f} B/session "
+          f"({1 - new / old:.0%} less)")
+
+if __name__ == "__main__":
+    bench_memory()
+    sys.exit(0 if bench_pdf() else 1)
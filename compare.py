@@ -0,0 +1,91 @@
+import numpy as np
+
+from datapack import PROFILE_FIELDS
+from scoring import get_verdict
+from batch_scoring import compiled_model, encode_profile
+
+# ── Assessment diff ───────────────────────────────────────────────────────────
+# What moved between two scored assessments: the answers, the priorities,
+# the factor ratings, and the category and final scores. Results are
+# ScoreResults, so factors are compared as byte arrays, not by scanning
+# factor dicts. Two results from the same data pack share one factor order
+# and are compared position by position. Otherwise factors are aligned by id
+# and categories by name, and a factor or category only one side has shows
+# None on the other.
+#
+# diff_history() compares one result against every row of an
+# AssessmentHistory at once. It gives one row per earlier assessment with the
+# score deltas and how many answers and priorities changed.
+
+def _align(old_ids, new_ids):
+    """(ids, old positions, new positions); -1 where a side lacks the id."""
+    if old_ids == new_ids:
+        positions = np.arange(len(new_ids))
+        return new_ids, positions, positions
+    new_set = set(new_ids)
+    ids = tuple(new_ids) + tuple(i for i in old_ids if i not in new_set)
+    old_pos = {i: n for n, i in enumerate(old_ids)}
+    new_pos = {i: n for n, i in enumerate(new_ids)}
+    return (ids, np.array([old_pos.get(i, -1) for i in ids]),
+            np.array([new_pos.get(i, -1) for i in ids]))
+
+def _take(values, positions):
+    values = np.asarray(values, dtype=np.int16)
+    if not len(values):
+        return np.full(len(positions), -1, dtype=np.int16)
+    return np.where(positions >= 0, values[np.maximum(positions, 0)], -1)
+
+def _changes(ids, before, after):
+    changed = np.flatnonzero(before != after)
+    return {ids[i]: (None if before[i] < 0 else int(before[i]),
+                     None if after[i] < 0 else int(after[i])) for i in changed}
+
+def diff_assessments(old_profile, old, new_profile, new):
+    """Differences from `old` to `new` (ScoreResults, with their profiles).
+
+    Returns a dict of (before, after) pairs: "answers" by profile field,
+    "importances" and "scores" by factor id and "groups" by category, each
+    holding only what changed, plus "final" and "verdict".
+    """
+    old_ids, new_ids = old.importances.factor_ids, new.importances.factor_ids
+    ids, old_pos, new_pos = _align(old_ids, new_ids)
+    groups, old_g, new_g = _align(old.groups, new.groups)
+    return {
+        "answers": {f: (old_profile.get(f), new_profile.get(f)) for f in PROFILE_FIELDS
+                    if old_profile.get(f) != new_profile.get(f)},
+        "importances": _changes(ids, _take(old.importances.as_array(), old_pos),
+                                _take(new.importances.as_array(), new_pos)),
+        "scores": _changes(ids, _take(old.scores, old_pos), _take(new.scores, new_pos)),
+        "groups": _changes(groups, _take(old.group_values, old_g), _take(new.group_values, new_g)),
+        "final": (old.final_score, new.final_score),
+        "verdict": (get_verdict(old.final_score)[0], get_verdict(new.final_score)[0]),
+    }
+
+def is_unchanged(d):
+    return not (d["answers"] or d["importances"] or d["scores"] or d["groups"]
+                or d["final"][0] != d["final"][1])
+
+def diff_history(profile, result, history):
+    """`result` against every row of an AssessmentHistory scored with the
+    current pack.
+
+    Returns a dict of arrays with one entry per row: "final_delta" and
+    "group_delta" (rows × result.groups) as now minus then, and
+    "answers_changed" / "importances_changed" counts. Only the answers that
+    move the score (UBO residency, use, cruising area and jurisdiction
+    eligibility) are stored in a history, so only those are counted.
+    """
+    m = compiled_model()
+    pack_groups = [g for g, _ in m.pack.groups]
+    present = [pack_groups.index(g) for g in result.groups]
+    ubo, use, area, eligible = encode_profile(profile)
+    answers_changed = ((history.ubo != ubo).astype(np.int8) + (history.use != use)
+                       + (history.area != area) + (history.eligible != eligible))
+    importances = result.importances.as_array().astype(np.int8)
+    return {
+        "final_delta": result.final_score - history.final_score.astype(np.int16),
+        "group_delta": (np.frombuffer(result.group_values, dtype=np.uint8).astype(np.int16)
+                        - history.group_scores[:, present]),
+        "answers_changed": answers_changed,
+        "importances_changed": (history.importances != importances).sum(axis=1),
+    }
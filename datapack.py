@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from functools import lru_cache, wraps
+
+# ── Factor data pack ──────────────────────────────────────────────────────────
+# FACTORS, VAT_MATRIX, GROUPS, ELIGIBLE_JURISDICTIONS, the advisory-note
+# rules and the persona presets live in data/factor_pack.json.
+# `python datapack.py build` validates it and writes data/factor_pack.bin
+# (checksummed, zlib-compressed JSON of the validated pack), which is what
+# running workers load. The compiled form is data only, not a pickle: it is
+# shipped and hot-reloaded, and loading it must never run code. A compiled
+# pack that is corrupt or in an older format is skipped in favour of the JSON
+# source. The pack is loaded on first use and reloaded when either file's
+# mtime changes, so a new pack can be dropped in without restarting
+# Streamlit.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SOURCE_PATH = os.environ.get("BVI_DATA_PACK", os.path.join(DATA_DIR, "factor_pack.json"))
+COMPILED_PATH = os.path.splitext(SOURCE_PATH)[0] + ".bin"
+MAGIC = b"BVIPACK2"
+RELOAD_CHECK_INTERVAL = 2.0  # seconds between mtime checks
+
+SCORE_RANGE = range(0, 6)
+DYNAMIC_FACTORS = ("vat_tariff", "eligibility")
+PROFILE_FIELDS = ("vessel_use", "cruising_area", "ubo_residency", "ownership",
+                  "jurisdiction", "vessel_stage")
+
+# ── Profile options ───────────────────────────────────────────────────────────
+# The answers the questionnaire offers (re-exported by scoring). They live
+# here so validate() can check the answers advisory notes and presets name.
+
+VESSEL_USES = ["Pleasure", "Occasional Charter", "Commercial"]
+CRUISING_AREAS = ["Caribbean", "Mediterranean", "Middle East", "USA", "Asia", "Global"]
+UBO_RESIDENCIES = ["EU", "UK", "US", "Middle East", "Asia", "Other"]
+OWNERSHIP_TYPES = ["Personal name", "Through a company"]
+VESSEL_STAGES = ["New build", "Existing vessel, looking to re-flag", "Just researching"]
+OTHER_JURISDICTION = "Other (not listed)"
+
+class DataPackError(ValueError):
+    pass
+
+class DataPack:
+    __slots__ = ("version", "digest", "token", "groups", "factors", "vat_matrix",
+                 "eligible_jurisdictions", "eligible_set", "vat_default",
+                 "eligible_score", "ineligible_score", "advisory_notes", "presets")
+
+    def __init__(self, raw, digest):
+        self.version = raw["version"]
+        self.digest = digest
+        self.token = f"{self.version}:{digest[:12]}"
+        self.groups = [(g["name"], g["icon"]) for g in raw["groups"]]
+        self.factors = [
+            (f["id"], f["name"], f["base_score"], f["group"], f["remark"])
+            for f in raw["factors"]
+        ]
+        self.vat_matrix = {
+            (ubo, use, area): score
+            for ubo, uses in raw["vat_matrix"].items()
+            for use, areas in uses.items()
+            for area, score in areas.items()
+        }
+        listed = [j for group in raw["eligible_jurisdictions"].values() for j in group]
+        self.eligible_jurisdictions = sorted(set(listed))
+        self.eligible_set = frozenset(listed)
+        self.vat_default = raw["scores"]["vat_default"]
+        self.eligible_score = raw["scores"]["eligible"]
+        self.ineligible_score = raw["scores"]["ineligible"]
+        self.advisory_notes = tuple(raw.get("advisory_notes", ()))
+        self.presets = tuple(raw.get("presets", ()))
+
+    def __hash__(self):
+        return hash(self.token)
+
+    def __eq__(self, other):
+        return isinstance(other, DataPack) and other.token == self.token
+
+    def __repr__(self):
+        return f"<DataPack {self.token}>"
+
+# ── Validation ────────────────────────────────────────────────────────────────
+
+def _require(cond, msg):
+    if not cond:
+        raise DataPackError(msg)
+
+def _is_score(v):
+    return isinstance(v, int) and not isinstance(v, bool) and v in SCORE_RANGE
+
+def validate(raw):
+    """Check a decoded pack against the expected schema; raises DataPackError."""
+    _require(isinstance(raw, dict), "pack must be an object")
+    for key in ("version", "scores", "groups", "factors", "vat_matrix", "eligible_jurisdictions"):
+        _require(key in raw, f"missing key: {key}")
+    _require(isinstance(raw["version"], str) and raw["version"], "version must be a non-empty string")
+
+    _require(isinstance(raw["scores"], dict), "scores must be an object")
+    for key in ("vat_default", "eligible", "ineligible"):
+        _require(_is_score(raw["scores"].get(key)), f"scores.{key} must be an integer 0-5")
+
+    groups = raw["groups"]
+    _require(isinstance(groups, list) and groups, "groups must be a non-empty list")
+    for i, g in enumerate(groups):
+        _require(isinstance(g, dict), f"groups[{i}] must be an object")
+    names = [g.get("name") for g in groups]
+    _require(all(isinstance(n, str) and n for n in names), "every group needs a name")
+    _require(len(set(names)) == len(names), "duplicate group name")
+    _require(all(isinstance(g.get("icon"), str) for g in groups), "every group needs an icon")
+
+    factors = raw["factors"]
+    _require(isinstance(factors, list) and factors, "factors must be a non-empty list")
+    ids = []
+    for i, f in enumerate(factors):
+        _require(isinstance(f, dict), f"factors[{i}] must be an object")
+        for key in ("id", "name", "group", "remark"):
+            _require(isinstance(f.get(key), str) and f[key], f"factors[{i}].{key} must be a non-empty string")
+        _require(_is_score(f.get("base_score")), f"factors[{i}].base_score must be an integer 0-5")
+        _require(f["group"] in names, f"factors[{i}].group '{f['group']}' is not a declared group")
+        ids.append(f["id"])
+    _require(len(set(ids)) == len(ids), "duplicate factor id")
+    for fid in DYNAMIC_FACTORS:
+        _require(fid in ids, f"missing required factor: {fid}")
+
+    vat = raw["vat_matrix"]
+    _require(isinstance(vat, dict), "vat_matrix must be an object")
+    for ubo, uses in vat.items():
+        _require(ubo in UBO_RESIDENCIES, f"vat_matrix.{ubo} is not a ubo_residency option")
+        _require(isinstance(uses, dict), f"vat_matrix.{ubo} must be an object")
+        for use, areas in uses.items():
+            _require(use in VESSEL_USES, f"vat_matrix.{ubo}.{use} is not a vessel_use option")
+            _require(isinstance(areas, dict), f"vat_matrix.{ubo}.{use} must be an object")
+            for area, score in areas.items():
+                _require(area in CRUISING_AREAS, f"vat_matrix.{ubo}.{use}.{area} is not a cruising_area option")
+                _require(_is_score(score), f"vat_matrix.{ubo}.{use}.{area} must be an integer 0-5")
+
+    jur = raw["eligible_jurisdictions"]
+    _require(isinstance(jur, dict), "eligible_jurisdictions must be an object of named lists")
+    for name, members in jur.items():
+        _require(isinstance(members, list) and all(isinstance(j, str) and j for j in members),
+                 f"eligible_jurisdictions.{name} must be a list of names")
+    options = {
+        "vessel_use": VESSEL_USES,
+        "cruising_area": CRUISING_AREAS,
+        "ubo_residency": UBO_RESIDENCIES,
+        "ownership": OWNERSHIP_TYPES,
+        "jurisdiction": [j for members in jur.values() for j in members] + [OTHER_JURISDICTION],
+        "vessel_stage": VESSEL_STAGES,
+    }
+
+    notes = raw.get("advisory_notes", [])
+    _require(isinstance(notes, list), "advisory_notes must be a list")
+    note_ids = []
+    for i, note in enumerate(notes):
+        _require(isinstance(note, dict), f"advisory_notes[{i}] must be an object")
+        for key in ("id", "title", "text"):
+            _require(isinstance(note.get(key), str) and note[key], f"advisory_notes[{i}].{key} must be a non-empty string")
+        when = note.get("when", {})
+        _require(isinstance(when, dict), f"advisory_notes[{i}].when must be an object")
+        for field, value in when.items():
+            _require(field in PROFILE_FIELDS, f"advisory_notes[{i}].when.{field} is not a profile field")
+            values = value if isinstance(value, list) else [value]
+            _require(values and all(isinstance(v, str) for v in values),
+                     f"advisory_notes[{i}].when.{field} must be a string or list of strings")
+            for v in values:
+                _require(v in options[field], f"advisory_notes[{i}].when.{field} '{v}' is not a {field} option")
+        note_ids.append(note["id"])
+    _require(len(set(note_ids)) == len(note_ids), "duplicate advisory note id")
+
+    presets = raw.get("presets", [])
+    _require(isinstance(presets, list), "presets must be a list")
+    preset_ids = []
+    for i, preset in enumerate(presets):
+        _require(isinstance(preset, dict), f"presets[{i}] must be an object")
+        for key in ("id", "name", "description"):
+            _require(isinstance(preset.get(key), str) and preset[key], f"presets[{i}].{key} must be a non-empty string")
+        profile = preset.get("profile", {})
+        _require(isinstance(profile, dict), f"presets[{i}].profile must be an object")
+        for field, value in profile.items():
+            _require(field in PROFILE_FIELDS, f"presets[{i}].profile.{field} is not a profile field")
+            _require(isinstance(value, str) and value, f"presets[{i}].profile.{field} must be a string")
+            _require(value in options[field], f"presets[{i}].profile.{field} '{value}' is not a {field} option")
+        importances = preset.get("importances")
+        _require(isinstance(importances, dict), f"presets[{i}].importances must be an object")
+        for fid, value in importances.items():
+            _require(fid in ids, f"presets[{i}].importances.{fid} is not a factor id")
+            _require(isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= 5,
+                     f"presets[{i}].importances.{fid} must be an integer 1-5")
+        preset_ids.append(preset["id"])
+    _require(len(set(preset_ids)) == len(preset_ids), "duplicate preset id")
+    return raw
+
+# ── Build / load ──────────────────────────────────────────────────────────────
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def load_source(path=SOURCE_PATH):
+    with open(path, "rb") as f:
+        data = f.read()
+    return DataPack(validate(json.loads(data.decode("utf-8"))), _digest(data))
+
+def compile_pack(source=SOURCE_PATH, target=COMPILED_PATH):
+    """Validate the JSON source and write the compact binary form."""
+    with open(source, "rb") as f:
+        data = f.read()
+    raw = validate(json.loads(data.decode("utf-8")))
+    payload = zlib.compress(json.dumps([_digest(data), raw], ensure_ascii=False).encode("utf-8"), 9)
+    tmp = target + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + hashlib.sha256(payload).digest() + payload)
+    os.replace(tmp, target)
+    return DataPack(raw, _digest(data))
+
+def load_compiled(path=COMPILED_PATH):
+    with open(path, "rb") as f:
+        blob = f.read()
+    _require(blob[:len(MAGIC)] == MAGIC, f"{path} is not a compiled data pack")
+    checksum, payload = blob[len(MAGIC):len(MAGIC) + 32], blob[len(MAGIC) + 32:]
+    _require(hashlib.sha256(payload).digest() == checksum, f"{path} is corrupt")
+    try:
+        digest, raw = json.loads(zlib.decompress(payload).decode("utf-8"))
+    except (zlib.error, UnicodeDecodeError, ValueError) as e:
+        raise DataPackError(f"{path} could not be decoded: {e}") from e
+    return DataPack(raw, digest)
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _load_newest():
+    """Prefer the compiled pack unless the JSON source is newer."""
+    src, bin_ = _mtime(SOURCE_PATH), _mtime(COMPILED_PATH)
+    if bin_ is not None and (src is None or bin_ >= src):
+        try:
+            return load_compiled(COMPILED_PATH), (src, bin_)
+        except (OSError, DataPackError, KeyError, TypeError) as e:
+            if src is None:
+                raise
+            print(f"datapack: {COMPILED_PATH} unusable ({e}), loading the JSON source",
+                  file=sys.stderr)
+    return load_source(SOURCE_PATH), (src, bin_)
+
+# ── Current pack & hot reload ─────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_state = {"pack": None, "stamp": None, "checked": 0.0}
+_caches = []
+_listeners = []
+
+def current():
+    """The active data pack, loaded lazily and reloaded on mtime change.
+
+    A reload that fails validation keeps the previous pack in service.
+    """
+    pack = _state["pack"]
+    now = time.monotonic()
+    if pack is not None and now - _state["checked"] < RELOAD_CHECK_INTERVAL:
+        return pack
+    with _lock:
+        pack = _state["pack"]
+        _state["checked"] = now
+        stamp = (_mtime(SOURCE_PATH), _mtime(COMPILED_PATH))
+        if pack is not None and stamp == _state["stamp"]:
+            return pack
+        try:
+            new, stamp = _load_newest()
+        except (OSError, DataPackError, ValueError, KeyError, TypeError, zlib.error) as e:
+            if pack is None:
+                raise
+            print(f"datapack: keeping {pack.token}, reload failed: {e}", file=sys.stderr)
+            _state["stamp"] = stamp
+            return pack
+        _state["stamp"] = stamp
+        if new != pack:
+            _state["pack"] = new
+            for cache in _caches:
+                cache.cache_clear()
+            for listener in _listeners:
+                listener(new)
+        return _state["pack"]
+
+def on_reload(fn):
+    """Register fn(pack) to be called whenever a new pack is swapped in."""
+    _listeners.append(fn)
+    return fn
+
+def pack_cached(maxsize=128):
+    """lru_cache keyed on the current pack, which is passed as first argument.
+
+    The wrapped function is called as fn(pack, *args) so it computes from the
+    same pack its entry is keyed on; entries for older packs are never hit
+    and are cleared when a new pack is swapped in. Code that already holds a
+    pack calls wrapper.for_pack(pack, *args) so it stays on that pack.
+    """
+    def decorator(fn):
+        cached = lru_cache(maxsize=maxsize)(fn)
+        _caches.append(cached)
+
+        @wraps(fn)
+        def wrapper(*args):
+            return cached(current(), *args)
+        wrapper.for_pack = cached
+        wrapper.cache_clear = cached.cache_clear
+        wrapper.cache_info = cached.cache_info
+        return wrapper
+    return decorator
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        pack = compile_pack()
+        print(f"compiled {pack.token}: {len(pack.factors)} factors, "
+              f"{len(pack.vat_matrix)} VAT cells, {len(pack.eligible_jurisdictions)} jurisdictions "
+              f"-> {COMPILED_PATH} ({os.path.getsize(COMPILED_PATH)} bytes)")
+    elif command == "check":
+        pack = load_source()
+        print(f"ok {pack.token}")
+    else:
+        sys.exit("usage: python datapack.py [build|check]")
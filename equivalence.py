@@ -0,0 +1,301 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from itertools import islice, product
+
+import numpy as np
+
+import methodology
+import scoring
+from scoring import (
+    VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES, VESSEL_STAGES,
+    OTHER_JURISDICTION, compute_score, compute_group_scores, get_verdict,
+)
+from models import ImportanceVector, ScoreResult
+from assessment import assess
+from batch_scoring import (
+    compiled_model, encode_profile, importance_vector, factor_score_matrix,
+    batch_final_scores, batch_group_scores,
+)
+from methodology import AssessmentHistory, Methodology, register
+from robustness import score_robustness
+from sensitivity import what_if
+
+# ── Engine equivalence ────────────────────────────────────────────────────────
+# Every scorer must agree exactly with the reference compute_score /
+# compute_group_scores, including round()'s half-to-even and the default
+# importance of 3 for a factor missing from the dict. The harness runs each
+# engine over the same cases and compares its final score, group scores
+# and verdict with the reference. Engines that only produce a final score are
+# compared on that and the verdict. "rescore (saved)" also round-trips the
+# history through save() and load() with the methodology registry cleared.
+# Cases are:
+#
+#   exhaustive  every combination of the six profile answers, with all
+#               importances missing (so 3), all 1, all 5, and two tie sets
+#               (see _tie_importances) that put the final score and every
+#               category score on exact .5 values for many profiles
+#   fuzz        random answers with random importances; some are given as an
+#               ImportanceVector, some as dicts with factors missing or with
+#               ids the pack does not know
+#
+# Cases run in chunks; each engine's time over all chunks gives its
+# throughput. Exits non-zero on any disagreement.
+#
+#   python equivalence.py [--fuzz 20000] [--seed 0] [--quick]
+
+CHUNK = 20_000
+FUZZ_CASES = 20_000
+SHOW_MISMATCHES = 10
+
+def _group_items(names, values):
+    return tuple((n, int(v)) for n, v in zip(names, values))
+
+def _present_groups():
+    m = compiled_model()
+    present = [g for g in range(len(m.pack.groups)) if m.onehot[:, g].any()]
+    return present, [m.pack.groups[g][0] for g in present]
+
+# ── Engines ───────────────────────────────────────────────────────────────────
+# Each takes a list of (profile, importances) and returns one
+# (final_score, group items or None, verdict) per case.
+
+def reference(cases):
+    out = []
+    for profile, importances in cases:
+        final, details = compute_score(profile, importances)
+        out.append((final, tuple(compute_group_scores(details).items()), get_verdict(final)[0]))
+    return out
+
+def record(cases):
+    out = []
+    for profile, importances in cases:
+        r = ScoreResult.compute(profile, importances)
+        out.append((r.final_score, _group_items(r.groups, r.group_values),
+                    get_verdict(r.final_score)[0]))
+    return out
+
+def cached(cases):
+    out = []
+    for profile, importances in cases:
+        r = assess(profile, importances)
+        out.append((r["final_score"], tuple(r["group_scores"].items()), r["verdict"]))
+    return out
+
+def batch(cases):
+    ubo, use, area, eligible = zip(*(encode_profile(p) for p, _ in cases))
+    bvi = factor_score_matrix(ubo, use, area, eligible)
+    imp = np.array([importance_vector(i) for _, i in cases])
+    finals = batch_final_scores(bvi, imp)
+    groups = batch_group_scores(bvi, imp)
+    present, names = _present_groups()
+    return [(int(f), _group_items(names, g[present]), get_verdict(int(f))[0])
+            for f, g in zip(finals, groups)]
+
+def _history_rows(history):
+    present, names = _present_groups()
+    return [(int(f), _group_items(names, g[present]), get_verdict(int(f))[0])
+            for f, g in zip(history.final_score, history.group_scores)]
+
+def history(cases):
+    profiles, importances = zip(*cases)
+    return _history_rows(AssessmentHistory.from_assessments(profiles, importances))
+
+def _shifted():
+    """The current methodology with every factor score, VAT cell and
+    eligibility score changed, so rescoring from it touches every term."""
+    current = Methodology.current()
+
+    def flip(s):
+        return 6 - s if s != 3 else 1
+
+    return register(current.with_changes(
+        f"{current.version}-equivalence",
+        base_scores={fid: flip(s) for fid, s in current.base_scores.items()},
+        vat_cells={k: flip(v) for k, v in current.vat_matrix.items()},
+        vat_default=flip(current.vat_default),
+        eligible_score=flip(current.eligible_score),
+        ineligible_score=flip(current.ineligible_score),
+    ))
+
+def incremental(cases):
+    profiles, importances = zip(*cases)
+    h = AssessmentHistory.from_assessments(profiles, importances, _shifted())
+    h.rescore(Methodology.current())
+    return _history_rows(h)
+
+def saved_rescore(cases):
+    # Saved under the shifted methodology and loaded with an empty registry,
+    # as a new process would, before re-scoring to the current one.
+    profiles, importances = zip(*cases)
+    h = AssessmentHistory.from_assessments(profiles, importances, _shifted())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.npz")
+        h.save(path)
+        methodology._REGISTRY.clear()
+        h = AssessmentHistory.load(path)
+    h.rescore(Methodology.current())
+    return _history_rows(h)
+
+def monte_carlo(cases):
+    # One sample with no perturbation scores the sliders exactly as given.
+    out = []
+    for profile, importances in cases:
+        r = score_robustness(profile, importances, n_samples=1, spread=0)
+        verdict = next(v for v, p in r["verdicts"].items() if p == 1.0)
+        out.append((r["percentiles"][50], None, verdict))
+    return out
+
+def what_if_base(cases):
+    out = []
+    for profile, importances in cases:
+        base, _ = what_if(profile, importances)
+        out.append((base, None, get_verdict(base)[0]))
+    return out
+
+ENGINES = {
+    "compute_score": reference,
+    "ScoreResult": record,
+    "assess (cached)": cached,
+    "batch": batch,
+    "AssessmentHistory": history,
+    "rescore (incremental)": incremental,
+    "rescore (saved)": saved_rescore,
+    "robustness": monte_carlo,
+    "what_if": what_if_base,
+}
+
+# ── Cases ─────────────────────────────────────────────────────────────────────
+
+def _jurisdictions(quick):
+    if quick:
+        return [scoring.ELIGIBLE_JURISDICTIONS[0], OTHER_JURISDICTION]
+    return scoring.ELIGIBLE_JURISDICTIONS + [OTHER_JURISDICTION]
+
+def _answer_lists(quick):
+    return (VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES,
+            _jurisdictions(quick), VESSEL_STAGES)
+
+def _profile(answers):
+    return dict(zip(("vessel_use", "cruising_area", "ubo_residency", "ownership",
+                     "jurisdiction", "vessel_stage"), answers))
+
+def _spread(ids, total):
+    """Importances for `ids` summing to `total`: 1 each, the rest piled up to
+    5 on the first ones."""
+    values, extra = {}, total - len(ids)
+    for fid in ids:
+        values[fid] = 1 + min(extra, 4)
+        extra -= values[fid] - 1
+    return values
+
+def _tie_importances(pack):
+    """Importance sets that make round()'s half-to-even matter.
+
+    A score is 100·Σ(rating·importance) / (5·Σ importance). With the
+    importances summing to a multiple of 40 the final score is a multiple of
+    1/2, and with each category summing to a multiple of 8 so is every
+    category score, and most profiles land on .5 somewhere. Uniform
+    importances never do, which left rounding to fuzz alone.
+    """
+    ids = [f[0] for f in pack.factors]
+    by_group = {}
+    for f in pack.factors:
+        by_group.setdefault(f[3], []).append(f[0])
+    groups = {}
+    for members in by_group.values():
+        groups.update(_spread(members, -(-len(members) // 8) * 8))
+    return [_spread(ids, -(-len(ids) // 40) * 40), groups]
+
+def exhaustive_cases(quick=False):
+    m = compiled_model()
+    factor_ids = m.factor_ids
+    fixed = [{}, dict.fromkeys(factor_ids, 1), dict.fromkeys(factor_ids, 5),
+             *_tie_importances(m.pack)]
+    for answers in product(*_answer_lists(quick)):
+        profile = _profile(answers)
+        for importances in fixed:
+            yield profile, importances
+
+def fuzz_cases(n, seed=0, quick=False):
+    rng = random.Random(seed)
+    lists = _answer_lists(quick)
+    factor_ids = compiled_model().factor_ids
+    for _ in range(n):
+        profile = _profile(rng.choice(options) for options in lists)
+        values = {fid: rng.randint(1, 5) for fid in factor_ids}
+        kind = rng.randrange(4)
+        if kind == 0:
+            importances = ImportanceVector.from_dict(values)
+        elif kind == 1:
+            importances = values
+        else:
+            keep = rng.sample(factor_ids, rng.randint(0, len(factor_ids)))
+            importances = {fid: values[fid] for fid in keep}
+            if kind == 3:
+                importances["retired_factor"] = rng.randint(1, 5)
+        yield profile, importances
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+def _describe(case, expected, got):
+    profile, importances = case
+    answers = ", ".join(profile.values())
+    given = dict(importances) if importances else "defaults"
+    return f"[{answers}] importances {given}: expected {expected}, got {got}"
+
+def check(cases, engines=ENGINES, chunk=CHUNK):
+    """Run every engine over `cases`; returns (count, seconds per engine,
+    mismatch counts per engine, first mismatches as text)."""
+    seconds = dict.fromkeys(engines, 0.0)
+    mismatches = dict.fromkeys(engines, 0)
+    examples = []
+    count = 0
+    cases = iter(cases)
+    while True:
+        block = list(islice(cases, chunk))
+        if not block:
+            break
+        count += len(block)
+        results = {}
+        for name, engine in engines.items():
+            start = time.perf_counter()
+            results[name] = engine(block)
+            seconds[name] += time.perf_counter() - start
+        expected = results["compute_score"]
+        for name, got in results.items():
+            for case, want, have in zip(block, expected, got):
+                same = (have[0] == want[0] and have[2] == want[2]
+                        and (have[1] is None or have[1] == want[1]))
+                if not same:
+                    mismatches[name] += 1
+                    if len(examples) < SHOW_MISMATCHES:
+                        examples.append(f"{name}: {_describe(case, want, have)}")
+    return count, seconds, mismatches, examples
+
+def report(label, count, seconds, mismatches):
+    print(f"{label}: {count:,} cases")
+    print(f"  {'engine':<24}{'cases/s':>12}{'mismatches':>12}")
+    for name in seconds:
+        rate = count / seconds[name] if seconds[name] else float("inf")
+        print(f"  {name:<24}{rate:>12,.0f}{mismatches[name]:>12}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check every scoring engine against compute_score")
+    parser.add_argument("--fuzz", type=int, default=FUZZ_CASES, help="random cases")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true",
+                        help="one eligible jurisdiction and the unlisted one instead of all")
+    args = parser.parse_args()
+    failed = False
+    for label, cases in [("exhaustive", exhaustive_cases(args.quick)),
+                         ("fuzz", fuzz_cases(args.fuzz, args.seed, args.quick))]:
+        count, seconds, mismatches, examples = check(cases)
+        report(label, count, seconds, mismatches)
+        for line in examples:
+            print(f"  MISMATCH {line}")
+        failed |= any(mismatches.values())
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import sys
+
+import numpy as np
+
+import datapack
+from datapack import PROFILE_FIELDS
+from scoring import get_verdict
+from advisory import advisory_notes
+from batch_scoring import (
+    compiled_model, encode_profile, importance_vector, factor_score_matrix,
+    batch_final_scores, batch_group_scores,
+)
+
+# ── Fleet assessment ──────────────────────────────────────────────────────────
+# Several vessels of one beneficial owner, scored with one shared importance
+# vector. Every vessel is encoded as a row and the whole fleet is scored in
+# one batched pass; the fleet report is one document with a row per vessel,
+# fleet-level category averages and the vessels that stand out from the rest.
+# UBO residency belongs to the owner, so all vessels must share it.
+
+OUTLIER_MARGIN = 10  # points from the fleet median that make a vessel an outlier
+VESSEL_FIELDS = tuple(f for f in PROFILE_FIELDS if f != "ubo_residency")
+
+def score_fleet(vessels, importances):
+    """Score [(name, profile), ...] for one owner.
+
+    Returns a dict with per-vessel rows (name, profile, final_score,
+    verdict, group_scores, notes, outlier = "above" / "below" / None), the
+    fleet's group_averages and average / median final scores.
+    """
+    if not vessels:
+        raise ValueError("a fleet needs at least one vessel")
+    residencies = {profile["ubo_residency"] for _, profile in vessels}
+    if len(residencies) > 1:
+        raise ValueError("all vessels in a fleet must share one UBO residency")
+
+    m = compiled_model()
+    ubo, use, area, eligible = zip(*(encode_profile(profile) for _, profile in vessels))
+    bvi = factor_score_matrix(ubo, use, area, eligible)
+    imp = importance_vector(importances)
+    finals = batch_final_scores(bvi, imp)
+    groups = batch_group_scores(bvi, imp)
+    # Groups with no factors never get a score, as in ScoreResult.
+    present = [g for g, (name, _) in enumerate(m.pack.groups) if m.onehot[:, g].any()]
+    names = [m.pack.groups[g][0] for g in present]
+
+    median = float(np.median(finals))
+    rows = []
+    for (name, profile), final, group_row in zip(vessels, finals, groups):
+        final = int(final)
+        outlier = None
+        if final >= median + OUTLIER_MARGIN:
+            outlier = "above"
+        elif final <= median - OUTLIER_MARGIN:
+            outlier = "below"
+        rows.append({
+            "name": name,
+            "profile": profile,
+            "final_score": final,
+            "verdict": get_verdict(final)[0],
+            "group_scores": {n: int(group_row[g]) for n, g in zip(names, present)},
+            "notes": advisory_notes(profile),
+            "outlier": outlier,
+        })
+    return {
+        "ubo_residency": residencies.pop(),
+        "vessels": rows,
+        "group_averages": {n: float(groups[:, g].mean()) for n, g in zip(names, present)},
+        "average_score": float(finals.mean()),
+        "median_score": median,
+    }
+
+def fleet_notes(fleet):
+    """Advisory notes across the fleet, once each, naming the vessels they apply to."""
+    notes = {}
+    for row in fleet["vessels"]:
+        for note in row["notes"]:
+            notes.setdefault(note["id"], (note, []))[1].append(row["name"])
+    if len(fleet["vessels"]) == 1:
+        return [note for note, _ in notes.values()]
+    return [{**note, "text": f"{note['text']} (Applies to: {', '.join(names)}.)"}
+            for note, names in notes.values()]
+
+def fleet_hash(vessels, importances):
+    """Stable short hash of a fleet's inputs and the data pack that scored them."""
+    payload = json.dumps([
+        datapack.current().token,
+        [(name, [profile.get(f) for f in PROFILE_FIELDS]) for name, profile in vessels],
+        sorted(importances.items()),
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+def load_fleet(path):
+    """(vessels, importances) from a JSON file of the form
+    {"ubo_residency": ..., "importances": {...}, "vessels": [{"name": ..., <profile>}, ...]}.
+    A top-level ubo_residency applies to every vessel."""
+    with open(path) as f:
+        raw = json.load(f)
+    vessels = []
+    for i, v in enumerate(raw["vessels"], 1):
+        profile = {f: v.get(f, raw.get(f)) for f in PROFILE_FIELDS}
+        missing = [f for f, value in profile.items() if value is None]
+        if missing:
+            raise ValueError(f"vessel {i} is missing {', '.join(missing)}")
+        vessels.append((v.get("name") or f"Vessel {i}", profile))
+    return vessels, raw.get("importances", {})
+
+if __name__ == "__main__":
+    from pdf_report import generate_fleet_pdf
+    if len(sys.argv) < 2:
+        sys.exit("usage: python fleet.py fleet.json [report.pdf]")
+    vessels, importances = load_fleet(sys.argv[1])
+    fleet = score_fleet(vessels, importances)
+    for row in fleet["vessels"]:
+        flag = f"  ({row['outlier']} the fleet)" if row["outlier"] else ""
+        print(f"{row['final_score']:>4}  {row['verdict']:<14} {row['name']}{flag}")
+    print(f"fleet average {fleet['average_score']:.1f}, median {fleet['median_score']:g}")
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "wb") as f:
+            f.write(generate_fleet_pdf(fleet, compact=True))
+        print(f"wrote {sys.argv[2]}")
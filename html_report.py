@@ -0,0 +1,180 @@
+import os
+import sys
+from datetime import datetime
+from html import escape
+
+import datapack
+from scoring import SCORE_SCALE, get_verdict
+from advisory import advisory_notes
+from assessment import assess, assessment_key, assessment_hash
+
+# ── Static HTML report ────────────────────────────────────────────────────────
+# A self-contained page (inline CSS, no scripts, no external assets) built
+# from the same inputs as generate_pdf, for the portal and for email bodies.
+# Layout is tables only, since mail clients ignore flexbox and grid.
+# Output is cached in memory under the assessment hash, which already covers
+# the data pack, without the report date: the cached page carries DATE_MARK
+# and the date is filled in when the report is served. Exported files are
+# named by assessment hash and date, so a cached file never outlives its data
+# or its day.
+
+EXPORT_DIR = os.environ.get("BVI_EXPORT_DIR", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "exports"))
+DATE_MARK = "<!--report-date-->"   # escape() turns any "<" in report text into "&lt;"
+
+CSS = """
+body { margin: 0; background: #f8f6f1; color: #0d2137;
+       font: 15px/1.5 'Source Sans 3', Helvetica, Arial, sans-serif; }
+.wrap { max-width: 760px; margin: 0 auto; padding: 24px; }
+h1, h2 { font-family: 'Playfair Display', Georgia, 'Times New Roman', serif; }
+h2 { font-size: 1.15rem; border-bottom: 1px solid #c9a84c; padding-bottom: 4px; margin: 28px 0 12px; }
+.banner { background: #0d2137; color: #f8f6f1; padding: 20px 24px; border-radius: 8px; }
+.banner h1 { margin: 0; font-size: 1.6rem; }
+.banner p { margin: 4px 0 0; color: #e8c97a; font-style: italic; }
+table { width: 100%; border-collapse: collapse; }
+td, th { padding: 6px 8px; text-align: left; vertical-align: top; border-bottom: 1px solid #dddddd; }
+.score { margin-top: 10px; }
+.score td { background: #163354; color: #f8f6f1; vertical-align: middle; border: 0; padding: 12px 16px; }
+.score .num { font: 700 3rem 'Playfair Display', Georgia, serif; color: #c9a84c; }
+.score .verdict { text-align: right; font: 700 1.2rem 'Playfair Display', Georgia, serif; }
+th { background: #0d2137; color: #f8f6f1; font-size: 0.85rem; }
+.profile td { background: #f0ede6; width: 33%; }
+.profile b { display: block; font-size: 0.85rem; }
+.bar { background: #e6e2d8; border-radius: 3px; height: 10px; min-width: 120px; }
+.bar span { display: block; height: 10px; border-radius: 3px; }
+.group td { background: #e8f0f8; font-weight: 600; border-bottom: 2px solid #163354; }
+.remark { color: #555555; font-size: 0.85rem; }
+.stars { color: #c9a84c; white-space: nowrap; }
+.note { background: #fff8e6; border-bottom: 1px solid #c9a84c; padding: 10px 14px; margin-bottom: 8px; }
+.cta { background: #0d2137; color: #f8f6f1; padding: 16px 24px; border-radius: 8px; margin-top: 24px; }
+.cta b { color: #e8c97a; }
+.footer { color: #555555; font-size: 0.8rem; text-align: center; margin-top: 16px; }
+"""
+
+def _score_color(score):
+    """SCORE_SCALE interpolated at a 0–100 score, as #rrggbb."""
+    t = min(max(score / 100, 0.0), 1.0)
+    for (t0, c0), (t1, c1) in zip(SCORE_SCALE, SCORE_SCALE[1:]):
+        if t <= t1:
+            a, b = int(c0[1:], 16), int(c1[1:], 16)
+            f = (t - t0) / (t1 - t0)
+            return "#" + "".join(
+                f"{round(((a >> s) & 255) + (((b >> s) & 255) - ((a >> s) & 255)) * f):02x}"
+                for s in (16, 8, 0))
+    return SCORE_SCALE[-1][1]
+
+def _stars(n):
+    return "★" * n + "☆" * (5 - n)
+
+def _dated(page, date=None):
+    return page.replace(DATE_MARK, escape((date or datetime.now()).strftime("%d %B %Y")))
+
+def generate_html(profile, factor_details, final_score, group_scores, notes=None, verdict=None,
+                  date=None):
+    """The report as one self-contained HTML document (str), dated `date`
+    (default today)."""
+    return _dated(_undated_html(profile, factor_details, final_score, group_scores,
+                                notes, verdict), date)
+
+def _undated_html(profile, factor_details, final_score, group_scores, notes=None, verdict=None):
+    if verdict is None:
+        verdict = get_verdict(final_score)[0]
+    if notes is None:
+        notes = advisory_notes(profile)
+    e = escape
+    out = [
+        "<!DOCTYPE html>",
+        '<html lang="en"><head><meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        "<title>BVI Flag Suitability Report</title>",
+        f"<style>{CSS}</style></head><body><div class=\"wrap\">",
+        '<div class="banner"><h1>BVI Flag Suitability Report</h1>'
+        f"<p>{DATE_MARK}</p></div>",
+        f'<table class="score"><tr><td>BVI SUITABILITY SCORE</td><td class="num">{final_score}</td>'
+        f'<td>out of 100</td><td class="verdict">{e(verdict)}</td></tr></table>',
+    ]
+
+    # ── Profile ───────────────────────────────────────────────────────────────
+    labels = [("Vessel Use", "vessel_use"), ("Cruising Area", "cruising_area"),
+              ("UBO Residency", "ubo_residency"), ("Ownership", "ownership"),
+              ("Jurisdiction", "jurisdiction"), ("Vessel Stage", "vessel_stage")]
+    cells = [f"<td><b>{label}</b>{e(str(profile.get(key, '—')))}</td>" for label, key in labels]
+    out.append('<h2>Your Vessel Profile</h2><table class="profile">'
+               f"<tr>{''.join(cells[:3])}</tr><tr>{''.join(cells[3:])}</tr></table>")
+
+    # ── Category scores ───────────────────────────────────────────────────────
+    out.append("<h2>Score by Category</h2><table>")
+    for group, score in group_scores.items():
+        out.append(
+            f"<tr><td>{e(group)}</td><td style=\"width:45%\"><div class=\"bar\">"
+            f"<span style=\"width:{score}%;background:{_score_color(score)}\"></span></div></td>"
+            f"<td style=\"width:3em\"><b>{score}</b></td></tr>")
+    out.append("</table>")
+
+    # ── Factors ───────────────────────────────────────────────────────────────
+    out.append("<h2>Detailed Factor Analysis</h2><table>"
+               "<tr><th>Factor</th><th>BVI Rating</th><th>Your Priority</th></tr>")
+    for group in group_scores:
+        out.append(f'<tr class="group"><td colspan="3">{e(group)}</td></tr>')
+        for f in factor_details:
+            if f["group"] != group:
+                continue
+            out.append(
+                f"<tr><td><b>{e(f['name'])}</b><div class=\"remark\">{e(f['remark'])}</div></td>"
+                f"<td class=\"stars\">{_stars(f['bvi_score'])}</td>"
+                f"<td class=\"stars\">{'●' * f['importance']}{'○' * (5 - f['importance'])}</td></tr>")
+    out.append("</table>")
+
+    # ── Notes, CTA, footer ────────────────────────────────────────────────────
+    if notes:
+        out.append("<h2>Important Notes</h2>")
+        for note in notes:
+            out.append(f"<div class=\"note\">⚠ <b>{e(note['title'])}:</b> {e(note['text'])}</div>")
+    out.append(
+        '<div class="cta"><b>Ready to Register?</b> Get in touch to discuss your specific situation '
+        "and explore the registration process.<br><b>Jejo Joy</b> · "
+        '<a style="color:#f8f6f1" href="mailto:jejojoy.neelankavil@bvimaritime.vg">'
+        "jejojoy.neelankavil@bvimaritime.vg</a></div>")
+    out.append(
+        f'<p class="footer">Generated by the BVI Flag Suitability Tool · {DATE_MARK} · '
+        "This report is for guidance purposes only and does not constitute legal or financial advice.</p>")
+    out.append("</div></body></html>")
+    return "\n".join(out)
+
+@datapack.pack_cached(maxsize=1024)
+def _html(pack, profile_items, importance_items):
+    profile, importances = dict(profile_items), dict(importance_items)
+    result = assess(profile, importances)
+    return _undated_html(profile, result["factor_details"], result["final_score"],
+                         result["group_scores"], notes=result["notes"], verdict=result["verdict"])
+
+def html_report(profile, importances, date=None):
+    """HTML report for an assessment, dated `date` (default today); the
+    undated page is cached."""
+    return _dated(_html(*assessment_key(profile, importances)), date)
+
+def export_html(profile, importances, directory=None):
+    """Write today's report to <directory>/<assessment hash>-<yyyymmdd>.html
+    once; return its path."""
+    directory = directory or EXPORT_DIR
+    today = datetime.now()
+    path = os.path.join(directory, f"{assessment_hash(profile, importances)}-{today:%Y%m%d}.html")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(html_report(profile, importances, today))
+        os.replace(tmp, path)
+    return path
+
+if __name__ == "__main__":
+    import json
+    if len(sys.argv) < 2:
+        sys.exit("usage: python html_report.py profile.json [importances.json]")
+    with open(sys.argv[1]) as f:
+        profile = json.load(f)
+    importances = {}
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as f:
+            importances = json.load(f)
+    print(export_html(profile, importances))
@@ -0,0 +1,303 @@
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit
+
+try:
+    from websockets.sync.client import connect
+except ImportError:
+    sys.exit("loadtest.py needs websockets>=12: pip install -r requirements-dev.txt")
+try:
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+except ImportError:
+    sys.exit(f"loadtest.py speaks Streamlit's private websocket protocol and could not load "
+             f"it from streamlit {streamlit.__version__}; pip install -r requirements-dev.txt "
+             f"for the release it was written against")
+
+from scoring import (
+    VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES,
+    VESSEL_STAGES, OTHER_JURISDICTION, ELIGIBLE_JURISDICTIONS,
+)
+
+# ── Load test ─────────────────────────────────────────────────────────────────
+# Starts app.py under a headless `streamlit run` on a free local port and
+# drives concurrent sessions through profile → assessment → report over the
+# same websocket protocol the browser uses, so every session shares one
+# replica's caches, PDF pool and memory exactly as brokers would. Each
+# session answers randomly and, with --pdf, waits for the full PDF and
+# downloads it. A rerun is timed from the client's request to the server's
+# script_finished; memory is the server's RSS. Nothing leaves 127.0.0.1.
+# The protocol messages are Streamlit internals, so requirements-dev.txt pins
+# the Streamlit release this was written against.
+#
+#   python loadtest.py --sessions 16 --flows 5 --pdf
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+RUN_TIMEOUT = 120
+STARTUP_TIMEOUT = 60
+FINISHED = ForwardMsg.ScriptFinishedStatus
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port):
+    """Headless streamlit for app.py; returns the process once it is healthy."""
+    log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH,
+         "--server.headless", "true", "--server.address", "127.0.0.1",
+         "--server.port", str(port), "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=os.path.dirname(APP_PATH), stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f"streamlit exited: {log.read().decode()[-2000:]}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("streamlit did not become healthy")
+
+def rss_kib(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+class Session:
+    """One browser tab: a websocket plus the widget states it would send."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.ws = connect(base_url.replace("http", "ws", 1) + "/_stcore/stream",
+                          subprotocols=["streamlit"], max_size=None, open_timeout=RUN_TIMEOUT)
+        self.states = {}
+        self.widgets = []
+        self.auto_reruns = {}   # fragment id -> interval (s), as the browser's timers
+
+    def __enter__(self):
+        self.ws.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.ws.__exit__(*exc)
+
+    def _send(self, triggers=(), fragment_id=None):
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.SetInParent()
+        for wid, (kind, value) in self.states.items():
+            self._set(client.widget_states.widgets.add(), wid, kind, value)
+        for wid in triggers:
+            client.widget_states.widgets.add(id=wid, trigger_value=True)
+        if fragment_id:
+            client.fragment_id = fragment_id
+            client.is_auto_rerun = True
+        else:
+            self.widgets = []
+            self.auto_reruns = {}
+        self.ws.send(msg.SerializeToString())
+
+    @staticmethod
+    def _set(state, wid, kind, value):
+        state.id = wid
+        if kind == "selectbox":
+            state.string_value = value
+        else:
+            state.double_array_value.data.extend([value])
+
+    def _receive(self, done):
+        """Read messages until done(msg) is true; raise on a script error.
+        Fragments the app set to run_every are rerun while waiting, as the
+        browser would."""
+        deadline = time.monotonic() + RUN_TIMEOUT
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("no response from the app")
+            try:
+                data = self.ws.recv(timeout=min([remaining, *self.auto_reruns.values()]))
+            except TimeoutError:
+                for fragment_id in self.auto_reruns:
+                    self._send(fragment_id=fragment_id)
+                continue
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            kind = msg.WhichOneof("type")
+            if kind == "auto_rerun":
+                self.auto_reruns[msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+            elif kind == "stop_auto_rerun":
+                for fragment_id in msg.stop_auto_rerun.fragment_ids:
+                    self.auto_reruns.pop(fragment_id, None)
+            if kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                kind = element.WhichOneof("type")
+                if kind == "exception":
+                    raise RuntimeError(f"{element.exception.type}: {element.exception.message}")
+                if kind in ("selectbox", "slider", "button", "download_button"):
+                    self.widgets.append((kind, getattr(element, kind)))
+            if done(msg):
+                return
+
+    def rerun(self, triggers=()):
+        """Request a rerun and wait for the full script run to finish."""
+        self._send(triggers)
+        self._receive(lambda m: m.WhichOneof("type") == "script_finished"
+                      and m.script_finished == FINISHED.FINISHED_SUCCESSFULLY)
+
+    def wait_for(self, kind, label):
+        """Wait, through fragment reruns, until a widget labelled `label` appears."""
+        found = self.find(kind, label, required=False)
+        if found is None:
+            self._receive(lambda m: self.find(kind, label, required=False) is not None)
+            found = self.find(kind, label)
+        return found
+
+    def find(self, kind, label, required=True):
+        for k, w in self.widgets:
+            if k == kind and label in w.label:
+                return w
+        if required:
+            raise RuntimeError(f"no {kind} labelled {label!r}")
+        return None
+
+    def select(self, widget, value):
+        self.states[widget.id] = ("selectbox", value)
+
+    def slide(self, widget, value):
+        self.states[widget.id] = ("slider", float(value))
+
+    def download(self, widget):
+        with urllib.request.urlopen(self.base_url + widget.url, timeout=RUN_TIMEOUT) as r:
+            return r.read()
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.flows = 0
+        self.errors = []
+
+    def timed(self, label, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies.setdefault(label, []).append(elapsed)
+        return result
+
+def run_flow(rec, rng, base_url, pdf):
+    with Session(base_url) as s:
+        rec.timed("profile", s.rerun)
+
+        # Ownership relabels the jurisdiction question, which resets it, so it
+        # is answered first as it would be in the browser.
+        s.select(s.find("selectbox", "owned"), rng.choice(OWNERSHIP_TYPES))
+        rec.timed("profile input", s.rerun)
+        boxes = [w for k, w in s.widgets if k == "selectbox"]
+        answers = [rng.choice(VESSEL_USES), rng.choice(CRUISING_AREAS), rng.choice(UBO_RESIDENCIES),
+                   None, rng.choice(ELIGIBLE_JURISDICTIONS + [OTHER_JURISDICTION]),
+                   rng.choice(VESSEL_STAGES)]
+        for box, answer in zip(boxes, answers):
+            if answer is not None:
+                s.select(box, answer)
+        rec.timed("profile→assessment", s.rerun, [s.find("button", "Continue to Assessment").id])
+
+        for k, w in s.widgets:
+            if k == "slider":
+                s.slide(w, rng.randint(1, 5))
+        rec.timed("assessment→report", s.rerun, [s.find("button", "Generate Report").id])
+        prepare = s.find("button", "Prepare full report")
+        rec.timed("report rerun", s.rerun)
+
+        if pdf:
+            def full_pdf():
+                s.rerun([prepare.id])
+                return s.wait_for("download_button", "Full Report")
+            button = rec.timed("full pdf", full_pdf)
+            data = rec.timed("pdf download", s.download, button)
+            if not data.startswith(b"%PDF"):
+                raise RuntimeError("full report download is not a PDF")
+
+def run_session(rec, seed, base_url, flows, pdf):
+    rng = random.Random(seed)
+    for _ in range(flows):
+        try:
+            run_flow(rec, rng, base_url, pdf)
+        except Exception as e:
+            with rec.lock:
+                rec.errors.append(f"{type(e).__name__}: {e}")
+        else:
+            with rec.lock:
+                rec.flows += 1
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(int(p / 100 * len(values)), len(values) - 1)]
+
+def load_test(sessions=8, flows=3, pdf=False, seed=0, url=None):
+    """Run the load test against `url`, or against a fresh local server."""
+    proc = None
+    if url is None:
+        port = free_port()
+        proc = start_server(port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        # One warm-up flow so imports and first-use caches are not counted.
+        run_flow(Recorder(), random.Random(seed - 1), url, pdf)
+        rss_start = rss_kib(proc.pid) if proc else None
+        rec = Recorder()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as pool:
+            for i in range(sessions):
+                pool.submit(run_session, rec, seed + i, url, flows, pdf)
+        elapsed = time.perf_counter() - start
+        rss_end = rss_kib(proc.pid) if proc else None
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    runs = [t for label, ts in rec.latencies.items() if label != "pdf download" for t in ts]
+    print(f"{sessions} sessions × {flows} flows{' with full PDF' if pdf else ''}: "
+          f"{rec.flows} completed, {len(rec.errors)} failed in {elapsed:.1f} s")
+    print(f"throughput {rec.flows / elapsed:.2f} flows/s, {len(runs) / elapsed:.1f} reruns/s")
+    print(f"{'run':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, ts in [*rec.latencies.items(), ("all reruns", runs)]:
+        if ts:
+            print(f"{label:<22}{len(ts):>6}{pct(ts, 50) * 1000:>10.0f}"
+                  f"{pct(ts, 95) * 1000:>10.0f}{pct(ts, 99) * 1000:>10.0f}")
+    if rss_start is not None:
+        print(f"server RSS {rss_start / 1024:.0f} → {rss_end / 1024:.0f} MiB "
+              f"(+{(rss_end - rss_start) / 1024:.1f} MiB, "
+              f"{(rss_end - rss_start) / max(rec.flows, 1):.0f} KiB per flow)")
+    for error in sorted(set(rec.errors))[:10]:
+        print(f"  error: {error}")
+    return rec
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--flows", type=int, default=3, help="profile→report flows per session")
+    parser.add_argument("--pdf", action="store_true", help="also build and download the full PDF in each flow")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="test an already running app instead of starting one "
+                                      "(no memory figures)")
+    args = parser.parse_args()
+    rec = load_test(args.sessions, args.flows, args.pdf, args.seed, args.url)
+    sys.exit(1 if rec.errors else 0)
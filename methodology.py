@@ -0,0 +1,288 @@
+import hashlib
+import json
+import numpy as np
+
+import datapack
+from scoring import VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES
+from batch_scoring import compiled_model, encode_profile
+from models import ImportanceVector
+
+# ── Versioned methodology ─────────────────────────────────────────────────────
+# A methodology is everything that turns a profile into factor scores: the
+# static base_score of each factor, the VAT matrix and the eligibility
+# scores. Importances and the weighting formula are not part of it, which is
+# what makes incremental re-scoring possible: a change in one factor's score
+# moves a stored weighted total by exactly Δscore × importance.
+#
+# Methodologies are registered by fingerprint (a hash of their scores), not by
+# version string, so a pack whose scores change under the same version is
+# never mistaken for the old one. A saved history carries the full definition
+# of every methodology its rows were scored with, so a new process can
+# re-score it without having seen those methodologies before.
+
+class Methodology:
+    def __init__(self, version, base_scores, vat_matrix,
+                 vat_default, eligible_score, ineligible_score):
+        self.version = version
+        self.base_scores = dict(base_scores)
+        self.vat_matrix = dict(vat_matrix)
+        self.vat_default = vat_default
+        self.eligible_score = eligible_score
+        self.ineligible_score = ineligible_score
+        self._fingerprint = None
+
+    @classmethod
+    def from_pack(cls, pack):
+        return cls(pack.version, {f[0]: f[2] for f in pack.factors}, pack.vat_matrix,
+                   pack.vat_default, pack.eligible_score, pack.ineligible_score)
+
+    @classmethod
+    def current(cls):
+        """The loaded data pack's methodology, registered."""
+        return register(_pack_methodology())
+
+    def to_dict(self):
+        """JSON-ready definition, with the fingerprint it must reproduce."""
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint(),
+            "base_scores": self.base_scores,
+            "vat_matrix": sorted([list(k) + [v] for k, v in self.vat_matrix.items()]),
+            "vat_default": self.vat_default,
+            "eligible_score": self.eligible_score,
+            "ineligible_score": self.ineligible_score,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """Inverse of to_dict; raises ValueError if the fingerprint does not match."""
+        methodology = cls(d["version"], d["base_scores"],
+                          {(u, v, a): score for u, v, a, score in d["vat_matrix"]},
+                          d["vat_default"], d["eligible_score"], d["ineligible_score"])
+        if methodology.fingerprint() != d["fingerprint"]:
+            raise ValueError(f"methodology {d['version']} does not match its fingerprint "
+                             f"{d['fingerprint']}")
+        return methodology
+
+    def with_changes(self, version, base_scores=None, vat_cells=None, **scores):
+        """A new version with some factor scores or VAT cells replaced."""
+        return Methodology(
+            version,
+            {**self.base_scores, **(base_scores or {})},
+            {**self.vat_matrix, **(vat_cells or {})},
+            vat_default=scores.get("vat_default", self.vat_default),
+            eligible_score=scores.get("eligible_score", self.eligible_score),
+            ineligible_score=scores.get("ineligible_score", self.ineligible_score),
+        )
+
+    def base_vector(self):
+        return np.array([self.base_scores[fid] for fid in compiled_model().factor_ids],
+                        dtype=np.int32)
+
+    def vat_cube(self):
+        return np.array([
+            [[self.vat_matrix.get((u, v, a), self.vat_default) for a in CRUISING_AREAS]
+             for v in VESSEL_USES]
+            for u in UBO_RESIDENCIES
+        ], dtype=np.int32)
+
+    def fingerprint(self):
+        if self._fingerprint is None:
+            payload = json.dumps({
+                "base": self.base_scores,
+                "vat": sorted([list(k) + [v] for k, v in self.vat_matrix.items()]),
+                "scores": [self.vat_default, self.eligible_score, self.ineligible_score],
+            }, sort_keys=True)
+            self._fingerprint = hashlib.sha256(payload.encode()).hexdigest()[:16]
+        return self._fingerprint
+
+_REGISTRY = {}
+
+@datapack.pack_cached(maxsize=1)
+def _pack_methodology(pack):
+    return Methodology.from_pack(pack)
+
+def register(methodology):
+    """Register by fingerprint; returns the methodology already registered
+    under that fingerprint, if any, so equal methodologies are one object."""
+    return _REGISTRY.setdefault(methodology.fingerprint(), methodology)
+
+def get_methodology(fingerprint):
+    """A registered methodology; the loaded data pack's is always known."""
+    if fingerprint not in _REGISTRY:
+        Methodology.current()
+    return _REGISTRY[fingerprint]
+
+def diff(old, new):
+    """Factor-score changes between two methodology versions."""
+    factors = {
+        fid: (old.base_scores[fid], new.base_scores[fid])
+        for fid in compiled_model().factor_ids
+        if fid not in ("vat_tariff", "eligibility")
+        and old.base_scores[fid] != new.base_scores[fid]
+    }
+    old_cube, new_cube = old.vat_cube(), new.vat_cube()
+    vat = {}
+    for u, v, a in zip(*np.nonzero(old_cube != new_cube)):
+        key = (UBO_RESIDENCIES[u], VESSEL_USES[v], CRUISING_AREAS[a])
+        vat[key] = (int(old_cube[u, v, a]), int(new_cube[u, v, a]))
+    eligibility = {}
+    if old.eligible_score != new.eligible_score:
+        eligibility[True] = (old.eligible_score, new.eligible_score)
+    if old.ineligible_score != new.ineligible_score:
+        eligibility[False] = (old.ineligible_score, new.ineligible_score)
+    return {"from": old.version, "to": new.version,
+            "factors": factors, "vat": vat, "eligibility": eligibility}
+
+def is_empty(d):
+    return not (d["factors"] or d["vat"] or d["eligibility"])
+
+# ── Assessment history ────────────────────────────────────────────────────────
+
+def _round_scores(tw, mw):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.round((tw / mw) * 100)
+    return np.where(mw > 0, scores, 0).astype(np.int16)
+
+class AssessmentHistory:
+    """Column-oriented store of scored assessments.
+
+    Each row keeps the encoded profile, its importances, the weighted and
+    maximum totals overall and per group, the resulting scores and the
+    methodology that produced them (an index into `methodologies`).
+    """
+
+    COLUMNS = ["ubo", "use", "area", "eligible", "importances",
+               "total_weighted", "max_weighted", "group_weighted", "group_max",
+               "final_score", "group_scores", "version"]
+
+    def __init__(self, ubo, use, area, eligible, importances, methodology=None):
+        methodology = register(methodology) if methodology else Methodology.current()
+        m = compiled_model()
+        self.ubo = np.asarray(ubo, dtype=np.int8)
+        self.use = np.asarray(use, dtype=np.int8)
+        self.area = np.asarray(area, dtype=np.int8)
+        self.eligible = np.asarray(eligible, dtype=bool)
+        self.importances = np.asarray(importances, dtype=np.int8)
+
+        imp = self.importances.astype(np.int32)
+        bvi = np.tile(methodology.base_vector(), (len(self.ubo), 1))
+        bvi[:, m.vat_col] = methodology.vat_cube()[self.ubo, self.use, self.area]
+        bvi[:, m.eligibility_col] = np.where(self.eligible, methodology.eligible_score,
+                                           methodology.ineligible_score)
+        weighted = bvi * imp
+        onehot = m.onehot.astype(np.int32)
+        self.total_weighted = weighted.sum(axis=1, dtype=np.int32)
+        self.max_weighted = 5 * imp.sum(axis=1, dtype=np.int32)
+        self.group_weighted = weighted @ onehot
+        self.group_max = (5 * imp) @ onehot
+        self.final_score = _round_scores(self.total_weighted, self.max_weighted)
+        self.group_scores = _round_scores(self.group_weighted, self.group_max)
+        self.methodologies = [methodology]
+        self.version = np.zeros(len(self.ubo), dtype=np.int16)
+
+    @classmethod
+    def from_assessments(cls, profiles, importances, methodology=None):
+        """Build from profile dicts and matching importance dicts."""
+        encoded = [encode_profile(p) for p in profiles]
+        ubo, use, area, eligible = zip(*encoded) if encoded else ([], [], [], [])
+        factor_ids = compiled_model().factor_ids
+        imp = [ImportanceVector.from_dict(i).values for i in importances]
+        return cls(ubo, use, area, eligible, np.array(imp).reshape(-1, len(factor_ids)), methodology)
+
+    def __len__(self):
+        return len(self.ubo)
+
+    def _refresh_scores(self, rows):
+        self.final_score[rows] = _round_scores(self.total_weighted[rows], self.max_weighted[rows])
+        self.group_scores[rows] = _round_scores(self.group_weighted[rows], self.group_max[rows])
+
+    def _methodology_index(self, methodology):
+        fingerprints = [m.fingerprint() for m in self.methodologies]
+        if methodology.fingerprint() not in fingerprints:
+            self.methodologies.append(methodology)
+            return len(self.methodologies) - 1
+        return fingerprints.index(methodology.fingerprint())
+
+    def version_of(self, i):
+        return self.methodologies[self.version[i]].version
+
+    def rescore(self, new):
+        """Bring every row up to methodology `new` in place.
+
+        Only factors that differ between a row's version and `new` are
+        touched: their Δscore × importance is added to the stored weighted
+        totals, then final and group scores are re-rounded for those rows.
+        Returns the list of diffs that were applied.
+        """
+        new = register(new)
+        target = self._methodology_index(new)
+        applied = []
+        for vi, old in enumerate(list(self.methodologies)):
+            if vi == target:
+                continue
+            rows = self.version == vi
+            if not rows.any():
+                continue
+            if rows.all():
+                rows = slice(None)
+            d = diff(old, new)
+            if not is_empty(d):
+                self._apply(d, rows, old, new)
+                self._refresh_scores(rows)
+            self.version[rows] = target
+            applied.append(d)
+        return applied
+
+    def _apply(self, d, rows, old, new):
+        cm = compiled_model()
+        imp = self.importances[rows]
+        delta_tw = np.zeros(imp.shape[0], dtype=np.int32)
+        delta_gw = np.zeros((imp.shape[0], cm.onehot.shape[1]), dtype=np.int32)
+
+        for fid, (before, after) in d["factors"].items():
+            col = cm.factor_ids.index(fid)
+            contrib = (after - before) * imp[:, col].astype(np.int32)
+            delta_tw += contrib
+            delta_gw[:, cm.factor_group[col]] += contrib
+
+        if d["vat"]:
+            dv = new.vat_cube() - old.vat_cube()
+            dv = dv[self.ubo[rows], self.use[rows], self.area[rows]]
+            contrib = dv * imp[:, cm.vat_col].astype(np.int32)
+            delta_tw += contrib
+            delta_gw[:, cm.factor_group[cm.vat_col]] += contrib
+
+        if d["eligibility"]:
+            de = np.where(self.eligible[rows],
+                          new.eligible_score - old.eligible_score,
+                          new.ineligible_score - old.ineligible_score)
+            contrib = de * imp[:, cm.eligibility_col].astype(np.int32)
+            delta_tw += contrib
+            delta_gw[:, cm.factor_group[cm.eligibility_col]] += contrib
+
+        self.total_weighted[rows] += delta_tw
+        self.group_weighted[rows] += delta_gw
+
+    def save(self, path):
+        """Write the columns and, as JSON, the definition of every methodology
+        they refer to."""
+        np.savez_compressed(
+            path, methodologies=np.array([json.dumps(m.to_dict()) for m in self.methodologies]),
+            **{c: getattr(self, c) for c in self.COLUMNS},
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved history and register its methodologies; raises
+        ValueError if a stored definition does not match its fingerprint."""
+        data = np.load(path)
+        if "methodologies" not in data:
+            raise ValueError(f"{path} has no methodology definitions; it was saved "
+                             "before they were stored and cannot be re-scored")
+        history = cls.__new__(cls)
+        for c in cls.COLUMNS:
+            setattr(history, c, data[c])
+        history.methodologies = [register(Methodology.from_dict(json.loads(str(d))))
+                                 for d in data["methodologies"]]
+        return history
@@ -0,0 +1,217 @@
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+
+import numpy as np
+
+import datapack
+from datapack import PROFILE_FIELDS
+from scoring import get_vat_score, get_eligibility_score
+
+# ── Compact assessment records ────────────────────────────────────────────────
+# Profile, ImportanceVector and ScoreResult hold an assessment in slots and
+# byte arrays instead of dicts. Factor metadata (name, group, remark) is never
+# copied: a result keeps a reference to its data pack's factor tuples, which
+# every session shares, and builds FactorRow views over them on access. All
+# of them keep the read-only dict interface the renderers already use —
+# profile["vessel_use"], importances.get(fid, 3), f["remark"].
+
+class Profile(Mapping):
+    __slots__ = PROFILE_FIELDS
+
+    def __init__(self, vessel_use, cruising_area, ubo_residency, ownership,
+                 jurisdiction, vessel_stage):
+        values = (vessel_use, cruising_area, ubo_residency, ownership, jurisdiction, vessel_stage)
+        for field, value in zip(PROFILE_FIELDS, values):
+            object.__setattr__(self, field, sys.intern(value))
+
+    @classmethod
+    def from_dict(cls, profile):
+        if isinstance(profile, cls):
+            return profile
+        return cls(**{f: profile[f] for f in PROFILE_FIELDS})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Profile is read-only")
+
+    def __getitem__(self, key):
+        if key not in PROFILE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(PROFILE_FIELDS)
+
+    def __len__(self):
+        return len(PROFILE_FIELDS)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, f) for f in PROFILE_FIELDS))
+
+    def __reduce__(self):
+        return Profile, tuple(getattr(self, f) for f in PROFILE_FIELDS)
+
+    def __repr__(self):
+        return f"Profile({', '.join(f'{f}={getattr(self, f)!r}' for f in PROFILE_FIELDS)})"
+
+@lru_cache(maxsize=4)
+def _factor_index(pack):
+    factor_ids = tuple(f[0] for f in pack.factors)
+    return factor_ids, {fid: i for i, fid in enumerate(factor_ids)}
+
+class ImportanceVector(Mapping):
+    """Importances 1–5 as one byte per factor, in data-pack order."""
+
+    __slots__ = ("factor_ids", "_index", "values")
+
+    def __init__(self, values, pack=None):
+        self.factor_ids, self._index = _factor_index(pack or datapack.current())
+        self.values = array("B", values)
+        if len(self.values) != len(self.factor_ids):
+            raise ValueError(f"expected {len(self.factor_ids)} importances, got {len(self.values)}")
+        if self.values and not 1 <= min(self.values) <= max(self.values) <= 5:
+            raise ValueError("importances must be 1-5")
+
+    @classmethod
+    def from_dict(cls, importances, pack=None):
+        """From a fid → importance dict; missing factors get the default 3.
+        A vector built for another factor order is realigned by id."""
+        pack = pack or datapack.current()
+        if isinstance(importances, cls):
+            if importances.factor_ids == _factor_index(pack)[0]:
+                return importances
+            importances = dict(importances.items())
+        return cls([importances.get(f[0], 3) for f in pack.factors], pack)
+
+    def __getitem__(self, fid):
+        return self.values[self._index[fid]]
+
+    def __iter__(self):
+        return iter(self.factor_ids)
+
+    def __len__(self):
+        return len(self.factor_ids)
+
+    def __hash__(self):
+        return hash((self.factor_ids, self.values.tobytes()))
+
+    def __reduce__(self):
+        return _importance_vector, (self.factor_ids, self.values.tobytes())
+
+    def as_array(self):
+        return np.frombuffer(self.values, dtype=np.uint8)
+
+    def __repr__(self):
+        return f"ImportanceVector({self.values.tolist()})"
+
+def _importance_vector(factor_ids, values):
+    vec = ImportanceVector.__new__(ImportanceVector)
+    vec.factor_ids, vec._index = factor_ids, {fid: i for i, fid in enumerate(factor_ids)}
+    vec.values = array("B", values)
+    return vec
+
+class FactorRow(Mapping):
+    """Read-only view of one factor in a ScoreResult, with the keys of a
+    compute_score factor dict."""
+
+    __slots__ = ("_result", "_i")
+    KEYS = ("id", "name", "group", "bvi_score", "importance", "weighted", "max_weighted", "remark")
+
+    def __init__(self, result, i):
+        self._result = result
+        self._i = i
+
+    def __getitem__(self, key):
+        r, i = self._result, self._i
+        if key == "bvi_score":
+            return r.scores[i]
+        if key == "importance":
+            return r.importances.values[i]
+        if key == "weighted":
+            return r.scores[i] * r.importances.values[i]
+        if key == "max_weighted":
+            return 5 * r.importances.values[i]
+        if key in _META_COLUMNS:
+            return r.factors[i][_META_COLUMNS[key]]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"FactorRow({dict(self)!r})"
+
+# Position of each metadata key in a DataPack factor tuple.
+_META_COLUMNS = {"id": 0, "name": 1, "group": 3, "remark": 4}
+
+class ScoreResult(Sequence):
+    """Factor scores, final score and group scores for one assessment.
+
+    Indexing and iteration yield FactorRow views, so a ScoreResult can be
+    passed wherever a compute_score factor_details list was used.
+    """
+
+    __slots__ = ("factors", "groups", "scores", "importances", "final_score", "group_values")
+
+    def __init__(self, factors, groups, scores, importances, final_score, group_values):
+        self.factors = factors
+        self.groups = groups
+        self.scores = array("B", scores)
+        self.importances = importances
+        self.final_score = final_score
+        self.group_values = array("B", group_values)
+
+    @classmethod
+    def compute(cls, profile, importances, pack=None):
+        """Score a profile; same arithmetic as scoring.compute_score."""
+        pack = pack or datapack.current()
+        importances = ImportanceVector.from_dict(importances, pack)
+        vat_score = get_vat_score(profile["ubo_residency"], profile["vessel_use"],
+                                  profile["cruising_area"], pack)
+        eligibility_score = get_eligibility_score(profile["jurisdiction"], pack)
+
+        group_names = [g for g, _ in pack.groups]
+        group_tw = [0] * len(group_names)
+        group_mw = [0] * len(group_names)
+        group_n = [0] * len(group_names)
+        scores = []
+        for (fid, _, base_score, group, _), imp in zip(pack.factors, importances.values):
+            if fid == "vat_tariff":
+                bvi_score = vat_score
+            elif fid == "eligibility":
+                bvi_score = eligibility_score
+            else:
+                bvi_score = base_score
+            scores.append(bvi_score)
+            g = group_names.index(group)
+            group_tw[g] += bvi_score * imp
+            group_mw[g] += 5 * imp
+            group_n[g] += 1
+
+        tw, mw = sum(group_tw), sum(group_mw)
+        final_score = round((tw / mw) * 100) if mw > 0 else 0
+        present = [g for g, n in enumerate(group_n) if n]
+        groups = tuple(group_names[g] for g in present)
+        group_values = [round((group_tw[g] / group_mw[g]) * 100) if group_mw[g] > 0 else 0
+                        for g in present]
+        return cls(pack.factors, groups, scores, importances, final_score, group_values)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [FactorRow(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self.scores)
+        if not 0 <= i < len(self.scores):
+            raise IndexError(i)
+        return FactorRow(self, i)
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def group_scores(self):
+        return dict(zip(self.groups, self.group_values))
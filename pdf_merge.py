@@ -0,0 +1,110 @@
+import re
+
+# ── PDF page merge ────────────────────────────────────────────────────────────
+# Appends the pages of one PDF to another by copying their objects byte for
+# byte. It only reads what ReportLab writes: a classic xref table, no object
+# streams and no incremental updates. The base document keeps its object
+# numbers, catalog, info and ID. The appended document's objects are
+# renumbered past the base's, its page tree's kids join the base page tree,
+# and its catalog, info and page tree root are dropped. Only the dictionaries
+# are rewritten; stream data is copied unchanged.
+
+_XREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF\s*$")
+_XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+_REF = re.compile(rb"(\d+) 0 R\b")
+_STREAM = re.compile(rb">>\s*stream\r?\n")
+
+class PdfMergeError(ValueError):
+    pass
+
+def _trailer_ref(trailer, key):
+    m = re.search(rb"/" + key + rb"\s+(\d+) 0 R", trailer)
+    return int(m.group(1)) if m else None
+
+def _parse(pdf):
+    """(header, {number: object body}, trailer dict text) of a ReportLab PDF."""
+    m = _XREF.search(pdf)
+    if not m:
+        raise PdfMergeError("no startxref")
+    xref_at = int(m.group(1))
+    section = re.match(rb"xref\s+0 (\d+)\s+", pdf[xref_at:])
+    if not section:
+        raise PdfMergeError("not a classic xref table")
+    size = int(section.group(1))
+    start = xref_at + section.end()
+    entries = _XREF_ENTRY.findall(pdf, start, start + 20 * size + 20)[:size]
+    offsets = {n: int(off) for n, (off, _, kind) in enumerate(entries) if kind == b"n"}
+    if not offsets:
+        raise PdfMergeError("no objects")
+    # Objects are written back to back, so each ends where the next begins.
+    bounds = sorted(offsets.items(), key=lambda item: item[1])
+    objects = {}
+    for (n, off), (_, end) in zip(bounds, bounds[1:] + [(None, xref_at)]):
+        raw = pdf[off:end]
+        head = re.match(rb"%d 0 obj\s*" % n, raw)
+        tail = raw.rstrip().rfind(b"endobj")
+        if not head or tail < 0:
+            raise PdfMergeError(f"object {n} is not where the xref says")
+        objects[n] = raw[head.end():tail]
+    trailer = pdf[xref_at:pdf.rfind(b"startxref")]
+    return pdf[:bounds[0][1]], objects, trailer
+
+def _split(body):
+    """(dictionary, stream part) of an object body; the stream part may be empty."""
+    m = _STREAM.search(body)
+    return (body[:m.start() + 2], body[m.start() + 2:]) if m else (body, b"")
+
+def _kids(pages):
+    m = re.search(rb"/Kids\s*\[([^\]]*)\]", pages)
+    count = re.search(rb"/Count\s+(\d+)", pages)
+    if not m or not count:
+        raise PdfMergeError("page tree root without /Kids or /Count")
+    return [int(n) for n in _REF.findall(m.group(1))], int(count.group(1))
+
+def _pages_root(objects, trailer):
+    catalog = objects[_trailer_ref(trailer, b"Root")]
+    m = re.search(rb"/Pages\s+(\d+) 0 R", catalog)
+    if not m:
+        raise PdfMergeError("catalog without /Pages")
+    return int(m.group(1))
+
+def append_pages(pdf, appendix):
+    """`pdf` with every page of `appendix` added at the end."""
+    header, objects, trailer = _parse(pdf)
+    _, extra, extra_trailer = _parse(appendix)
+    root = _pages_root(objects, trailer)
+    extra_root = _pages_root(extra, extra_trailer)
+    shift = max(objects)
+
+    def renumber(match):
+        n = int(match.group(1))
+        return b"%d 0 R" % (root if n == extra_root else n + shift)
+
+    dropped = {extra_root, _trailer_ref(extra_trailer, b"Root"), _trailer_ref(extra_trailer, b"Info")}
+    for n, body in extra.items():
+        if n not in dropped:
+            dictionary, stream = _split(body)
+            objects[n + shift] = _REF.sub(renumber, dictionary) + stream
+
+    kids, count = _kids(objects[root])
+    extra_kids, extra_count = _kids(extra[extra_root])
+    kids += [n + shift for n in extra_kids]
+    pages = re.sub(rb"/Kids\s*\[[^\]]*\]",
+                   b"/Kids [ " + b" ".join(b"%d 0 R" % n for n in kids) + b" ]",
+                   objects[root], count=1)
+    objects[root] = re.sub(rb"/Count\s+\d+", b"/Count %d" % (count + extra_count), pages, count=1)
+
+    out = bytearray(header)
+    offsets = {}
+    for n in sorted(objects):
+        offsets[n] = len(out)
+        out += b"%d 0 obj\n" % n + objects[n].rstrip() + b"\nendobj\n"
+    size = max(objects) + 1
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for n in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[n] if n in offsets else b"0000000000 65535 f \n"
+    keep = re.findall(rb"/(?:Root|Info) \d+ 0 R|/ID\s*\[[^\]]*\]", trailer)
+    out += b"trailer\n<<\n" + b"\n".join([b"/Size %d" % size] + keep) + b"\n>>\n"
+    out += b"startxref\n%d\n%%%%EOF\n" % xref_at
+    return bytes(out)
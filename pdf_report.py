@@ -1,14 +1,29 @@
 import io
+import os
 from datetime import datetime
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import mm
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    HRFlowable, KeepTogether
+    HRFlowable, KeepTogether, KeepInFrame, Flowable
 )
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+from reportlab.lib.fonts import addMapping
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.graphics.shapes import Drawing, Rect, Line, String
+from reportlab.graphics import renderPDF
+
+import datapack
+import profiling
+from advisory import advisory_notes
+from fleet import fleet_notes
+from pdf_merge import append_pages
+from scoring import SCORE_SCALE, VERDICT_BANDS, top_factors
 
 # ── Palette ───────────────────────────────────────────────────────────────────
 NAVY      = colors.HexColor("#0d2137")
@@ -26,6 +41,38 @@ ML = MR = 18 * mm
 MT = MB = 15 * mm
 CONTENT_W = W - ML - MR
 
+# ── Fonts ─────────────────────────────────────────────────────────────────────
+# The base-14 fonts have no ★ ☆ ● ○ ⚠, so those are set in BVISymbols.ttf, a
+# cut of DejaVu Sans holding only those glyphs (see data/fonts). ReportLab
+# embeds TTFs as subsets, so a report carries just the glyphs it uses.
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fonts")
+SYMBOL_FONT = "BVISymbols"
+
+@lru_cache(maxsize=1)
+def symbol_font():
+    """Register the symbol font once; Helvetica if the file is missing."""
+    path = os.path.join(FONT_DIR, SYMBOL_FONT + ".ttf")
+    if not os.path.exists(path):
+        return "Helvetica"
+    pdfmetrics.registerFont(TTFont(SYMBOL_FONT, path))
+    for bold in (0, 1):
+        for italic in (0, 1):
+            addMapping(SYMBOL_FONT, bold, italic, SYMBOL_FONT)
+    return SYMBOL_FONT
+
+def sym(glyphs):
+    return f'<font name="{symbol_font()}">{glyphs}</font>'
+
+# ── Compact mode ──────────────────────────────────────────────────────────────
+# Compact reports compress their page streams and must fit in a byte budget;
+# they are what gets emailed and archived in bulk.
+
+COMPACT_BYTE_BUDGET = 40_000
+
+class PdfBudgetExceeded(ValueError):
+    pass
+
 # ── Styles ────────────────────────────────────────────────────────────────────
 def styles():
     return {
@@ -79,19 +126,81 @@ def styles():
             leading=13, alignment=TA_CENTER),
     }
 
-def score_bar(score, max_score=5, width=60, height=7):
-    """Draw a mini score bar as a Table cell."""
-    filled = int(round((score / max_score) * width))
-    empty = width - filled
-    bar_color = GOLD if score >= 4 else (colors.HexColor("#2980b9") if score == 3 else RED_FLAG)
-    data = [[""]]
-    t = Table(data, colWidths=[filled * mm / 3], rowHeights=[height])
-    t.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, -1), bar_color),
-        ("LINEABOVE",  (0, 0), (-1, -1), 0, colors.white),
-        ("LINEBELOW",  (0, 0), (-1, -1), 0, colors.white),
-    ]))
-    return t
+# ── Charts ────────────────────────────────────────────────────────────────────
+# Vector bar charts drawn with reportlab.graphics primitives. Drawings are
+# cached on their input tuples and shared between reports; each use gets a
+# fresh ChartFlowable because platypus keeps layout state on the flowable.
+
+def scale_color(value, lo=0, hi=100):
+    t = min(max((value - lo) / (hi - lo), 0.0), 1.0)
+    for (t0, c0), (t1, c1) in zip(SCORE_SCALE, SCORE_SCALE[1:]):
+        if t <= t1:
+            return colors.linearlyInterpolatedColor(
+                colors.HexColor(c0), colors.HexColor(c1), t0, t1, t)
+    return colors.HexColor(SCORE_SCALE[-1][1])
+
+CHART_W = CONTENT_W - 12  # inside the frame padding
+
+def _bar_chart(rows, max_value, label_w, row_h, bar_h, font_size, ticks, color_fn):
+    """rows: (label, value, value_text). Returns a Drawing CHART_W wide."""
+    axis_h = 12
+    height = len(rows) * row_h + axis_h
+    d = Drawing(CHART_W, height)
+    x0 = label_w + 6
+    bar_w = CHART_W - x0 - 30
+
+    for t in ticks:
+        x = x0 + bar_w * t / max_value
+        d.add(Line(x, axis_h, x, height, strokeColor=GREY_LINE, strokeWidth=0.4))
+        d.add(String(x, 2, str(t), fontName="Helvetica", fontSize=6.5,
+                     fillColor=GREY_TXT, textAnchor="middle"))
+
+    for i, (label, value, value_text) in enumerate(rows):
+        y = height - (i + 1) * row_h
+        mid = y + row_h / 2
+        d.add(String(label_w, mid - font_size / 3, label, fontName="Helvetica",
+                     fontSize=font_size, fillColor=NAVY, textAnchor="end"))
+        w = bar_w * value / max_value
+        d.add(Rect(x0, mid - bar_h / 2, w, bar_h, fillColor=color_fn(value),
+                   strokeColor=None))
+        inside = w > font_size * 2.5
+        d.add(String(x0 + w - 4 if inside else x0 + w + 3, mid - font_size / 3, value_text,
+                     fontName="Helvetica-Bold", fontSize=font_size,
+                     fillColor=colors.white if inside else NAVY,
+                     textAnchor="end" if inside else "start"))
+    return d
+
+class ChartFlowable(Flowable):
+    def __init__(self, drawing):
+        super().__init__()
+        self.drawing = drawing
+        self.width, self.height = drawing.width, drawing.height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        renderPDF.draw(self.drawing, self.canv, 0, 0)
+
+@lru_cache(maxsize=256)
+def _group_drawing(group_items):
+    rows = [(g, sc, str(sc)) for g, sc in group_items]
+    return _bar_chart(rows, 100, label_w=175, row_h=22, bar_h=15, font_size=9,
+                      ticks=range(0, 101, 20), color_fn=scale_color)
+
+@lru_cache(maxsize=1024)
+def _factor_drawing(factor_items):
+    rows = [(name, sc, f"{sc}  ·  P{imp}") for name, sc, imp in factor_items]
+    return _bar_chart(rows, 5, label_w=200, row_h=13, bar_h=8, font_size=7,
+                      ticks=range(0, 6), color_fn=lambda v: scale_color(v, 0, 5))
+
+def group_score_chart(group_items):
+    """Horizontal bars for ((group, score), ...) on a 0–100 axis."""
+    return ChartFlowable(_group_drawing(group_items))
+
+def factor_score_chart(factor_items):
+    """BVI rating bars for ((name, bvi_score, importance), ...) on a 0–5 axis."""
+    return ChartFlowable(_factor_drawing(factor_items))
 
 def get_verdict(score):
     if score >= 85:
@@ -108,25 +217,19 @@ def importance_dots(imp, max_imp=5):
     empty  = "○" * (max_imp - imp)
     return filled + empty
 
-def generate_pdf(profile, factor_details, final_score, group_scores):
-    S = styles()
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buf, pagesize=A4,
-        leftMargin=ML, rightMargin=MR,
-        topMargin=MT, bottomMargin=MB,
-        title="BVI Flag Suitability Report",
-        author="Jejo Joy",
-    )
+# ── Report sections ───────────────────────────────────────────────────────────
+# Both templates share the opening (banner, score panel, profile) and the
+# notes; "summary" swaps the charts and per-factor detail for a category
+# table and the top strengths and gaps so it fits on one page, and ends with
+# the closing CTA. The full report ends with the appendix (see below).
 
-    story = []
-    date_str = datetime.now().strftime("%d %B %Y")
-    verdict = get_verdict(final_score)
+TEMPLATES = ("full", "summary")
 
+def _banner(S, title, date_str):
     # ── HEADER BANNER (navy table) ────────────────────────────────────────────
     header_data = [[
-        Paragraph("BVI Flag Suitability Report", S["title"]),
-        Paragraph(f"BVI Flag Suitability Report<br/>{date_str}", S["subtitle"]),
+        Paragraph(title, S["title"]),
+        Paragraph(f"{title}<br/>{date_str}", S["subtitle"]),
     ]]
     header_table = Table(header_data, colWidths=[CONTENT_W * 0.6, CONTENT_W * 0.4])
     header_table.setStyle(TableStyle([
@@ -137,13 +240,13 @@ def generate_pdf(profile, factor_details, final_score, group_scores):
         ("LEFTPADDING", (0, 0), (0, -1),  14),
         ("RIGHTPADDING",(-1,0), (-1,-1),  14),
     ]))
-    story.append(header_table)
-    story.append(Spacer(1, 8))
+    return [header_table, Spacer(1, 8)]
 
+def _score_panel(S, label, score, verdict):
     # ── SCORE PANEL ───────────────────────────────────────────────────────────
     score_data = [[
-        Paragraph("BVI SUITABILITY SCORE", S["score_label"]),
-        Paragraph(str(final_score), S["score_big"]),
+        Paragraph(label, S["score_label"]),
+        Paragraph(str(score), S["score_big"]),
         Paragraph("out of 100", S["score_label"]),
         Paragraph(verdict, S["verdict"]),
     ]]
@@ -159,8 +262,11 @@ def generate_pdf(profile, factor_details, final_score, group_scores):
         ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
         ("LINEAFTER",     (0, 0), (2, 0),   0.5, colors.HexColor("#2a4a6e")),
     ]))
-    story.append(score_table)
-    story.append(Spacer(1, 10))
+    return [score_table, Spacer(1, 10)]
+
+def _opening(S, profile, final_score, date_str):
+    story = _banner(S, "BVI Flag Suitability Report", date_str)
+    story += _score_panel(S, "BVI SUITABILITY SCORE", final_score, get_verdict(final_score))
 
     # ── PROFILE SUMMARY ───────────────────────────────────────────────────────
     story.append(Paragraph("Your Vessel Profile", S["section"]))
@@ -197,40 +303,126 @@ def generate_pdf(profile, factor_details, final_score, group_scores):
     story.append(ptable)
     story.append(Spacer(1, 12))
 
+    return story
+
+def _notes(S, notes, style="body", pad=8):
+    # ── SPECIAL NOTES ─────────────────────────────────────────────────────────
+    story = []
+    if notes:
+        story.append(Paragraph("Important Notes", S["section"]))
+        story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+        for note in notes:
+            note_table = Table(
+                [[Paragraph(f"{sym('⚠')}  <b>{escape(note['title'])}:</b> {escape(note['text'])}",
+                            S[style])]],
+                colWidths=[CONTENT_W],
+            )
+            note_table.setStyle(TableStyle([
+                ("BACKGROUND",    (0,0),(-1,-1), colors.HexColor("#fff8e6")),
+                ("LEFTPADDING",   (0,0),(-1,-1), 10),
+                ("TOPPADDING",    (0,0),(-1,-1), pad),
+                ("BOTTOMPADDING", (0,0),(-1,-1), pad),
+                ("LINEBELOW",     (0,0),(-1,-1), 0.5, GOLD),
+            ]))
+            story.append(note_table)
+            story.append(Spacer(1, 6))
+
+    return story
+
+def _closing(S, date_str=None):
+    # ── CTA PANEL ─────────────────────────────────────────────────────────────
+    story = []
+    story.append(Spacer(1, 10))
+    cta_data = [[
+        Paragraph("Ready to Register?", S["cta_head"]),
+        Paragraph(
+            "Get in touch to discuss your specific situation and explore the registration process.<br/>"
+            "<b>Jejo Joy</b>  ·  jejojoy.neelankavil@bvimaritime.vg",
+            S["cta_body"]
+        ),
+    ]]
+    cta_table = Table(cta_data, colWidths=[CONTENT_W * 0.35, CONTENT_W * 0.65])
+    cta_table.setStyle(TableStyle([
+        ("BACKGROUND",    (0,0),(-1,-1), NAVY),
+        ("TOPPADDING",    (0,0),(-1,-1), 14),
+        ("BOTTOMPADDING", (0,0),(-1,-1), 14),
+        ("LEFTPADDING",   (0,0),(-1,-1), 14),
+        ("RIGHTPADDING",  (0,0),(-1,-1), 14),
+        ("VALIGN",        (0,0),(-1,-1), "MIDDLE"),
+        ("LINEAFTER",     (0,0),(0,-1),  0.5, colors.HexColor("#2a4a6e")),
+    ]))
+    story.append(cta_table)
+
+    # ── FOOTER ────────────────────────────────────────────────────────────────
+    story.append(Spacer(1, 8))
+    story.append(HRFlowable(width=CONTENT_W, thickness=0.5, color=GREY_LINE))
+    story.append(Spacer(1, 4))
+    stamp = f"  ·  {date_str}" if date_str else ""
+    story.append(Paragraph(
+        f"Generated by the BVI Flag Suitability Tool{stamp}  ·  "
+        "This report is for guidance purposes only and does not constitute legal or financial advice.",
+        S["footer"]
+    ))
+
+    return story
+
+def _full_body(S, factor_details, group_scores, robustness):
     # ── CATEGORY SCORES ───────────────────────────────────────────────────────
+    story = []
     story.append(Paragraph("Score by Category", S["section"]))
     story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
 
-    gs_data = [["Category", "Score", "Visual"]]
-    for grp, sc in group_scores.items():
-        bar_len = int(sc / 5)  # 0-20 chars
-        bar_str = "█" * bar_len + "░" * (20 - bar_len)
-        bar_color = GOLD if sc >= 70 else (colors.HexColor("#2980b9") if sc >= 50 else RED_FLAG)
-        gs_data.append([
-            Paragraph(grp, S["body"]),
-            Paragraph(f"<b>{sc}</b>", S["body"]),
-            Paragraph(f'<font color="#{bar_color.hexval()[2:]}">{bar_str}</font>', S["body"]),
-        ])
-
-    gs_table = Table(gs_data, colWidths=[CONTENT_W * 0.45, CONTENT_W * 0.1, CONTENT_W * 0.45])
-    gs_table.setStyle(TableStyle([
-        ("BACKGROUND",    (0, 0), (-1, 0),  NAVY),
-        ("TEXTCOLOR",     (0, 0), (-1, 0),  WHITE),
-        ("FONTNAME",      (0, 0), (-1, 0),  "Helvetica-Bold"),
-        ("FONTSIZE",      (0, 0), (-1, 0),  9),
-        ("TOPPADDING",    (0, 0), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ("LEFTPADDING",   (0, 0), (-1, -1), 8),
-        ("ROWBACKGROUNDS",(0, 1), (-1, -1), [WHITE, LIGHT_BG]),
-        ("LINEBELOW",     (0, 0), (-1, -1), 0.3, GREY_LINE),
-        ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
+    story.append(group_score_chart(tuple(group_scores.items())))
+    story.append(Spacer(1, 10))
+    story.append(KeepTogether([
+        Paragraph("Factor Ratings", S["group_header"]),
+        Paragraph("BVI rating for each factor (out of 5), with your priority shown as P1–P5.",
+                  S["small"]),
+        Spacer(1, 4),
+        factor_score_chart(tuple(
+            (f["name"], f["bvi_score"], f["importance"]) for f in factor_details)),
     ]))
-    story.append(gs_table)
     story.append(Spacer(1, 14))
 
+    # ── ROBUSTNESS BAND (optional) ────────────────────────────────────────────
+    if robustness:
+        pct = robustness["percentiles"]
+        story.append(Paragraph("Score Robustness", S["section"]))
+        story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+        story.append(Paragraph(
+            f"With each of your priorities varied by up to ±{robustness['spread']} "
+            f"({robustness['distribution']} distribution, {robustness['n_samples']:,} samples), "
+            f"the score stays between <b>{pct[5]}</b> and <b>{pct[95]}</b> in 90% of cases "
+            f"(median <b>{pct[50]}</b>, mean {robustness['mean']:.1f} ± {robustness['std']:.1f}).",
+            S["body"]
+        ))
+        story.append(Spacer(1, 6))
+
+        rb_data = [["Verdict", "Probability"]]
+        for band, prob in robustness["verdicts"].items():
+            rb_data.append([Paragraph(band, S["body"]), Paragraph(f"<b>{prob:.1%}</b>", S["body"])])
+        rb_table = Table(rb_data, colWidths=[CONTENT_W * 0.45, CONTENT_W * 0.2])
+        rb_table.setStyle(TableStyle([
+            ("BACKGROUND",    (0, 0), (-1, 0),  NAVY),
+            ("TEXTCOLOR",     (0, 0), (-1, 0),  WHITE),
+            ("FONTNAME",      (0, 0), (-1, 0),  "Helvetica-Bold"),
+            ("FONTSIZE",      (0, 0), (-1, 0),  9),
+            ("TOPPADDING",    (0, 0), (-1, -1), 5),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+            ("LEFTPADDING",   (0, 0), (-1, -1), 8),
+            ("ROWBACKGROUNDS",(0, 1), (-1, -1), [WHITE, LIGHT_BG]),
+            ("LINEBELOW",     (0, 0), (-1, -1), 0.3, GREY_LINE),
+            ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
+        ]))
+        rb_table.hAlign = "LEFT"
+        story.append(rb_table)
+        story.append(Spacer(1, 14))
+
     # ── FACTOR DETAIL BY GROUP ────────────────────────────────────────────────
     story.append(Paragraph("Detailed Factor Analysis", S["section"]))
-    story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=8))
+    story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+    story.append(Paragraph("What each factor covers is set out in the appendix.", S["small"]))
+    story.append(Spacer(1, 6))
 
     GROUPS_ORDER = [
         "Financial", "Reputation & Legal Standing",
@@ -272,13 +464,10 @@ def generate_pdf(profile, factor_details, final_score, group_scores):
             imp_color = "#c9a84c"
 
             row_data = [[
-                [
-                    Paragraph(f["name"], S["factor_name"]),
-                    Paragraph(f["remark"], S["remark"]),
-                ],
-                Paragraph(f'<font color="#c9a84c"><b>{stars}</b></font><br/>'
+                Paragraph(f["name"], S["factor_name"]),
+                Paragraph(f'<font color="#c9a84c"><b>{sym(stars)}</b></font><br/>'
                           f'<font size="7" color="#888">BVI Rating</font>', S["small"]),
-                Paragraph(f'<font color="{imp_color}"><b>{imp_dots}</b></font><br/>'
+                Paragraph(f'<font color="{imp_color}"><b>{sym(imp_dots)}</b></font><br/>'
                           f'<font size="7" color="#888">Your Priority</font>', S["small"]),
             ]]
 
@@ -287,75 +476,309 @@ def generate_pdf(profile, factor_details, final_score, group_scores):
                 colWidths=[CONTENT_W * 0.62, CONTENT_W * 0.19, CONTENT_W * 0.19],
             )
             row_table.setStyle(TableStyle([
-                ("VALIGN",        (0, 0), (-1, -1), "TOP"),
-                ("TOPPADDING",    (0, 0), (-1, -1), 6),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+                ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
+                ("TOPPADDING",    (0, 0), (-1, -1), 4),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
                 ("LEFTPADDING",   (0, 0), (0, -1),  4),
                 ("RIGHTPADDING",  (-1,0), (-1,-1),  4),
                 ("LINEBELOW",     (0, 0), (-1, -1), 0.3, GREY_LINE),
             ]))
-            story.append(KeepTogether(row_table))
+            story.append(row_table)
 
         story.append(Spacer(1, 8))
 
-    # ── SPECIAL NOTES ─────────────────────────────────────────────────────────
-    notes = []
-    p = profile
-    if p.get("ubo_residency") == "EU" and p.get("vessel_use") == "Commercial" and p.get("cruising_area") == "EU":
-        notes.append("For an EU-resident UBO operating commercially within EU waters, an EU flag such as Malta may offer structural VAT advantages. We recommend discussing your specific tax position with a maritime tax advisor before making a final decision.")
-    if p.get("jurisdiction") == "Other (not listed)":
-        notes.append("Your nationality or incorporation jurisdiction is not directly on the BVI eligible list. Incorporating a BVI company or a company in an eligible jurisdiction resolves this — BVI's corporate registry makes this a straightforward step.")
+    return story
 
-    if notes:
-        story.append(Paragraph("Important Notes", S["section"]))
-        story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
-        for note in notes:
-            note_table = Table(
-                [[Paragraph(f"⚠  {note}", S["body"])]],
-                colWidths=[CONTENT_W],
-            )
-            note_table.setStyle(TableStyle([
-                ("BACKGROUND",    (0,0),(-1,-1), colors.HexColor("#fff8e6")),
-                ("LEFTPADDING",   (0,0),(-1,-1), 10),
-                ("TOPPADDING",    (0,0),(-1,-1), 8),
-                ("BOTTOMPADDING", (0,0),(-1,-1), 8),
-                ("LINEBELOW",     (0,0),(-1,-1), 0.5, GOLD),
+def _factor_rows(S, factors):
+    rows = []
+    for f in factors:
+        stars = "★" * f["bvi_score"] + "☆" * (5 - f["bvi_score"])
+        rows.append([
+            Paragraph(f["name"], S["small"]),
+            Paragraph(f'<font color="#c9a84c">{sym(stars)}</font>'
+                      f'  <font color="#888888">P{f["importance"]}</font>', S["small"]),
+        ])
+    return rows
+
+def _summary_body(S, factor_details, group_scores):
+    story = []
+    half = CONTENT_W / 2 - 6
+    list_style = TableStyle([
+        ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING",    (0, 0), (-1, -1), 3),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+        ("LEFTPADDING",   (0, 0), (-1, -1), 6),
+        ("LINEBELOW",     (0, 0), (-1, -1), 0.3, GREY_LINE),
+    ])
+
+    # ── CATEGORY TABLE ────────────────────────────────────────────────────────
+    g_data = [["Category", "Score"]]
+    for group, score in group_scores.items():
+        g_data.append([
+            Paragraph(group, S["body"]),
+            Paragraph(f'<font color="{scale_color(score)}"><b>{score}</b></font>', S["body"]),
+        ])
+    g_table = Table(g_data, colWidths=[half * 0.8, half * 0.2])
+    g_table.setStyle(TableStyle([
+        ("BACKGROUND",    (0, 0), (-1, 0),  NAVY),
+        ("TEXTCOLOR",     (0, 0), (-1, 0),  WHITE),
+        ("FONTNAME",      (0, 0), (-1, 0),  "Helvetica-Bold"),
+        ("FONTSIZE",      (0, 0), (-1, 0),  9),
+        ("TOPPADDING",    (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ("LEFTPADDING",   (0, 0), (-1, -1), 8),
+        ("ROWBACKGROUNDS",(0, 1), (-1, -1), [WHITE, LIGHT_BG]),
+        ("LINEBELOW",     (0, 0), (-1, -1), 0.3, GREY_LINE),
+        ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
+    ]))
+
+    # ── STRENGTHS & GAPS ──────────────────────────────────────────────────────
+    strengths, gaps = top_factors(factor_details)
+    key_factors = [Paragraph("Top Strengths", S["group_header"])]
+    s_table = Table(_factor_rows(S, strengths), colWidths=[half * 0.62, half * 0.38])
+    s_table.setStyle(list_style)
+    key_factors += [s_table, Spacer(1, 8), Paragraph("Main Gaps", S["group_header"])]
+    if gaps:
+        g_list = Table(_factor_rows(S, gaps), colWidths=[half * 0.62, half * 0.38])
+        g_list.setStyle(list_style)
+        key_factors.append(g_list)
+    else:
+        key_factors.append(Paragraph("No factor falls short of a full rating.", S["small"]))
+
+    story.append(Paragraph("Score by Category &amp; Key Factors", S["section"]))
+    story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+    layout = Table([[g_table, key_factors]], colWidths=[CONTENT_W / 2] * 2)
+    layout.setStyle(TableStyle([
+        ("VALIGN",        (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING",   (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING",  (0, 0), (0, -1),  12),
+        ("LEFTPADDING",   (1, 0), (1, -1),  12),
+        ("TOPPADDING",    (0, 0), (-1, -1), 0),
+    ]))
+    story.append(layout)
+    story.append(Spacer(1, 12))
+    return story
+
+# ── Appendix ──────────────────────────────────────────────────────────────────
+# The factor definitions, the methodology and the contact panel read the same
+# in every full report built from one data pack. They are rendered once per
+# pack (and compression setting) and their pages are appended to each full
+# report by pdf_merge, so platypus only flows the client's own pages.
+
+def _factor_definitions(S, pack):
+    story = []
+    story.append(Paragraph("Appendix — Factor Definitions", S["section"]))
+    story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+    for group_name, _ in pack.groups:
+        factors = [(name, remark) for _, name, _, group, remark in pack.factors if group == group_name]
+        if not factors:
+            continue
+        story.append(Paragraph(group_name, S["group_header"]))
+        for name, remark in factors:
+            story.append(KeepTogether([
+                Paragraph(name, S["factor_name"]),
+                Paragraph(remark, S["remark"]),
+                Spacer(1, 6),
             ]))
-            story.append(note_table)
-            story.append(Spacer(1, 6))
+    return story
 
-    # ── CTA PANEL ─────────────────────────────────────────────────────────────
-    story.append(Spacer(1, 10))
-    cta_data = [[
-        Paragraph("Ready to Register?", S["cta_head"]),
-        Paragraph(
-            "Get in touch to discuss your specific situation and explore the registration process.<br/>"
-            "<b>Jejo Joy</b>  ·  jejojoy.neelankavil@bvimaritime.vg",
-            S["cta_body"]
-        ),
-    ]]
-    cta_table = Table(cta_data, colWidths=[CONTENT_W * 0.35, CONTENT_W * 0.65])
-    cta_table.setStyle(TableStyle([
-        ("BACKGROUND",    (0,0),(-1,-1), NAVY),
-        ("TOPPADDING",    (0,0),(-1,-1), 14),
-        ("BOTTOMPADDING", (0,0),(-1,-1), 14),
-        ("LEFTPADDING",   (0,0),(-1,-1), 14),
-        ("RIGHTPADDING",  (0,0),(-1,-1), 14),
-        ("VALIGN",        (0,0),(-1,-1), "MIDDLE"),
-        ("LINEAFTER",     (0,0),(0,-1),  0.5, colors.HexColor("#2a4a6e")),
+def _methodology(S, pack):
+    story = []
+    story.append(Paragraph("Appendix — Methodology", S["section"]))
+    story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+    bands = ", ".join(
+        f"<b>{verdict}</b> from {threshold}" if threshold else f"<b>{verdict}</b> below {previous}"
+        for (threshold, verdict, _), (previous, _, _) in zip(VERDICT_BANDS, [(None,) * 3] + VERDICT_BANDS))
+    for text in (
+        "Each factor carries a BVI rating from 1 to 5. Most ratings are fixed; two depend "
+        "on your answers. The VAT and tariff rating follows from the UBO's residency, the "
+        "vessel's use and its cruising area. The eligibility rating is "
+        f"{pack.eligible_score} when the owning jurisdiction qualifies to register a "
+        f"BVI vessel and {pack.ineligible_score} when it does not.",
+        "Your priority for each factor, from 1 to 5, weights its rating. The score is the "
+        "sum of rating × priority over all factors, as a percentage of the sum of "
+        "5 × priority, rounded to the nearest whole number. Category scores are worked out "
+        "the same way over the factors of each category.",
+        f"Verdicts: {bands}.",
+        f"Factor data version {pack.version}.",
+    ):
+        story.append(Paragraph(text, S["body"]))
+        story.append(Spacer(1, 6))
+    return story
+
+@datapack.pack_cached(maxsize=2)
+def appendix_pdf(pack, compact=False):
+    """The full report's appendix pages for `pack`, as PDF bytes."""
+    S = styles()
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4,
+        leftMargin=ML, rightMargin=MR,
+        topMargin=MT, bottomMargin=MB,
+        pageCompression=1 if compact else 0,
+    )
+    story = _factor_definitions(S, pack)
+    story += _methodology(S, pack)
+    story += _closing(S)
+    doc.build(story)
+    return buf.getvalue()
+
+@profiling.profiled(lambda *args, template="full", **kwargs: f"generate_pdf:{template}")
+def generate_pdf(profile, factor_details, final_score, group_scores, robustness=None, notes=None,
+                 compact=False, budget=COMPACT_BYTE_BUDGET, template="full", date=None):
+    """Build the report PDF, dated `date` (default today), and return its bytes.
+
+    template="summary" gives a one-page overview (score, categories, top
+    strengths and gaps, notes) instead of the full factor-by-factor report;
+    robustness is only shown in the full report, which ends with the cached
+    appendix pages (appendix_pdf). With compact=True page
+    streams are compressed and a result larger than `budget` bytes raises
+    PdfBudgetExceeded.
+    """
+    if template not in TEMPLATES:
+        raise ValueError(f"unknown report template: {template}")
+    S = styles()
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4,
+        leftMargin=ML, rightMargin=MR,
+        topMargin=MT, bottomMargin=MB,
+        title="BVI Flag Suitability Report" if template == "full" else "BVI Flag Suitability Summary",
+        author="Jejo Joy",
+        pageCompression=1 if compact else 0,
+    )
+    date_str = (date or datetime.now()).strftime("%d %B %Y")
+    if notes is None:
+        notes = advisory_notes(profile)
+
+    story = _opening(S, profile, final_score, date_str)
+    if template == "summary":
+        story += _summary_body(S, factor_details, group_scores)
+    else:
+        story += _full_body(S, factor_details, group_scores, robustness)
+    if template == "summary":
+        story += _notes(S, notes, style="small", pad=5)
+        story += _closing(S, date_str)
+        # Long notes shrink the page rather than spilling onto a second one.
+        story = [KeepInFrame(CONTENT_W - 12, H - MT - MB - 12, story, mode="shrink")]
+    else:
+        story += _notes(S, notes)
+
+    doc.build(story)
+    pdf = buf.getvalue()
+    if template == "full":
+        pdf = append_pages(pdf, appendix_pdf(bool(compact)))
+    if compact and budget is not None and len(pdf) > budget:
+        raise PdfBudgetExceeded(f"compact report is {len(pdf):,} bytes, budget {budget:,}")
+    return pdf
+
+# ── Fleet report ──────────────────────────────────────────────────────────────
+# One document for every vessel of an owner (see fleet.py): the fleet score
+# panel, category averages, a row per vessel with outliers marked, and the
+# advisory notes once each. Shares styles, banner, notes and closing with
+# the single-vessel report.
+
+def _fleet_table(S, vessels):
+    data = [["Vessel", "Use", "Cruising Area", "Jurisdiction", "Score", "Verdict"]]
+    marked = []
+    for i, row in enumerate(vessels, 1):
+        p = row["profile"]
+        score = row["final_score"]
+        data.append([
+            Paragraph(f"<b>{escape(row['name'])}</b>", S["small"]),
+            Paragraph(p["vessel_use"], S["small"]),
+            Paragraph(p["cruising_area"], S["small"]),
+            Paragraph(p["jurisdiction"], S["small"]),
+            Paragraph(f'<font color="{scale_color(score)}"><b>{score}</b></font>', S["body"]),
+            Paragraph(get_verdict(score), S["small"]),
+        ])
+        if row["outlier"]:
+            marked.append(("BACKGROUND", (0, i), (-1, i), colors.HexColor("#fff8e6")))
+    table = Table(data, colWidths=[CONTENT_W * w for w in (0.2, 0.15, 0.2, 0.17, 0.08, 0.2)],
+                  repeatRows=1)
+    table.setStyle(TableStyle([
+        ("BACKGROUND",    (0, 0), (-1, 0),  NAVY),
+        ("TEXTCOLOR",     (0, 0), (-1, 0),  WHITE),
+        ("FONTNAME",      (0, 0), (-1, 0),  "Helvetica-Bold"),
+        ("FONTSIZE",      (0, 0), (-1, 0),  8.5),
+        ("TOPPADDING",    (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ("LEFTPADDING",   (0, 0), (-1, -1), 6),
+        ("ROWBACKGROUNDS",(0, 1), (-1, -1), [WHITE, LIGHT_BG]),
+        ("LINEBELOW",     (0, 0), (-1, -1), 0.3, GREY_LINE),
+        ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
+        *marked,
     ]))
-    story.append(cta_table)
+    return table
 
-    # ── FOOTER ────────────────────────────────────────────────────────────────
-    story.append(Spacer(1, 8))
-    story.append(HRFlowable(width=CONTENT_W, thickness=0.5, color=GREY_LINE))
-    story.append(Spacer(1, 4))
+def _fleet_body(S, fleet):
+    story = []
+    n = len(fleet["vessels"])
     story.append(Paragraph(
-        f"Generated by the BVI Flag Suitability Tool  ·  {date_str}  ·  "
-        "This report is for guidance purposes only and does not constitute legal or financial advice.",
-        S["footer"]
+        f"{n} vessel{'s' if n != 1 else ''} under one beneficial owner resident in "
+        f"<b>{fleet['ubo_residency']}</b>, scored with the same priorities. "
+        f"Fleet median <b>{fleet['median_score']:g}</b>.",
+        S["body"]
     ))
+    story.append(Spacer(1, 6))
+
+    # ── CATEGORY AVERAGES ─────────────────────────────────────────────────────
+    story.append(Paragraph("Fleet Average by Category", S["section"]))
+    story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+    story.append(group_score_chart(tuple(
+        (group, round(avg)) for group, avg in fleet["group_averages"].items())))
+    story.append(Spacer(1, 10))
+
+    # ── VESSELS ───────────────────────────────────────────────────────────────
+    story.append(Paragraph("Vessels", S["section"]))
+    story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+    story.append(_fleet_table(S, fleet["vessels"]))
+    story.append(Spacer(1, 10))
+
+    # ── OUTLIERS ──────────────────────────────────────────────────────────────
+    outliers = [row for row in fleet["vessels"] if row["outlier"]]
+    if outliers:
+        averages = fleet["group_averages"]
+        story.append(Paragraph("Outliers", S["section"]))
+        story.append(HRFlowable(width=CONTENT_W, thickness=1, color=GOLD, spaceAfter=6))
+        for row in outliers:
+            # The category furthest from the fleet average explains most of the gap.
+            group = max(row["group_scores"],
+                        key=lambda g: abs(row["group_scores"][g] - averages[g]))
+            diff = row["group_scores"][group] - averages[group]
+            story.append(Paragraph(
+                f"<b>{escape(row['name'])}</b> scores {row['final_score']}, {row['outlier']} the fleet "
+                f"median; the largest difference is in {group} "
+                f"({row['group_scores'][group]} against a fleet average of {averages[group]:.0f}, "
+                f"{diff:+.0f}).",
+                S["body"]
+            ))
+            story.append(Spacer(1, 4))
+        story.append(Spacer(1, 6))
+    return story
+
+@profiling.profiled("generate_fleet_pdf")
+def generate_fleet_pdf(fleet, compact=False, date=None):
+    """Build the consolidated report for a scored fleet (fleet.score_fleet),
+    dated `date` (default today), and return its bytes."""
+    S = styles()
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4,
+        leftMargin=ML, rightMargin=MR,
+        topMargin=MT, bottomMargin=MB,
+        title="BVI Flag Suitability Fleet Report",
+        author="Jejo Joy",
+        pageCompression=1 if compact else 0,
+    )
+    date_str = (date or datetime.now()).strftime("%d %B %Y")
+    average = round(fleet["average_score"])
+
+    story = _banner(S, "BVI Flag Fleet Report", date_str)
+    story += _score_panel(S, "FLEET AVERAGE SCORE", average, get_verdict(average))
+    story += _fleet_body(S, fleet)
+    story += _notes(S, fleet_notes(fleet), style="small", pad=5)
+    story += _closing(S, date_str)
 
     doc.build(story)
-    buf.seek(0)
     return buf.getvalue()
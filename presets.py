@@ -0,0 +1,54 @@
+import numpy as np
+
+import datapack
+from scoring import VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, get_verdict
+from models import ImportanceVector
+from batch_scoring import encode_profile, factor_score_matrix, batch_final_scores
+
+# ── Persona presets ───────────────────────────────────────────────────────────
+# Named importance vectors for the owners most prospects resemble, declared
+# in the data pack's "presets" list. A preset names only the factors it moves
+# away from the default 3. Its "profile" holds the answers that describe the
+# persona; prewarm.py warms those profiles first.
+#
+# The score depends only on the UBO residency, use, cruising area and whether
+# the jurisdiction is eligible, so one batched pass per pack scores every
+# preset against every profile. The priorities page reads preset scores from
+# that table instead of scoring them on each rerun.
+
+def presets():
+    """The current pack's presets, in declared order."""
+    return datapack.current().presets
+
+@datapack.pack_cached(maxsize=1)
+def preset_vectors(pack):
+    """{preset id: ImportanceVector}."""
+    return {p["id"]: ImportanceVector.from_dict(p["importances"], pack) for p in pack.presets}
+
+@datapack.pack_cached(maxsize=1)
+def preset_score_table(pack):
+    """Final scores, shape (presets, UBO residencies, uses, areas, eligible)."""
+    shape = (len(UBO_RESIDENCIES), len(VESSEL_USES), len(CRUISING_AREAS), 2)
+    ubo, use, area, eligible = np.indices(shape)
+    if not pack.presets:
+        return np.zeros((0,) + shape, dtype=np.int64)
+    bvi = factor_score_matrix(ubo, use, area, eligible.astype(bool))
+    imp = np.array([ImportanceVector.from_dict(p["importances"], pack).as_array()
+                    for p in pack.presets], dtype=np.float64)
+    return batch_final_scores(bvi[None, :, :], imp[:, None, :]).reshape((len(imp),) + shape)
+
+def preset_scores(profile):
+    """{preset id: (final score, verdict)} for `profile`, read from the table."""
+    table = preset_score_table()
+    ubo, use, area, eligible = encode_profile(profile)
+    return {p["id"]: (int(score), get_verdict(int(score))[0])
+            for p, score in zip(presets(), table[:, ubo, use, area, int(eligible)])}
+
+def matching_preset(importances):
+    """Id of the preset whose priorities equal `importances`, or None."""
+    vector = ImportanceVector.from_dict(importances)
+    return next((pid for pid, v in preset_vectors().items() if v == vector), None)
+
+def fits(preset, profile):
+    """Whether `profile` has every answer the preset's persona gives."""
+    return all(profile.get(field) == value for field, value in preset.get("profile", {}).items())
@@ -0,0 +1,187 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from concurrent.futures import (
+    ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait,
+)
+from itertools import product
+
+import audit
+import scoring
+from assessment import assess, assessment_hash, assessment_key, report_pdf_args, pdf_cache_key
+from html_report import html_report
+from models import ImportanceVector
+from presets import presets, preset_vectors, fits
+from pdf_report import generate_pdf
+from scoring import (
+    VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES,
+    VESSEL_STAGES, OTHER_JURISDICTION,
+)
+
+# ── Cache pre-warming ─────────────────────────────────────────────────────────
+# Fills the assessment, HTML and PDF caches ahead of the first visitors. The
+# assessments warmed first are the most frequent ones in the recent audit log,
+# then each persona preset (presets.py) over the profiles that fit its
+# persona, then every profile the question page can produce with the default
+# priorities (all 3). Of the jurisdiction answer only its eligibility moves
+# the score, so the enumeration uses one eligible and one unlisted
+# jurisdiction instead of all of them. Each assessment is scored and its HTML rendered on the calling
+# thread; both PDFs (summary and full) are rendered by `workers` threads or
+# processes and stored in the app's render pool under the keys the report
+# page asks for. Warming stops at the time budget, and it fills at most half of
+# each cache so live sessions keep the rest.
+#
+# In the app, BVI_PREWARM=<seconds> starts a background warm-up when the
+# server runs its first session. `python prewarm.py` runs the same warm-up in
+# its own process; with BVI_CACHE_URL set it fills the shared result cache
+# (see result_cache.py) for every replica, otherwise it only reports what
+# fitted in the budget.
+
+BUDGET = float(os.environ.get("BVI_PREWARM", "0") or 0)
+WORKERS = int(os.environ.get("BVI_PREWARM_WORKERS", "2"))
+WARM_JURISDICTIONS = ("British Virgin Islands", OTHER_JURISDICTION)
+WARM_LIMIT = 512            # assessments; half the HTML cache (html_report._html)
+HISTORY_BYTES = 64 * 1024 * 1024
+
+def profile_combinations(jurisdictions=WARM_JURISDICTIONS):
+    """Every combination of the question page's answers, over `jurisdictions`."""
+    for use, area, ubo, ownership, jurisdiction, stage in product(
+            VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES,
+            jurisdictions, VESSEL_STAGES):
+        yield {"vessel_use": use, "cruising_area": area, "ubo_residency": ubo,
+               "ownership": ownership, "jurisdiction": jurisdiction, "vessel_stage": stage}
+
+def audit_history(directory=None, max_bytes=HISTORY_BYTES):
+    """Counter of assessment keys over the newest `max_bytes` of the audit log."""
+    directory = directory or audit.AUDIT_DIR
+    base, ext = os.path.splitext(audit.AUDIT_FILE)
+    paths = sorted(glob.glob(os.path.join(directory, f"{base}*{ext}")),
+                   key=os.path.getmtime, reverse=True)
+    counts, read = Counter(), 0
+    for path in paths:
+        if read >= max_bytes:
+            break
+        with open(path, "rb") as f:
+            for line in f:
+                read += len(line)
+                try:
+                    event = json.loads(line)
+                    counts[assessment_key(event["profile"], event["importances"])] += 1
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+    return counts
+
+def _answerable(profile):
+    options = {
+        "vessel_use": VESSEL_USES, "cruising_area": CRUISING_AREAS,
+        "ubo_residency": UBO_RESIDENCIES, "ownership": OWNERSHIP_TYPES,
+        "jurisdiction": scoring.ELIGIBLE_JURISDICTIONS + [OTHER_JURISDICTION],
+        "vessel_stage": VESSEL_STAGES,
+    }
+    return all(profile.get(field) in values for field, values in options.items())
+
+def candidates(history=None):
+    """(profile, importances) pairs, most frequent first, each once. Logged
+    assessments whose answers the current data pack no longer offers are left out."""
+    seen = set()
+
+    def unseen(profile, importances):
+        key = assessment_key(profile, importances)
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+
+    for (profile_items, importance_items), _ in (history or Counter()).most_common():
+        profile = dict(profile_items)
+        try:
+            importances = ImportanceVector.from_dict(dict(importance_items))
+        except ValueError:
+            continue
+        if _answerable(profile) and unseen(profile, importances):
+            yield profile, importances
+    vectors = preset_vectors()
+    for preset in presets():
+        for profile in profile_combinations():
+            if fits(preset, profile) and unseen(profile, vectors[preset["id"]]):
+                yield profile, vectors[preset["id"]]
+    defaults = ImportanceVector.from_dict({})
+    for profile in profile_combinations():
+        if unseen(profile, defaults):
+            yield profile, defaults
+
+def _render(profile, importances, date):
+    # Module-level so it can be pickled for a process pool.
+    args, kwargs = report_pdf_args(profile, assess(profile, importances), date=date)
+    return generate_pdf(*args, **kwargs, template="summary"), generate_pdf(*args, **kwargs)
+
+def warm(pool, cache, budget=60.0, workers=2, kind="thread", limit=WARM_LIMIT, history=None):
+    """Warm the render pool and result cache until `budget` seconds pass or
+    `limit` assessments are done; returns counts of what was warmed."""
+    deadline = time.monotonic() + budget
+    pdf_limit = pool.keep // 4   # two PDFs per assessment, half the pool
+    stats = {"assessments": 0, "pdfs": 0, "seconds": 0.0}
+    executor_cls = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+    executor = executor_cls(max_workers=workers)
+    pending = {}
+
+    def store(done):
+        for future in done:
+            key = pending.pop(future)
+            if future.exception() is None:
+                for pdf_key, pdf in zip((key + ":summary", key), future.result()):
+                    cache.put("pdf", pdf_key, pdf, keep_local=False)
+                    stats["pdfs"] += pool.put(pdf_key, pdf)
+
+    try:
+        for profile, importances in candidates(history):
+            if time.monotonic() >= deadline or stats["assessments"] >= limit:
+                break
+            input_hash = assessment_hash(profile, importances)
+            cache.get_or_compute("assessment", input_hash, lambda: assess(profile, importances))
+            html_report(profile, importances)
+            stats["assessments"] += 1
+            if stats["assessments"] <= pdf_limit:
+                today = datetime.now()
+                future = executor.submit(_render, profile, importances, today)
+                pending[future] = pdf_cache_key(input_hash, today)
+                if len(pending) >= 2 * workers:
+                    remaining = max(deadline - time.monotonic(), 0)
+                    store(wait(pending, remaining, return_when=FIRST_COMPLETED).done)
+        if pending:
+            store(wait(pending, max(deadline - time.monotonic(), 0)).done)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    stats["seconds"] = budget - max(deadline - time.monotonic(), 0)
+    return stats
+
+def start(pool, cache, budget=BUDGET, workers=WORKERS):
+    """Run warm() on a daemon thread when a budget is set; returns the thread or None."""
+    if budget <= 0:
+        return None
+    thread = threading.Thread(
+        target=lambda: warm(pool, cache, budget, workers, history=audit_history()),
+        name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    import result_cache
+    from render_pool import RenderPool
+    parser = argparse.ArgumentParser(description="Warm the assessment, HTML and PDF caches")
+    parser.add_argument("--budget", type=float, default=BUDGET or 60.0, help="seconds")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="parallel PDF renders")
+    parser.add_argument("--processes", action="store_true", help="render PDFs in processes, not threads")
+    parser.add_argument("--limit", type=int, default=WARM_LIMIT, help="most assessments to warm")
+    parser.add_argument("--audit-dir", help="audit log to rank assessments by (default: the app's)")
+    args = parser.parse_args()
+    pool = RenderPool(keep=4 * args.limit)
+    stats = warm(pool, result_cache.from_env(), args.budget, args.workers,
+                 "process" if args.processes else "thread", args.limit, audit_history(args.audit_dir))
+    print(f"warmed {stats['assessments']} assessments with their HTML reports and "
+          f"{stats['pdfs']} PDFs in {stats['seconds']:.1f} s")
@@ -0,0 +1,165 @@
+import json
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from itertools import count
+
+# ── Profiling mode ────────────────────────────────────────────────────────────
+# Opt-in with BVI_PROFILE=1. Each measured block (a page rerun, a
+# generate_pdf call) records its CPU time (per thread), wall time, peak
+# traced allocation above the block's starting point, and the allocation it
+# left behind, aggregated by label. tracemalloc's peak is process-wide and
+# has one reset, so it is only reset when the first block opens. A block's
+# peak is exact only if no other block was open at any point while it ran,
+# apart from blocks nested inside it on its own thread. Any other overlap
+# makes it a shared peak. That covers a block nested inside another, and
+# blocks running at the same time on other threads, such as PDF renders
+# during a rerun. Shared peaks may include other blocks' allocations or an
+# earlier high-water mark. They are counted and averaged apart from exact
+# ones and are not used for sizing. Allocations by unmeasured threads still
+# count towards every peak. Reruns cut short by st.rerun() are not recorded.
+# When disabled every hook is a no-op and generate_pdf is not wrapped at
+# all.
+
+ENABLED = os.environ.get("BVI_PROFILE", "") not in ("", "0")
+TRACE_FRAMES = int(os.environ.get("BVI_PROFILE_FRAMES", "8"))
+DUMP_PATH = os.environ.get("BVI_PROFILE_DUMP", "bvi_profile.json")
+
+_lock = threading.Lock()
+_stats = {}
+_open = {}          # block id -> [thread id, shared]
+_block_ids = count()
+
+def _ensure_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+def start(label):
+    """Begin measuring; returns a token for finish(), or None when disabled."""
+    if not ENABLED:
+        return None
+    _ensure_tracing()
+    thread = threading.get_ident()
+    with _lock:
+        if not _open:
+            tracemalloc.reset_peak()
+        # Peaks of blocks open on other threads now include this block's
+        # allocations; this block's own peak includes whatever came before.
+        for block in _open.values():
+            if block[0] != thread:
+                block[1] = True
+        block_id = next(_block_ids)
+        _open[block_id] = [thread, bool(_open)]
+        mem0 = tracemalloc.get_traced_memory()[0]
+    return label, block_id, time.thread_time(), time.perf_counter(), mem0
+
+def finish(token):
+    if token is None:
+        return
+    label, block_id, cpu0, wall0, mem0 = token
+    with _lock:
+        current, peak = tracemalloc.get_traced_memory()
+        shared = _open.pop(block_id)[1]
+    record(label, cpu=time.thread_time() - cpu0, wall=time.perf_counter() - wall0,
+           peak=max(peak - mem0, 0), retained=current - mem0, shared=shared)
+
+def record(label, cpu, wall, peak, retained, shared=False):
+    with _lock:
+        s = _stats.get(label)
+        if s is None:
+            s = _stats[label] = {"count": 0, "cpu": 0.0, "cpu_max": 0.0, "wall": 0.0,
+                                 "peaks": 0, "peak": 0, "peak_max": 0,
+                                 "shared": 0, "shared_peak": 0, "retained": 0}
+        s["count"] += 1
+        s["cpu"] += cpu
+        s["cpu_max"] = max(s["cpu_max"], cpu)
+        s["wall"] += wall
+        if shared:
+            s["shared"] += 1
+            s["shared_peak"] += peak
+        else:
+            s["peaks"] += 1
+            s["peak"] += peak
+            s["peak_max"] = max(s["peak_max"], peak)
+        s["retained"] += retained
+
+@contextmanager
+def measure(label):
+    token = start(label)
+    try:
+        yield
+    finally:
+        finish(token)
+
+def profiled(label):
+    """Decorator measuring each call; `label` may be a function of the call's
+    arguments. Returns the function unchanged when profiling is off."""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with measure(label(*args, **kwargs) if callable(label) else label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# ── Reporting ─────────────────────────────────────────────────────────────────
+
+def stats():
+    """Per-label means and maxima; times in ms, memory in KiB. peak_kib and
+    peak_max_kib cover exact peaks only (None without any); shared peaks are
+    counted and averaged separately."""
+    with _lock:
+        snapshot = {label: dict(s) for label, s in _stats.items()}
+    return {
+        label: {
+            "count": s["count"],
+            "cpu_ms": 1000 * s["cpu"] / s["count"],
+            "cpu_max_ms": 1000 * s["cpu_max"],
+            "wall_ms": 1000 * s["wall"] / s["count"],
+            "peak_kib": s["peak"] / s["peaks"] / 1024 if s["peaks"] else None,
+            "peak_max_kib": s["peak_max"] / 1024 if s["peaks"] else None,
+            "shared_peaks": s["shared"],
+            "shared_peak_kib": s["shared_peak"] / s["shared"] / 1024 if s["shared"] else None,
+            "retained_kib": s["retained"] / s["count"] / 1024,
+        }
+        for label, s in sorted(snapshot.items())
+    }
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def top_allocations(limit=20, group_by="lineno"):
+    """Largest live allocation sites as dicts of site, size (KiB) and count."""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    top = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frame = stat.traceback[0]
+        top.append({"site": f"{frame.filename}:{frame.lineno}",
+                    "size_kib": stat.size / 1024, "count": stat.count})
+    return top
+
+def dump(path=None, limit=20):
+    """Write stats and top allocation sites as JSON; returns the path."""
+    path = path or DUMP_PATH
+    report = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid(),
+              "traced_kib": tracemalloc.get_traced_memory()[0] / 1024 if tracemalloc.is_tracing() else None,
+              "stats": stats(), "top_allocations": top_allocations(limit)}
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"profiling: wrote {path}", file=sys.stderr)
+    return path
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import (
+    Future, ThreadPoolExecutor, ProcessPoolExecutor, CancelledError, TimeoutError as FutureTimeout,
+)
+
+# ── Background render pool ────────────────────────────────────────────────────
+# PDF builds run on a small shared executor instead of the Streamlit script
+# thread. Jobs are keyed (normally by assessment hash) so a page that reruns
+# while its PDF is building polls the same job instead of submitting another.
+# Admission is bounded: once max_workers + max_queue jobs are in flight, new
+# keys are rejected with PoolBusy and the caller retries later.
+
+class PoolBusy(RuntimeError):
+    pass
+
+def _timed_call(fn, submitted, args, kwargs):
+    # Module-level so it can be pickled for a process pool.
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, submitted, started, time.time()
+
+class _Job:
+    __slots__ = ("key", "future", "submitted", "timed_out")
+
+    def __init__(self, key, future, submitted):
+        self.key = key
+        self.future = future
+        self.submitted = submitted
+        self.timed_out = False
+
+class RenderPool:
+    def __init__(self, max_workers=2, max_queue=8, timeout=60.0, keep=64, kind="thread"):
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="render")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._abandoned = set()
+        self._latencies = deque(maxlen=512)
+        self._waits = deque(maxlen=512)
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0,
+                          "rejected": 0, "timed_out": 0}
+
+    def _in_flight(self):
+        self._abandoned = {f for f in self._abandoned if not f.done()}
+        live = sum(1 for j in self._jobs.values() if not j.future.done())
+        return live + len(self._abandoned)
+
+    def _on_done(self, future):
+        with self._lock:
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self._counters["failed"] += 1
+                return
+            _, submitted, started, finished = future.result()
+            self._counters["completed"] += 1
+            self._latencies.append(finished - started)
+            self._waits.append(started - submitted)
+
+    def _evict(self):
+        while len(self._jobs) > self.keep:
+            for key, job in self._jobs.items():
+                if job.future.done():
+                    del self._jobs[key]
+                    break
+            else:
+                return
+
+    def has_room(self):
+        """Whether submit() would admit a new key right now."""
+        with self._lock:
+            return self._in_flight() < self.max_workers + self.max_queue
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Return the job for `key`, starting it if needed; raises PoolBusy."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.timed_out:
+                self._jobs.move_to_end(key)
+                return job
+            in_flight = self._in_flight()
+            if in_flight >= self.max_workers + self.max_queue:
+                self._counters["rejected"] += 1
+                raise PoolBusy(f"{in_flight} render jobs in flight")
+            submitted = time.time()
+            future = self._executor.submit(_timed_call, fn, submitted, args, kwargs)
+            job = _Job(key, future, submitted)
+            self._jobs[key] = job
+            self._counters["submitted"] += 1
+            self._evict()
+        future.add_done_callback(self._on_done)
+        return job
+
+    def put(self, key, value):
+        """Store a result rendered elsewhere under `key`, unless a job holds it already."""
+        now = time.time()
+        future = Future()
+        future.set_result((value, now, now, now))
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.timed_out:
+                return False
+            self._jobs[key] = _Job(key, future, now)
+            self._evict()
+        return True
+
+    def poll(self, key):
+        """(state, value) for a job: ready/pending/failed/timeout/missing."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return "missing", None
+            if job.timed_out:
+                return "timeout", None
+            f = job.future
+            if f.cancelled():
+                return "failed", CancelledError()
+            if f.done():
+                if f.exception() is not None:
+                    return "failed", f.exception()
+                return "ready", f.result()[0]
+            if time.time() - job.submitted > self.timeout:
+                # Running work cannot be interrupted; stop tracking it under
+                # this key but keep counting it against the admission limit.
+                job.timed_out = True
+                if not f.cancel():
+                    self._abandoned.add(f)
+                self._counters["timed_out"] += 1
+                del self._jobs[key]
+                return "timeout", None
+            return "pending", None
+
+    def wait(self, key, timeout):
+        """Block up to `timeout` seconds for a job, then poll it."""
+        job = self._jobs.get(key)
+        if job is not None:
+            try:
+                job.future.exception(timeout=timeout)
+            except (FutureTimeout, CancelledError):
+                pass
+        return self.poll(key)
+
+    def stats(self):
+        """Queue depth, in-flight count, counters and latency percentiles (s)."""
+        with self._lock:
+            in_flight = self._in_flight()
+            counters = dict(self._counters)
+            lat = sorted(self._latencies)
+            waits = sorted(self._waits)
+
+        def pct(values, p):
+            return values[min(int(p / 100 * len(values)), len(values) - 1)] if values else None
+
+        return {
+            "in_flight": in_flight,
+            "queue_depth": max(in_flight - self.max_workers, 0),
+            "capacity": self.max_workers + self.max_queue,
+            **counters,
+            "render_p50": pct(lat, 50), "render_p95": pct(lat, 95),
+            "queue_wait_p50": pct(waits, 50), "queue_wait_p95": pct(waits, 95),
+        }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
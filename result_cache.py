@@ -0,0 +1,423 @@
+import argparse
+import os
+import pickle
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from scoring import ENGINE_VERSION
+
+# ── Shared result cache ───────────────────────────────────────────────────────
+# Replicas behind a load balancer each keep their own in-process caches, so a
+# session that lands on another replica would score and render again. A
+# ResultCache is an in-process LRU in front of a shared backend that every
+# replica reaches:
+#
+#   SqliteBackend   one SQLite file; for a single host and for tests
+#   SocketBackend   a TCP key-value server speaking the GET / SET [PX] [NX] /
+#                   DEL subset of the Redis protocol. A Redis or Valkey
+#                   server fits; `python result_cache.py serve` is a local
+#                   stand-in.
+#
+# get_or_compute() is single-flight: concurrent calls for one key in a
+# process wait for the first, and across replicas the first to SET NX a
+# claim key computes while the others poll for its result. A claim expires
+# after CLAIM_TTL, so a replica that dies mid-render only delays the others.
+# Values are pickled, so point BVI_CACHE_URL only at a backend the replicas
+# alone can write. When the backend fails the cache falls back to the
+# local layer for RETRY_AFTER seconds and says so on stderr.
+#
+#   BVI_CACHE_URL=sqlite:///var/cache/bvi.db
+#   BVI_CACHE_URL=redis://cache:6379        (or tcp://127.0.0.1:6390)
+
+CACHE_URL = os.environ.get("BVI_CACHE_URL", "")
+CACHE_VERSION = "1"       # bump when a cached value's shape changes
+LOCAL_ENTRIES = 1024
+DEFAULT_TTL = 24 * 3600   # seconds; PDFs carry their render date
+CLAIM_TTL = 60.0
+CLAIM_POLL = 0.1
+RETRY_AFTER = 30.0
+SOCKET_TIMEOUT = 5.0
+
+class CacheProtocolError(RuntimeError):
+    pass
+
+BACKEND_ERRORS = (OSError, sqlite3.Error, CacheProtocolError)
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+# get(key) -> bytes or None; set(key, value, ttl); add(key, value, ttl) ->
+# True if the key was absent and is now set; delete(key). ttl is in seconds,
+# None for no expiry.
+
+class SqliteBackend:
+    PURGE_EVERY = 1000    # sets between sweeps of expired rows
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)")
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=SOCKET_TIMEOUT,
+                                                  isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def get(self, key):
+        row = self._db().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        db = self._db()
+        db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, value, expires))
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")   # outside the try: nothing to roll back if it fails
+        try:
+            db.execute("DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now))
+            added = db.execute("INSERT OR IGNORE INTO cache VALUES (?, ?, ?)",
+                               (key, value, now + ttl if ttl else None)).rowcount == 1
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return added
+
+    def delete(self, key):
+        self._db().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+def _resp_command(*parts):
+    out = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        elif isinstance(part, int):
+            part = b"%d" % part
+        out.append(b"$%d\r\n%s\r\n" % (len(part), part))
+    return b"".join(out)
+
+def _resp_read(f):
+    """One reply from a buffered socket file: str, int, bytes, None or list."""
+    line = f.readline()
+    if not line.endswith(b"\r\n"):
+        raise CacheProtocolError("connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind in (b":", b"$", b"*") and not rest.lstrip(b"-").isdigit():
+        raise CacheProtocolError(f"malformed reply {line[:20]!r}")
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise CacheProtocolError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        n = int(rest)
+        if n < 0:
+            return None
+        data = f.read(n + 2)
+        if len(data) != n + 2:
+            raise CacheProtocolError("connection closed")
+        return data[:-2]
+    if kind == b"*":
+        n = int(rest)
+        return None if n < 0 else [_resp_read(f) for _ in range(n)]
+    raise CacheProtocolError(f"unexpected reply {line[:20]!r}")
+
+class SocketBackend:
+    """Client for the Redis-protocol subset; one connection per thread."""
+
+    def __init__(self, host="127.0.0.1", port=6390, timeout=SOCKET_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _call(self, *parts):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        sock, f = conn
+        try:
+            sock.sendall(_resp_command(*parts))
+            return _resp_read(f)
+        except BACKEND_ERRORS:
+            # The stream may be mid-reply; start the next call on a new connection.
+            self._local.conn = None
+            f.close()
+            sock.close()
+            raise
+
+    def get(self, key):
+        return self._call("GET", key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._call("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            self._call("SET", key, value)
+
+    def add(self, key, value, ttl=None):
+        parts = ["SET", key, value, "NX"]
+        if ttl:
+            parts += ["PX", int(ttl * 1000)]
+        return self._call(*parts) == "OK"
+
+    def delete(self, key):
+        self._call("DEL", key)
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class ResultCache:
+    def __init__(self, backend=None, local_entries=LOCAL_ENTRIES, ttl=DEFAULT_TTL,
+                 claim_ttl=CLAIM_TTL):
+        self.backend = backend
+        self.local_entries = local_entries
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}".encode()
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._flights = {}
+        self._down_until = 0.0
+        self._counters = {"local_hits": 0, "shared_hits": 0, "computed": 0,
+                          "waited": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _key(self, kind, key):
+        return f"bvi:{CACHE_VERSION}:{ENGINE_VERSION}:{kind}:{key}"
+
+    def _remember(self, full_key, value):
+        with self._lock:
+            self._local[full_key] = value
+            self._local.move_to_end(full_key)
+            while len(self._local) > self.local_entries:
+                self._local.popitem(last=False)
+
+    def _shared(self, method, *args):
+        """Call the backend; on failure count it, take the backend out of use
+        for RETRY_AFTER seconds and return None."""
+        if self.backend is None or time.monotonic() < self._down_until:
+            return None
+        try:
+            return getattr(self.backend, method)(*args)
+        except BACKEND_ERRORS as e:
+            self._down_until = time.monotonic() + RETRY_AFTER
+            self._count("errors")
+            print(f"result cache: {type(self.backend).__name__}.{method} failed, "
+                  f"local only for {RETRY_AFTER:g} s: {e}", file=sys.stderr)
+            return None
+
+    def get_or_compute(self, kind, key, compute, ttl=None, keep_local=True):
+        """The value for (kind, key), computing it with compute() at most once
+        across threads and, through the backend, across replicas."""
+        full_key = self._key(kind, key)
+        with self._lock:
+            if full_key in self._local:
+                self._local.move_to_end(full_key)
+                self._counters["local_hits"] += 1
+                return self._local[full_key]
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+        if not leader:
+            self._count("waited")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._load_or_compute(full_key, compute, ttl or self.ttl)
+            if keep_local:
+                self._remember(full_key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[full_key]
+            flight.done.set()
+
+    def put(self, kind, key, value, ttl=None, keep_local=True):
+        """Store a value computed elsewhere, e.g. by a pre-warming worker."""
+        full_key = self._key(kind, key)
+        if keep_local:
+            self._remember(full_key, value)
+        self._shared("set", full_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl or self.ttl)
+
+    def _load_or_compute(self, full_key, compute, ttl):
+        claim_key = full_key + ":claim"
+        claimed = False
+        deadline = time.monotonic() + self.claim_ttl
+        while True:
+            blob = self._shared("get", full_key)
+            if blob is not None:
+                self._count("shared_hits")
+                return pickle.loads(blob)
+            claimed = self._shared("add", claim_key, self.owner, self.claim_ttl)
+            # None means the backend is unavailable: compute locally.
+            if claimed is not False or time.monotonic() >= deadline:
+                break
+            time.sleep(CLAIM_POLL)
+        try:
+            value = compute()
+            self._count("computed")
+            self._shared("set", full_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl)
+        finally:
+            if claimed:
+                self._shared("delete", claim_key)
+        return value
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, "local_entries": len(self._local),
+                    "backend": type(self.backend).__name__ if self.backend else None,
+                    "backend_down": time.monotonic() < self._down_until}
+
+def backend_from_url(url):
+    """SqliteBackend for sqlite:///path, SocketBackend for redis:// or tcp://host:port."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        return SqliteBackend(parsed.path)
+    if parsed.scheme in ("redis", "tcp"):
+        return SocketBackend(parsed.hostname or "127.0.0.1", parsed.port or 6379)
+    raise ValueError(f"unsupported cache URL: {url}")
+
+def from_env():
+    return ResultCache(backend_from_url(CACHE_URL))
+
+# ── Stand-in server ───────────────────────────────────────────────────────────
+# Enough of the Redis protocol for SocketBackend, in memory and
+# single-process, for local runs and tests of several replicas. Expired keys
+# are dropped when read and swept every SWEEP_EVERY writes.
+
+class _Store:
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.writes = 0
+
+    def _live(self, key, now):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        command = args[0].upper()
+        now = time.monotonic()
+        with self.lock:
+            if command == b"PING":
+                return "PONG"
+            if command == b"GET" and len(args) == 2:
+                entry = self._live(args[1], now)
+                return entry[0] if entry else None
+            if command == b"SET" and len(args) >= 3:
+                key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+                expires, nx = None, b"NX" in options
+                if b"PX" in options:
+                    expires = now + int(options[options.index(b"PX") + 1]) / 1000
+                if nx and self._live(key, now) is not None:
+                    return None
+                self.data[key] = (value, expires)
+                self.writes += 1
+                if self.writes % self.SWEEP_EVERY == 0:
+                    for k in [k for k, (_, e) in self.data.items() if e is not None and e <= now]:
+                        del self.data[k]
+                return "OK"
+            if command == b"DEL":
+                return sum(self.data.pop(k, None) is not None for k in args[1:])
+            if command == b"DBSIZE":
+                return len(self.data)
+            if command == b"FLUSHALL":
+                self.data.clear()
+                return "OK"
+        raise CacheProtocolError(f"unsupported command {command.decode(errors='replace')}")
+
+def _resp_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                args = _resp_read(self.rfile)
+            except (CacheProtocolError, OSError):
+                return
+            try:
+                if not isinstance(args, list) or not args:
+                    raise CacheProtocolError("expected a command array")
+                reply = _resp_reply(self.server.store.execute(args))
+            except CacheProtocolError as e:
+                reply = b"-ERR %s\r\n" % str(e).encode()
+            self.wfile.write(reply)
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=6390):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared result cache tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the in-memory stand-in server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    with StandInServer(args.host, args.port) as server:
+        print(f"result cache stand-in on tcp://{args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
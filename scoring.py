@@ -0,0 +1,115 @@
+import datapack
+# The profile options are defined in datapack.py, which checks pack rules
+# against them; they are re-exported here.
+from datapack import (
+    VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES, VESSEL_STAGES,
+    OTHER_JURISDICTION,
+)
+
+# ── Data ──────────────────────────────────────────────────────────────────────
+# FACTORS, VAT_MATRIX, GROUPS and ELIGIBLE_JURISDICTIONS come from the data
+# pack (see datapack.py) and are resolved on attribute access, so
+# `from scoring import FACTORS` always sees the currently loaded pack.
+# FACTORS rows are (id, name, base_score, group, remark); VAT_MATRIX maps
+# (ubo_residency, vessel_use, cruising_area) -> score.
+
+_PACK_ATTRS = {
+    "FACTORS": lambda p: p.factors,
+    "VAT_MATRIX": lambda p: p.vat_matrix,
+    "GROUPS": lambda p: p.groups,
+    "ELIGIBLE_JURISDICTIONS": lambda p: p.eligible_jurisdictions,
+    # Bump the pack version whenever a base_score, VAT_MATRIX cell or scoring
+    # constant changes so stored assessments can be re-scored (methodology.py).
+    "METHODOLOGY_VERSION": lambda p: p.version,
+    "VAT_DEFAULT_SCORE": lambda p: p.vat_default,
+    "ELIGIBLE_SCORE": lambda p: p.eligible_score,
+    "INELIGIBLE_SCORE": lambda p: p.ineligible_score,
+}
+
+def __getattr__(name):
+    if name in _PACK_ATTRS:
+        return _PACK_ATTRS[name](datapack.current())
+    raise AttributeError(f"module 'scoring' has no attribute '{name}'")
+
+def get_vat_score(ubo, use, area, pack=None):
+    pack = pack or datapack.current()
+    key = (ubo, use, area)
+    return pack.vat_matrix.get(key, pack.vat_default)
+
+def get_eligibility_score(jurisdiction, pack=None):
+    pack = pack or datapack.current()
+    if jurisdiction in pack.eligible_set:
+        return pack.eligible_score
+    return pack.ineligible_score
+
+def compute_score(profile, importances):
+    pack = datapack.current()
+    total_weighted = 0
+    max_weighted = 0
+    factor_details = []
+
+    vat_score = get_vat_score(profile["ubo_residency"], profile["vessel_use"], profile["cruising_area"], pack)
+    eligibility_score = get_eligibility_score(profile["jurisdiction"], pack)
+
+    for fid, fname, base_score, group, remark in pack.factors:
+        if fid == "vat_tariff":
+            bvi_score = vat_score
+        elif fid == "eligibility":
+            bvi_score = eligibility_score
+        else:
+            bvi_score = base_score
+
+        importance = importances.get(fid, 3)
+        weighted = bvi_score * importance
+        max_w = 5 * importance
+
+        total_weighted += weighted
+        max_weighted += max_w
+        factor_details.append({
+            "id": fid, "name": fname, "group": group,
+            "bvi_score": bvi_score, "importance": importance,
+            "weighted": weighted, "max_weighted": max_w,
+            "remark": remark,
+        })
+
+    final_score = round((total_weighted / max_weighted) * 100) if max_weighted > 0 else 0
+    return final_score, factor_details
+
+def compute_group_scores(factor_details):
+    group_scores = {}
+    for g, _ in datapack.current().groups:
+        gf = [f for f in factor_details if f["group"] == g]
+        if gf:
+            tw = sum(f["weighted"] for f in gf)
+            mw = sum(f["max_weighted"] for f in gf)
+            group_scores[g] = round((tw / mw) * 100) if mw > 0 else 0
+    return group_scores
+
+def top_factors(factor_details, n=3):
+    """(strengths, gaps): the n factors adding most weighted score, and the n
+    losing most of it (max_weighted − weighted) among those below a full 5."""
+    strengths = sorted(factor_details, key=lambda f: (-f["weighted"], -f["bvi_score"]))[:n]
+    short = [f for f in factor_details if f["bvi_score"] < 5]
+    gaps = sorted(short, key=lambda f: (f["weighted"] - f["max_weighted"], f["bvi_score"]))[:n]
+    return strengths, gaps
+
+# Version of the scoring arithmetic itself (weighting and rounding), as
+# distinct from the data pack's scores. Recorded with audited assessments.
+ENGINE_VERSION = "1"
+
+# Colour stops for 0–100 scores, shared by the on-screen charts and reports.
+SCORE_SCALE = [(0.0, "#c0392b"), (0.4, "#e67e22"), (0.7, "#2980b9"), (1.0, "#c9a84c")]
+
+# (min score, verdict, colour), highest band first
+VERDICT_BANDS = [
+    (85, "Excellent Fit", "#2e7d32"),
+    (70, "Strong Fit",    "#1565c0"),
+    (55, "Good Fit",      "#e65100"),
+    (0,  "Partial Fit",   "#c62828"),
+]
+
+def get_verdict(score):
+    for threshold, verdict, color in VERDICT_BANDS:
+        if score >= threshold:
+            return verdict, color
+    return VERDICT_BANDS[-1][1], VERDICT_BANDS[-1][2]
@@ -0,0 +1,230 @@
+import html
+import math
+import re
+from bisect import bisect_left
+from collections import namedtuple
+
+import datapack
+
+# ── Full-text search ──────────────────────────────────────────────────────────
+# An inverted index over the factor names, group names and remarks and the
+# advisory notes' titles and texts, built once per data pack. Words are
+# lowercased and Porter-stemmed, and stop words are dropped. Each posting
+# stores the term's whole BM25 weight for its document, since that weight
+# does not depend on the query. Field weights count a word in a name or
+# title FIELD_WEIGHTS times over, a simplified BM25F. A query is then a few
+# dict lookups and additions. The last query word also matches as a prefix
+# of the indexed words as written, so results follow the user as they type.
+
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = {"name": 3.0, "group": 1.5, "text": 1.0}
+PREFIX_MIN = 3        # shortest last word expanded as a prefix
+PREFIX_LIMIT = 20     # most vocabulary terms a prefix expands to
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by can for from has have if in into is it its may
+more most not of on or so such than that the their them then there these
+they this to was were which while who will with within without you your
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# ── Porter stemmer ────────────────────────────────────────────────────────────
+
+def _cons(w, i):
+    if w[i] in "aeiou":
+        return False
+    if w[i] == "y":
+        return i == 0 or not _cons(w, i - 1)
+    return True
+
+def _m(stem):
+    """Number of vowel-consonant sequences in `stem`."""
+    n, prev_vowel = 0, False
+    for i in range(len(stem)):
+        vowel = not _cons(stem, i)
+        if prev_vowel and not vowel:
+            n += 1
+        prev_vowel = vowel
+    return n
+
+def _has_vowel(stem):
+    return any(not _cons(stem, i) for i in range(len(stem)))
+
+def _double_cons(w):
+    return len(w) > 1 and w[-1] == w[-2] and _cons(w, len(w) - 1)
+
+def _cvc(w):
+    return (len(w) > 2 and _cons(w, len(w) - 3) and not _cons(w, len(w) - 2)
+            and _cons(w, len(w) - 1) and w[-1] not in "wxy")
+
+def _replace(w, rules, min_m):
+    for suffix, repl in rules:
+        if w.endswith(suffix):
+            stem = w[:len(w) - len(suffix)]
+            return stem + repl if _m(stem) > min_m else w
+    return w
+
+_STEP2 = [("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"),
+          ("izer", "ize"), ("abli", "able"), ("alli", "al"), ("entli", "ent"), ("eli", "e"),
+          ("ousli", "ous"), ("ization", "ize"), ("ation", "ate"), ("ator", "ate"),
+          ("alism", "al"), ("iveness", "ive"), ("fulness", "ful"), ("ousness", "ous"),
+          ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble")]
+_STEP3 = [("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"), ("ical", "ic"),
+          ("ful", ""), ("ness", "")]
+_STEP4 = ["al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment", "ent",
+          "ion", "ou", "ism", "ate", "iti", "ous", "ive", "ize"]
+
+def stem(w):
+    """Porter (1980) stem of a lowercase word."""
+    if len(w) <= 2:
+        return w
+    # Step 1a
+    if w.endswith("sses") or w.endswith("ies"):
+        w = w[:-2]
+    elif w.endswith("s") and not w.endswith("ss"):
+        w = w[:-1]
+    # Step 1b
+    if w.endswith("eed"):
+        if _m(w[:-3]) > 0:
+            w = w[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if w.endswith(suffix) and _has_vowel(w[:-len(suffix)]):
+                w = w[:-len(suffix)]
+                if w.endswith(("at", "bl", "iz")):
+                    w += "e"
+                elif _double_cons(w) and w[-1] not in "lsz":
+                    w = w[:-1]
+                elif _m(w) == 1 and _cvc(w):
+                    w += "e"
+                break
+    # Step 1c
+    if w.endswith("y") and _has_vowel(w[:-1]):
+        w = w[:-1] + "i"
+    w = _replace(w, _STEP2, 0)
+    w = _replace(w, _STEP3, 0)
+    # Step 4
+    for suffix in sorted(_STEP4, key=len, reverse=True):
+        if w.endswith(suffix):
+            stem_ = w[:-len(suffix)]
+            if _m(stem_) > 1 and (suffix != "ion" or stem_.endswith(("s", "t"))):
+                w = stem_
+            break
+    # Step 5
+    if w.endswith("e"):
+        stem_ = w[:-1]
+        if _m(stem_) > 1 or (_m(stem_) == 1 and not _cvc(stem_)):
+            w = stem_
+    if _m(w) > 1 and _double_cons(w) and w.endswith("l"):
+        w = w[:-1]
+    return w
+
+def terms(text):
+    """Stems of the words in `text`, stop words dropped, in order."""
+    return [stem(w) for w in _WORD.findall(text.lower()) if w not in STOP_WORDS]
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+
+SearchIndex = namedtuple("SearchIndex", ["docs", "postings", "vocabulary", "stems"])
+
+def _documents(pack):
+    groups = dict(pack.groups)
+    for fid, name, _, group, remark in pack.factors:
+        yield {"kind": "factor", "id": fid, "title": name, "group": group,
+               "icon": groups.get(group, ""), "text": remark,
+               "fields": {"name": name, "group": group, "text": remark}}
+    for note in pack.advisory_notes:
+        yield {"kind": "note", "id": note["id"], "title": note["title"], "group": "Advisory note",
+               "icon": "⚠️", "text": note["text"],
+               "fields": {"name": note["title"], "text": note["text"]}}
+
+@datapack.pack_cached(maxsize=1)
+def search_index(pack):
+    """Documents, term → ((doc, weight), ...) postings, the sorted vocabulary of
+    words as written and each word's stem."""
+    docs, freqs, lengths, stems = [], [], [], {}
+    for doc in _documents(pack):
+        tf = {}
+        length = 0.0
+        for field, text in doc.pop("fields").items():
+            weight = FIELD_WEIGHTS[field]
+            for word in _WORD.findall(text.lower()):
+                if word in STOP_WORDS:
+                    continue
+                term = stems.setdefault(word, stem(word))
+                tf[term] = tf.get(term, 0.0) + weight
+                length += weight
+        docs.append(doc)
+        freqs.append(tf)
+        lengths.append(length)
+
+    n = len(docs)
+    avg = sum(lengths) / n if n else 1.0
+    df = {}
+    for tf in freqs:
+        for term in tf:
+            df[term] = df.get(term, 0) + 1
+    postings = {}
+    for d, (tf, length) in enumerate(zip(freqs, lengths)):
+        norm = K1 * (1 - B + B * length / avg)
+        for term, f in tf.items():
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            postings.setdefault(term, []).append((d, idf * f * (K1 + 1) / (f + norm)))
+    postings = {term: tuple(p) for term, p in postings.items()}
+    return SearchIndex(tuple(docs), postings, tuple(sorted(stems)), stems)
+
+def _expand(index, word):
+    """Stems of the indexed words starting with `word`, for the word being typed.
+    The prefix is matched against words as written, since a partial word
+    seldom stems to a prefix of the full word's stem ("insura" vs "insur")."""
+    vocab = index.vocabulary
+    i = bisect_left(vocab, word)
+    out = {}
+    while i < len(vocab) and vocab[i].startswith(word) and len(out) < PREFIX_LIMIT:
+        out[index.stems[vocab[i]]] = None
+        i += 1
+    return list(out)
+
+def search(query, limit=8):
+    """Best matches for `query`: dicts with kind, id, title, group, icon, text,
+    score and the matched terms, highest score first."""
+    index = search_index()
+    words = [w for w in _WORD.findall(query.lower()) if w not in STOP_WORDS]
+    scores, matched = {}, {}
+    for i, word in enumerate(words):
+        candidates = [stem(word)]
+        if i == len(words) - 1 and len(word) >= PREFIX_MIN:
+            candidates += _expand(index, word)
+        for term in dict.fromkeys(candidates):
+            for d, weight in index.postings.get(term, ()):
+                scores[d] = scores.get(d, 0.0) + weight
+                matched.setdefault(d, set()).add(term)
+    ranked = sorted(scores, key=lambda d: (-scores[d], d))[:limit]
+    return [{**index.docs[d], "score": scores[d], "terms": frozenset(matched[d])} for d in ranked]
+
+def highlight(text, matched):
+    """HTML-escaped `text` with the words whose stem is in `matched` marked."""
+    out, pos = [], 0
+    for m in re.finditer(r"[A-Za-z0-9]+", text):
+        if stem(m.group().lower()) in matched:
+            out.append(html.escape(text[pos:m.start()]))
+            out.append(f'<mark class="search-hit">{html.escape(m.group())}</mark>')
+            pos = m.end()
+    out.append(html.escape(text[pos:]))
+    return "".join(out)
+
+def snippet(text, matched, width=220):
+    """About `width` characters of `text` around its first matched word, highlighted."""
+    if len(text) <= width:
+        return highlight(text, matched)
+    first = next((m.start() for m in re.finditer(r"[A-Za-z0-9]+", text)
+                  if stem(m.group().lower()) in matched), 0)
+    start = max(0, min(first - width // 3, len(text) - width))
+    if start:
+        start = text.find(" ", start) + 1
+    end = text.rfind(" ", start, start + width)
+    end = len(text) if start + width >= len(text) or end <= start else end
+    return (("… " if start else "") + highlight(text[start:end], matched)
+            + (" …" if end < len(text) else ""))
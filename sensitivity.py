@@ -0,0 +1,184 @@
+import numpy as np
+
+from scoring import (
+    VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES,
+    VESSEL_STAGES, OTHER_JURISDICTION, VERDICT_BANDS, get_verdict,
+)
+from batch_scoring import (
+    compiled_model, encode_profile, importance_vector, factor_score_matrix,
+    batch_final_scores,
+)
+
+# ── What-if questions ─────────────────────────────────────────────────────────
+# Jurisdiction only enters the model through eligibility, so its alternatives
+# are the two eligibility outcomes rather than every listed jurisdiction.
+
+ELIGIBLE_LABEL = "Eligible jurisdiction"
+
+WHATIF_QUESTIONS = [
+    ("vessel_use",    "Vessel Use",    VESSEL_USES),
+    ("cruising_area", "Cruising Area", CRUISING_AREAS),
+    ("ubo_residency", "UBO Residency", UBO_RESIDENCIES),
+    ("ownership",     "Ownership",     OWNERSHIP_TYPES),
+    ("jurisdiction",  "Jurisdiction",  [ELIGIBLE_LABEL, OTHER_JURISDICTION]),
+    ("vessel_stage",  "Vessel Stage",  VESSEL_STAGES),
+]
+
+def current_answer(profile, key):
+    if key == "jurisdiction":
+        return OTHER_JURISDICTION if profile["jurisdiction"] == OTHER_JURISDICTION else ELIGIBLE_LABEL
+    return profile[key]
+
+def what_if(profile, importances):
+    """Final score for every alternative answer to every profile question.
+
+    All variants are encoded as index rows and scored in one batched
+    evaluation. Returns (base_score, rows) where each row is a dict with
+    question key/label, option, score, delta and whether it is the current
+    answer.
+    """
+    ubo, use, area, eligible = encode_profile(profile)
+    cols = {"ubo_residency": [ubo], "vessel_use": [use], "cruising_area": [area], "eligible": [eligible]}
+    meta = []
+    for key, label, options in WHATIF_QUESTIONS:
+        for i, opt in enumerate(options):
+            row = {"ubo_residency": ubo, "vessel_use": use, "cruising_area": area, "eligible": eligible}
+            if key in ("ubo_residency", "vessel_use", "cruising_area"):
+                row[key] = i
+            elif key == "jurisdiction":
+                row["eligible"] = opt == ELIGIBLE_LABEL
+            for c in cols:
+                cols[c].append(row[c])
+            meta.append((key, label, opt))
+
+    bvi = factor_score_matrix(cols["ubo_residency"], cols["vessel_use"],
+                              cols["cruising_area"], cols["eligible"])
+    scores = batch_final_scores(bvi, importance_vector(importances))
+    base = int(scores[0])
+
+    rows = []
+    for (key, label, opt), sc in zip(meta, scores[1:]):
+        rows.append({
+            "question": key, "label": label, "option": opt,
+            "score": int(sc), "delta": int(sc) - base,
+            "current": opt == current_answer(profile, key),
+        })
+    return base, rows
+
+def marginal_contributions(profile, importances):
+    """∂score/∂importance for each factor, largest magnitude first.
+
+    The unrounded score is 20·T/W with T = Σ score·importance and
+    W = Σ importance, so ∂/∂wᵢ = 20·(scoreᵢ − T/W)/W.
+    """
+    bvi = factor_score_matrix(*encode_profile(profile))[0]
+    w = importance_vector(importances)
+    W = w.sum()
+    grad = 20.0 * (bvi - (bvi @ w) / W) / W if W > 0 else np.zeros_like(w)
+    order = np.argsort(-np.abs(grad), kind="stable")
+    factors = compiled_model().pack.factors
+    return [
+        {"id": factors[i][0], "name": factors[i][1], "group": factors[i][3],
+         "bvi_score": int(bvi[i]), "marginal": float(grad[i])}
+        for i in order
+    ]
+
+# ── Minimal-change search ─────────────────────────────────────────────────────
+# The score only depends on the profile through four levers: the VAT cell
+# (UBO residency × vessel use × cruising area) and eligibility. Ownership and
+# vessel stage move no factor score; for an ineligible profile the
+# eligibility lever is "own through a company in an eligible jurisdiction",
+# one change however it is spelled in the answers.
+#
+# Depth-first branch-and-bound over the levers, keeping the current answer
+# before trying alternatives. A branch is cut when its cost already exceeds
+# the cheapest solution found, or when even the best VAT cell left open by
+# its fixed levers (and eligibility, if still open) cannot reach the target:
+# the score is monotone in both factor scores, so that bound is exact for
+# the remaining subtree's maximum.
+
+SUGGESTED_JURISDICTION = "British Virgin Islands"
+COMPANY_OWNERSHIP = "Through a company"
+LEVER_COSTS = {"vessel_use": 1, "cruising_area": 1, "ubo_residency": 1, "jurisdiction": 1}
+
+# The VAT cell levers, in encode_profile order.
+_CELL_LEVERS = [("ubo_residency", UBO_RESIDENCIES), ("vessel_use", VESSEL_USES),
+                ("cruising_area", CRUISING_AREAS)]
+
+def verdict_threshold(verdict):
+    for threshold, name, _ in VERDICT_BANDS:
+        if name == verdict:
+            return threshold
+    raise ValueError(f"unknown verdict {verdict!r}")
+
+def _suggested_jurisdiction(pack):
+    if SUGGESTED_JURISDICTION in pack.eligible_set:
+        return SUGGESTED_JURISDICTION
+    return pack.eligible_jurisdictions[0]
+
+def minimal_changes(profile, importances, target, costs=None, limit=5):
+    """Cheapest profile changes that reach the `target` verdict.
+
+    Returns up to `limit` solutions of equal, minimal total cost, highest
+    score first; each is a dict with the list of (key, label, old, new)
+    changes, cost, score and verdict. An empty change list means the
+    profile already qualifies; no solutions means no change can get there.
+    """
+    costs = {**LEVER_COSTS, **(costs or {})}
+    threshold = verdict_threshold(target)
+    m = compiled_model()
+    imp = importance_vector(importances)
+    mw = 5.0 * imp.sum()
+    if mw <= 0:
+        return []
+    w_vat, w_elig = imp[m.vat_col], imp[m.eligibility_col]
+    rest = m.base @ imp - m.base[m.vat_col] * w_vat - m.base[m.eligibility_col] * w_elig
+    elig_scores = (float(m.pack.ineligible_score), float(m.pack.eligible_score))
+
+    def score(vat, elig):
+        return int(np.round((rest + vat * w_vat + elig_scores[elig] * w_elig) / mw * 100))
+
+    def bound(cell, elig):
+        # Free levers are None: take the best VAT cell and eligibility left.
+        vat = m.vat[tuple(slice(None) if c is None else c for c in cell)].max()
+        return score(vat, True if elig is None else elig)
+
+    *start, eligible = encode_profile(profile)
+    best_cost = [float("inf")]
+    found = []
+
+    def search(i, cell, elig, cost):
+        if cost > best_cost[0] or bound(cell, elig) < threshold:
+            return
+        if i < len(_CELL_LEVERS):
+            key, options = _CELL_LEVERS[i]
+            for o in [start[i]] + [o for o in range(len(options)) if o != start[i]]:
+                search(i + 1, cell[:i] + (o,) + cell[i + 1:], elig,
+                       cost + (costs[key] if o != start[i] else 0))
+        elif elig is None:
+            search(i, cell, eligible, cost)
+            if not eligible:
+                search(i, cell, True, cost + costs["jurisdiction"])
+        else:
+            s = score(m.vat[cell], elig)
+            if s >= threshold:
+                if cost < best_cost[0]:
+                    best_cost[0] = cost
+                    found.clear()
+                found.append((cell, elig, cost, s))
+
+    search(0, (None,) * len(_CELL_LEVERS), None, 0)
+
+    labels = {key: label for key, label, _ in WHATIF_QUESTIONS}
+    solutions = []
+    for cell, elig, cost, s in sorted(found, key=lambda f: -f[3])[:limit]:
+        changes = [(key, labels[key], profile[key], options[o])
+                   for (key, options), o, o0 in zip(_CELL_LEVERS, cell, start) if o != o0]
+        if elig and not eligible:
+            if profile["ownership"] != COMPANY_OWNERSHIP:
+                changes.append(("ownership", labels["ownership"], profile["ownership"], COMPANY_OWNERSHIP))
+            changes.append(("jurisdiction", labels["jurisdiction"], profile["jurisdiction"],
+                            _suggested_jurisdiction(m.pack)))
+        solutions.append({"changes": changes, "cost": cost, "score": s,
+                          "verdict": get_verdict(s)[0]})
+    return solutions
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import json
+import os
+from urllib.parse import urlencode
+
+import datapack
+from models import Profile, ImportanceVector
+from scoring import (
+    VESSEL_USES, CRUISING_AREAS, UBO_RESIDENCIES, OWNERSHIP_TYPES,
+    VESSEL_STAGES, OTHER_JURISDICTION,
+)
+
+# ── Shareable report tokens ───────────────────────────────────────────────────
+# A report link carries the whole assessment in ?r=<token>. The token packs,
+# MSB first: a format byte, an 8-bit check over the factor ids and option
+# lists the indices refer to, the six profile answers as option indices in
+# as few bits as each list needs, and each factor's importance (1–5) in 3
+# bits; then base64url without padding — 19 characters for the current pack.
+# A pack that reorders factors or jurisdictions changes the check, so old
+# links are rejected rather than decoded into different answers.
+
+TOKEN_VERSION = 1
+QUERY_PARAM = "r"
+IMPORTANCE_BITS = 3
+# Public address of the app for report links, e.g. https://tool.example.com/;
+# set it when the app sits behind a proxy or the browser URL is unavailable.
+PUBLIC_URL = os.environ.get("BVI_PUBLIC_URL", "")
+
+class InvalidToken(ValueError):
+    pass
+
+def share_url(token, page_url="", query=None):
+    """Report link: BVI_PUBLIC_URL, else `page_url` (without its query), with
+    `query` plus ?r=<token>. With neither base, the link is relative."""
+    base = PUBLIC_URL or (page_url or "").split("?")[0]
+    return f"{base}?{urlencode({**(query or {}), QUERY_PARAM: token})}"
+
+def _width(n):
+    return max(1, (n - 1).bit_length())
+
+@datapack.pack_cached(maxsize=1)
+def _layout(pack):
+    fields = [
+        ("vessel_use",    VESSEL_USES),
+        ("cruising_area", CRUISING_AREAS),
+        ("ubo_residency", UBO_RESIDENCIES),
+        ("ownership",     OWNERSHIP_TYPES),
+        ("jurisdiction",  pack.eligible_jurisdictions + [OTHER_JURISDICTION]),
+        ("vessel_stage",  VESSEL_STAGES),
+    ]
+    factor_ids = [f[0] for f in pack.factors]
+    check = hashlib.sha256(json.dumps([factor_ids, fields]).encode()).digest()[0]
+    nbits = 16 + sum(_width(len(options)) for _, options in fields) + IMPORTANCE_BITS * len(factor_ids)
+    return fields, factor_ids, check, nbits
+
+def encode_token(profile, importances):
+    """Token for a complete profile and its importances (default 3)."""
+    fields, factor_ids, check, nbits = _layout()
+    value = (TOKEN_VERSION << 8) | check
+    for key, options in fields:
+        value = (value << _width(len(options))) | options.index(profile[key])
+    for imp in ImportanceVector.from_dict(importances).values:
+        value = (value << IMPORTANCE_BITS) | (imp - 1)
+    pad = -nbits % 8
+    raw = (value << pad).to_bytes((nbits + pad) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+@datapack.pack_cached(maxsize=4096)
+def _decode(pack, token):
+    fields, factor_ids, check, nbits = _layout.for_pack(pack)
+    pad = -nbits % 8
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        raise InvalidToken("not a report link token")
+    if len(raw) != (nbits + pad) // 8:
+        raise InvalidToken("report link token has the wrong length")
+    value = int.from_bytes(raw, "big") >> pad
+    pos = nbits
+
+    def take(width):
+        nonlocal pos
+        pos -= width
+        return (value >> pos) & ((1 << width) - 1)
+
+    if take(8) != TOKEN_VERSION:
+        raise InvalidToken("report link is from an unsupported version")
+    if take(8) != check:
+        raise InvalidToken("report link was made with different factor data")
+    profile = []
+    for key, options in fields:
+        i = take(_width(len(options)))
+        if i >= len(options):
+            raise InvalidToken(f"report link has an invalid {key}")
+        profile.append((key, options[i]))
+    importances = []
+    for fid in factor_ids:
+        imp = take(IMPORTANCE_BITS) + 1
+        if imp > 5:
+            raise InvalidToken(f"report link has an invalid importance for {fid}")
+        importances.append(imp)
+    return Profile(*(value for _, value in profile)), ImportanceVector(importances, pack)
+
+def decode_token(token):
+    """(Profile, ImportanceVector) for a token; raises InvalidToken."""
+    return _decode(token)